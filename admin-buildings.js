@@ -5,12 +5,18 @@ const sourceFileInput = document.getElementById("parcel-source-file");
 const importFileNote = document.getElementById("parcel-import-file-note");
 const deleteAllButton = document.getElementById("parcel-delete-all-btn");
 const refreshCoordsButton = document.getElementById("parcel-refresh-coords-btn");
+const refreshModeSelect = document.getElementById("parcel-refresh-mode");
 const actionsNote = document.getElementById("parcel-actions-note");
 const parcelsTableBody = document.getElementById("parcels-table-body");
+const parcelsLoadMoreButton = document.getElementById("parcels-load-more-btn");
+
+const ACTIVE_JOB_STORAGE_KEY = "pocitovaMapaActiveParcelJob";
+const JOB_POLL_INTERVAL_MS = 1500;
 
 const client = window.AdminCommon.createClient();
 const state = {
   parcels: [],
+  nextCursor: null,
 };
 
 initialize();
@@ -23,6 +29,76 @@ async function initialize() {
   bindImportFileForm();
   bindDeleteAllParcels();
   bindRefreshCoordinates();
+  parcelsLoadMoreButton.addEventListener("click", () => loadParcels({ append: true }));
+  await loadParcels();
+  await resumeActiveJob();
+}
+
+async function resumeActiveJob() {
+  const jobId = localStorage.getItem(ACTIVE_JOB_STORAGE_KEY);
+  if (!jobId) {
+    return;
+  }
+  try {
+    const payload = await client.apiRequest(
+      `${client.API_BASE}/admin/jobs/${encodeURIComponent(jobId)}`
+    );
+    if (payload.job.kind === "import_parcels") {
+      await followImportJob(payload.job);
+    } else {
+      await followRefreshJob(payload.job);
+    }
+  } catch {
+    localStorage.removeItem(ACTIVE_JOB_STORAGE_KEY);
+  }
+}
+
+async function waitForJob(job, noteElement, label) {
+  localStorage.setItem(ACTIVE_JOB_STORAGE_KEY, job.id);
+  let current = job;
+  try {
+    while (current.status === "queued" || current.status === "running") {
+      noteElement.textContent = formatJobProgress(label, current);
+      noteElement.style.color = "#5d5d5d";
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const payload = await client.apiRequest(
+        `${client.API_BASE}/admin/jobs/${encodeURIComponent(current.id)}`
+      );
+      current = payload.job;
+    }
+  } finally {
+    if (current.status !== "queued" && current.status !== "running") {
+      localStorage.removeItem(ACTIVE_JOB_STORAGE_KEY);
+    }
+  }
+  if (current.status === "failed") {
+    throw new Error(current.error || "Uloha selhala.");
+  }
+  return current.result || {};
+}
+
+function formatJobProgress(label, job) {
+  if (job.status === "queued") {
+    return `${label}: ceka ve fronte...`;
+  }
+  let text = `${label}: ${job.processed}/${job.total} (hotovo ${job.done}, selhalo ${job.failed}, preskoceno ${job.skipped})`;
+  if (typeof job.eta_seconds === "number") {
+    text += `, zbyva cca ${Math.max(1, Math.round(job.eta_seconds / 60))} min`;
+  }
+  return text;
+}
+
+async function followImportJob(job) {
+  const result = await waitForJob(job, importFileNote, "Import probiha");
+  importFileNote.textContent = `Import hotov: ${result.imported || 0} nalezeno, ${result.inserted || 0} novych, ${result.updated || 0} aktualizovanych, ${result.unchanged || 0} beze zmeny, ${result.detail_failures || 0} detailu se nepodarilo nacist, ${result.coordinate_failures || 0} souradnic se nepodarilo doplnit.`;
+  importFileNote.style.color = "#1f6f34";
+  await loadParcels();
+}
+
+async function followRefreshJob(job) {
+  const result = await waitForJob(job, actionsNote, "Doplnuji souradnice");
+  actionsNote.textContent = `Souradnice doplneny: ${result.updated || 0}, selhalo: ${result.failed || 0}, preskoceno: ${result.skipped || 0}.`;
+  actionsNote.style.color = "#1f6f34";
   await loadParcels();
 }
 
@@ -40,7 +116,7 @@ function bindImportFileForm() {
     importFileNote.style.color = "#5d5d5d";
     try {
       const htmlContent = await file.text();
-      const result = await client.apiRequest(`${client.API_BASE}/admin/buildings/parcels/import-html`, {
+      const payload = await client.apiRequest(`${client.API_BASE}/admin/buildings/parcels/import-html`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -48,10 +124,8 @@ function bindImportFileForm() {
           source_url: "https://nahlizenidokn.cuzk.gov.cz/",
         }),
       });
-      importFileNote.textContent = `Import hotov: ${result.imported} nalezeno, ${result.inserted} novych, ${result.updated} aktualizovanych, ${result.detail_failures || 0} detailu se nepodarilo nacist, ${result.coordinate_failures || 0} souradnic se nepodarilo doplnit.`;
-      importFileNote.style.color = "#1f6f34";
       sourceFileInput.value = "";
-      await loadParcels();
+      await followImportJob(payload.job);
     } catch (error) {
       importFileNote.textContent = error?.message || "Import selhal.";
       importFileNote.style.color = "#8a2118";
@@ -91,13 +165,15 @@ function bindRefreshCoordinates() {
     actionsNote.textContent = "Doplnuji souradnice...";
     actionsNote.style.color = "#5d5d5d";
     try {
-      const result = await client.apiRequest(
+      const payload = await client.apiRequest(
         `${client.API_BASE}/admin/buildings/parcels/refresh-coordinates`,
-        { method: "POST", headers: { "Content-Type": "application/json" }, body: "{}" }
+        {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ mode: refreshModeSelect.value }),
+        }
       );
-      actionsNote.textContent = `Souradnice doplneny: ${result.updated}, selhalo: ${result.failed}, preskoceno: ${result.skipped}.`;
-      actionsNote.style.color = "#1f6f34";
-      await loadParcels();
+      await followRefreshJob(payload.job);
     } catch (error) {
       actionsNote.textContent = error?.message || "Doplneni souradnic selhalo.";
       actionsNote.style.color = "#8a2118";
@@ -107,18 +183,34 @@ function bindRefreshCoordinates() {
   });
 }
 
-async function loadParcels() {
+async function loadParcels({ append = false } = {}) {
+  // A reload keeps as many rows as are already shown, up to the API maximum.
+  const limit = append
+    ? window.AdminCommon.PAGE_SIZE
+    : Math.min(
+        window.AdminCommon.PAGE_MAX_SIZE,
+        Math.max(window.AdminCommon.PAGE_SIZE, state.parcels.length)
+      );
+  parcelsLoadMoreButton.disabled = true;
   try {
-    const payload = await client.apiRequest(`${client.API_BASE}/admin/buildings/parcels`);
-    state.parcels = Array.isArray(payload.parcels) ? payload.parcels : [];
+    const page = await client.apiRequestPage(
+      `${client.API_BASE}/admin/buildings/parcels`,
+      "parcels",
+      { limit, cursor: append ? state.nextCursor : null }
+    );
+    state.parcels = append ? state.parcels.concat(page.items) : page.items;
+    state.nextCursor = page.nextCursor;
     renderParcelsTable();
   } catch (error) {
     authInfo.textContent = error?.message || "Nepodarilo se nacist pozemky.";
     parcelsTableBody.innerHTML = '<tr><td colspan="5">Nacitani selhalo.</td></tr>';
+  } finally {
+    parcelsLoadMoreButton.disabled = false;
   }
 }
 
 function renderParcelsTable() {
+  parcelsLoadMoreButton.classList.toggle("hidden", !state.nextCursor);
   if (!state.parcels.length) {
     parcelsTableBody.innerHTML = '<tr><td colspan="5">Zatim nejsou ulozene zadne pozemky.</td></tr>';
     return;
@@ -36,6 +36,18 @@
       return payload;
     }
 
+    async function apiRequestPage(path, listKey, { limit, cursor = null } = {}) {
+      const params = new URLSearchParams({ limit: String(limit) });
+      if (cursor) {
+        params.set("cursor", cursor);
+      }
+      const payload = await apiRequest(`${path}?${params}`);
+      return {
+        items: Array.isArray(payload?.[listKey]) ? payload[listKey] : [],
+        nextCursor: payload?.next_cursor || null,
+      };
+    }
+
     async function requireAdmin(authInfoElement, contentElement) {
       if (!authToken) {
         authInfoElement.textContent =
@@ -66,11 +78,14 @@
     return {
       API_BASE,
       apiRequest,
+      apiRequestPage,
       requireAdmin,
     };
   }
 
   window.AdminCommon = {
+    PAGE_SIZE: 100,
+    PAGE_MAX_SIZE: 1000,
     createClient,
   };
 })();
@@ -2,10 +2,12 @@ const authInfo = document.getElementById("admin-auth-info");
 const adminContent = document.getElementById("admin-content");
 const usersTableBody = document.getElementById("users-table-body");
 const usersNote = document.getElementById("users-note");
+const usersLoadMoreButton = document.getElementById("users-load-more-btn");
 
 const client = window.AdminCommon.createClient();
 const state = {
   users: [],
+  nextCursor: null,
 };
 
 initialize();
@@ -15,6 +17,7 @@ async function initialize() {
   if (!auth.ok) {
     return;
   }
+  usersLoadMoreButton.addEventListener("click", () => loadUsers({ append: true }));
   await loadUsers();
 }
 
@@ -30,18 +33,33 @@ function setUsersNote(message, isError = false) {
   usersNote.style.color = isError ? "#8a2118" : "#1f6f34";
 }
 
-async function loadUsers() {
+async function loadUsers({ append = false } = {}) {
+  // A reload keeps as many rows as are already shown, up to the API maximum.
+  const limit = append
+    ? window.AdminCommon.PAGE_SIZE
+    : Math.min(
+        window.AdminCommon.PAGE_MAX_SIZE,
+        Math.max(window.AdminCommon.PAGE_SIZE, state.users.length)
+      );
+  usersLoadMoreButton.disabled = true;
   try {
-    const payload = await client.apiRequest(`${client.API_BASE}/admin/users`);
-    state.users = Array.isArray(payload.users) ? payload.users : [];
+    const page = await client.apiRequestPage(`${client.API_BASE}/admin/users`, "users", {
+      limit,
+      cursor: append ? state.nextCursor : null,
+    });
+    state.users = append ? state.users.concat(page.items) : page.items;
+    state.nextCursor = page.nextCursor;
     renderUsersTable();
   } catch (error) {
     authInfo.textContent = error?.message || "Nepodarilo se nacist uzivatele.";
     usersTableBody.innerHTML = '<tr><td colspan="6">Nacitani uzivatelu selhalo.</td></tr>';
+  } finally {
+    usersLoadMoreButton.disabled = false;
   }
 }
 
 function renderUsersTable() {
+  usersLoadMoreButton.classList.toggle("hidden", !state.nextCursor);
   if (!state.users.length) {
     usersTableBody.innerHTML = '<tr><td colspan="6">Zatim nejsou registrovani zadni uzivatele.</td></tr>';
     return;
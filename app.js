@@ -3,6 +3,8 @@ const API_BASE = "/api";
 const AUTH_STORAGE_KEY = "pocitovaMapaAuthToken";
 const FEELINGS_LAYER_KEY = "feelings";
 const HEX_OVERLAY_LAYER_KEY = "north_hex_grid";
+const MAX_TILE_ZOOM = 22;
+const POINTS_DETAIL_ZOOM = 14;
 const HUSTOPECE_OVERLAY_BOUNDS = {
   south: 48.928,
   north: 48.956,
@@ -64,6 +66,7 @@ const initialCenter = [48.9407, 16.7376];
 const state = {
   markers: new Map(),
   staticLayerMarkers: new Map(),
+  staticLayerTiles: new Map(),
   layerGroups: new Map(),
   availableLayers: new Map(),
   selectedLayers: new Set(),
@@ -74,8 +77,18 @@ const state = {
   categories: new Map(),
   selectedFilters: new Set(),
   hexCellCount: 0,
+  hexbins: null,
+  hexbinsRequestId: 0,
+  hexbinsPendingRequestId: -1,
   authToken: null,
   authUser: null,
+  layerEventSources: new Map(),
+  layerReloadTimer: null,
+  feelingsSyncCursor: null,
+  feelingsClustered: false,
+  feelingsClusters: null,
+  feelingsClusterMarkers: [],
+  feelingsClustersRequestId: 0,
 };
 
 const map = L.map("map").setView(initialCenter, 15);
@@ -183,6 +196,8 @@ map.on("click", (event) => {
 
 map.on("moveend", () => {
   refreshHexOverlay();
+  refreshStaticLayerTiles();
+  refreshFeelingsClusters();
 });
 
 authForm.addEventListener("submit", async (event) => {
@@ -253,6 +268,7 @@ async function initialize() {
 
   await loadLayersFromServer();
   renderLayerFilters();
+  subscribeToLayerEvents();
   await loadDataForAllLayers();
 }
 
@@ -318,6 +334,7 @@ function registerOrUpdateLayer(layer) {
     allow_user_points: Boolean(layer.allow_user_points),
     is_enabled: typeof layer.is_enabled === "boolean" ? layer.is_enabled : true,
     sort_order: Number.isFinite(layer.sort_order) ? Number(layer.sort_order) : 100,
+    point_count: Number.isFinite(layer.point_count) ? Number(layer.point_count) : existing.point_count || 0,
   };
   state.availableLayers.set(layer.key, next);
   ensureLayerGroup(layer.key);
@@ -431,6 +448,8 @@ function applyLayerVisibility() {
   }
 
   refreshHexOverlay();
+  refreshStaticLayerTiles();
+  refreshFeelingsClusters();
 }
 
 function renderLayerFilters() {
@@ -485,7 +504,7 @@ function updateLayerCounts() {
     } else if (key === HEX_OVERLAY_LAYER_KEY) {
       count = state.hexCellCount;
     } else {
-      count = state.staticLayerMarkers.get(key)?.size || 0;
+      count = staticLayerPointCount(key);
     }
     countEl.textContent = `(${count})`;
   });
@@ -572,7 +591,7 @@ async function createPendingPin(type) {
     addPinToMap(saved, true);
     updateFilterCounts();
     updateLayerCounts();
-    refreshHexOverlay();
+    invalidateHexbins();
   } catch (error) {
     showError(error);
   }
@@ -696,7 +715,7 @@ function addPinToMap(pin, openPopup = false) {
     icon: markerIconForPin(pin),
   });
 
-  const shouldBeVisible = matchesFilter(pin.type);
+  const shouldBeVisible = isPinMarkerShown(pin);
   if (shouldBeVisible) {
     marker.addTo(feelingsGroup);
   }
@@ -837,7 +856,7 @@ function clearAllMarkers() {
   state.markers.clear();
   state.commentSaveTimers.forEach((timerId) => clearTimeout(timerId));
   state.commentSaveTimers.clear();
-  refreshHexOverlay();
+  invalidateHexbins();
 }
 
 function removePinFromMap(pinId) {
@@ -851,18 +870,22 @@ function removePinFromMap(pinId) {
     clearTimeout(timer);
     state.commentSaveTimers.delete(pinId);
   }
-  refreshHexOverlay();
+  invalidateHexbins();
 }
 
 function matchesFilter(pinType) {
   return state.selectedFilters.has(pinType);
 }
 
+function isPinMarkerShown(pin) {
+  return matchesFilter(pin.type) && !state.feelingsClustered;
+}
+
 function applyFilterToMarkers() {
   const feelingsGroup = ensureLayerGroup(FEELINGS_LAYER_KEY);
 
   state.markers.forEach(({ marker, pin }) => {
-    const shouldBeVisible = matchesFilter(pin.type);
+    const shouldBeVisible = isPinMarkerShown(pin);
     const isVisible = feelingsGroup.hasLayer(marker);
 
     if (shouldBeVisible && !isVisible) {
@@ -874,6 +897,59 @@ function applyFilterToMarkers() {
       feelingsGroup.removeLayer(marker);
     }
   });
+  renderFeelingsClusters();
+}
+
+async function refreshFeelingsClusters() {
+  const clustered =
+    isLayerVisible(FEELINGS_LAYER_KEY) && Math.round(map.getZoom()) < POINTS_DETAIL_ZOOM;
+  if (clustered !== state.feelingsClustered) {
+    state.feelingsClustered = clustered;
+    state.feelingsClusters = null;
+    applyFilterToMarkers();
+  }
+  if (!clustered) {
+    return;
+  }
+
+  const requestId = state.feelingsClustersRequestId + 1;
+  state.feelingsClustersRequestId = requestId;
+  let payload = null;
+  try {
+    payload = await apiGetClusters(FEELINGS_LAYER_KEY, Math.round(map.getZoom()), map.getBounds());
+  } catch {
+    return;
+  }
+  if (requestId !== state.feelingsClustersRequestId || !state.feelingsClustered) {
+    return;
+  }
+  state.feelingsClusters = Array.isArray(payload?.clusters) ? payload.clusters : [];
+  renderFeelingsClusters();
+}
+
+function renderFeelingsClusters() {
+  const feelingsGroup = ensureLayerGroup(FEELINGS_LAYER_KEY);
+  state.feelingsClusterMarkers.forEach((marker) => feelingsGroup.removeLayer(marker));
+  state.feelingsClusterMarkers = [];
+  if (!state.feelingsClustered || !state.feelingsClusters) {
+    return;
+  }
+
+  state.feelingsClusters.forEach((cluster) => {
+    const count = Object.entries(cluster.counts || {}).reduce(
+      (sum, [type, typeCount]) => (matchesFilter(type) ? sum + typeCount : sum),
+      0
+    );
+    if (count === 0) {
+      return;
+    }
+    const single = cluster.count === 1 ? state.markers.get(cluster.id) : null;
+    const marker = single
+      ? single.marker
+      : createClusterMarker(cluster, count, { color: "#1f3b57", fillColor: "#3d6f9c" });
+    marker.addTo(feelingsGroup);
+    state.feelingsClusterMarkers.push(marker);
+  });
 }
 
 function updateFilterCounts() {
@@ -888,6 +964,26 @@ function updateFilterCounts() {
   });
 }
 
+function invalidateHexbins() {
+  state.hexbins = null;
+  state.hexbinsRequestId += 1;
+  refreshHexOverlay();
+}
+
+async function loadHexbins() {
+  const requestId = state.hexbinsRequestId;
+  try {
+    const hexbins = await apiGetHexbins(HEX_OVERLAY_STYLE.radiusMeters, HUSTOPECE_OVERLAY_BOUNDS);
+    if (requestId !== state.hexbinsRequestId) {
+      return;
+    }
+    state.hexbins = hexbins;
+    refreshHexOverlay();
+  } catch (error) {
+    console.error(error);
+  }
+}
+
 function refreshHexOverlay() {
   const hexGroup = ensureLayerGroup(HEX_OVERLAY_LAYER_KEY);
   hexGroup.clearLayers();
@@ -898,32 +994,31 @@ function refreshHexOverlay() {
     return;
   }
 
-  const north = HUSTOPECE_OVERLAY_BOUNDS.north;
-  const south = HUSTOPECE_OVERLAY_BOUNDS.south;
-  const west = HUSTOPECE_OVERLAY_BOUNDS.west;
-  const east = HUSTOPECE_OVERLAY_BOUNDS.east;
-
-  if (south >= north) {
+  const hexbins = state.hexbins;
+  if (!hexbins) {
+    if (state.hexbinsPendingRequestId !== state.hexbinsRequestId) {
+      state.hexbinsPendingRequestId = state.hexbinsRequestId;
+      loadHexbins();
+    }
     updateLayerCounts();
     return;
   }
 
-  const radius = HEX_OVERLAY_STYLE.radiusMeters;
-  const latStep = metersToLatDegrees(Math.sqrt(3) * radius);
-  const centerLat = (south + north) / 2;
-  const lngStep = metersToLngDegrees(1.5 * radius, centerLat);
+  const radius = hexbins.radius;
+  const latStep = hexbins.lat_step;
+  const lngStep = hexbins.lng_step;
 
   if (!Number.isFinite(latStep) || !Number.isFinite(lngStep) || latStep <= 0 || lngStep <= 0) {
     updateLayerCounts();
     return;
   }
 
-  const hexCells = [];
-  let col = 0;
-  for (let lng = west - lngStep; lng <= east + lngStep; lng += lngStep) {
+  const hexCells = new Map();
+  for (let col = 0; col < hexbins.columns; col += 1) {
+    const lng = hexbins.origin.lng + col * lngStep;
     const colLatOffset = col % 2 === 0 ? 0 : latStep / 2;
-    for (let lat = south - latStep; lat <= north + latStep; lat += latStep) {
-      const centerLat = lat + colLatOffset;
+    for (let row = 0; row < hexbins.rows; row += 1) {
+      const centerLat = hexbins.origin.lat + row * latStep + colLatOffset;
       const vertices = buildHexagonLatLng(centerLat, lng, radius);
       const polygon = L.polygon(vertices, {
         color: HEX_NEUTRAL_STYLE.color,
@@ -936,39 +1031,32 @@ function refreshHexOverlay() {
       });
       polygon.addTo(hexGroup);
       state.hexCellCount += 1;
-      hexCells.push({
+      hexCells.set(`${col}:${row}`, {
         polygon,
-        vertices,
         score: 0,
       });
     }
-    col += 1;
   }
 
-  applyFeelingIntensityToHexCells(hexCells);
+  applyFeelingIntensityToHexCells(hexCells, hexbins.cells);
   updateLayerCounts();
 }
 
-function applyFeelingIntensityToHexCells(hexCells) {
-  if (!Array.isArray(hexCells) || hexCells.length === 0) {
+function applyFeelingIntensityToHexCells(hexCellsByKey, binnedCells) {
+  const hexCells = Array.from(hexCellsByKey.values());
+  if (hexCells.length === 0) {
     return;
   }
 
-  state.markers.forEach(({ pin }) => {
-    const type = pin.type;
-    const point = [pin.lat, pin.lng];
-    for (const cell of hexCells) {
-      if (pointInPolygon(point, cell.vertices)) {
-        if (type === "good") {
-          cell.goodCount = (cell.goodCount || 0) + 1;
-        } else if (type === "bad") {
-          cell.badCount = (cell.badCount || 0) + 1;
-        } else if (type === "change") {
-          cell.changeCount = (cell.changeCount || 0) + 1;
-        }
-        break;
-      }
+  (Array.isArray(binnedCells) ? binnedCells : []).forEach((binned) => {
+    const cell = hexCellsByKey.get(`${binned.col}:${binned.row}`);
+    if (!cell) {
+      return;
     }
+    const counts = binned.counts || {};
+    cell.goodCount = counts.good || 0;
+    cell.badCount = counts.bad || 0;
+    cell.changeCount = counts.change || 0;
   });
 
   let maxPositive = 0;
@@ -1035,26 +1123,6 @@ function applyFeelingIntensityToHexCells(hexCells) {
   });
 }
 
-function pointInPolygon(point, vertices) {
-  const y = point[0];
-  const x = point[1];
-  let inside = false;
-
-  for (let i = 0, j = vertices.length - 1; i < vertices.length; j = i, i += 1) {
-    const yi = vertices[i][0];
-    const xi = vertices[i][1];
-    const yj = vertices[j][0];
-    const xj = vertices[j][1];
-
-    const intersects = yi > y !== yj > y && x < ((xj - xi) * (y - yi)) / (yj - yi) + xi;
-    if (intersects) {
-      inside = !inside;
-    }
-  }
-
-  return inside;
-}
-
 function interpolateColor(startHex, endHex, t) {
   const start = hexToRgb(startHex);
   const end = hexToRgb(endHex);
@@ -1106,6 +1174,144 @@ function clearAllStaticLayerMarkers() {
     layerMap.forEach(({ marker }) => group.removeLayer(marker));
     layerMap.clear();
   });
+  state.staticLayerTiles.forEach((layerTiles, layerKey) => {
+    const group = ensureLayerGroup(layerKey);
+    layerTiles.forEach((tile) => tile.clusterMarkers.forEach((marker) => group.removeLayer(marker)));
+    layerTiles.clear();
+  });
+}
+
+function staticLayerPointCount(layerKey) {
+  // Tiles only cover the visible area, so the total comes from /api/layers.
+  return state.availableLayers.get(layerKey)?.point_count || 0;
+}
+
+function visibleTileCoords() {
+  const zoom = Math.max(0, Math.min(MAX_TILE_ZOOM, Math.round(map.getZoom())));
+  const bounds = map.getBounds();
+  const lastIndex = 2 ** zoom - 1;
+  const northWest = map.project(bounds.getNorthWest(), zoom).divideBy(256).floor();
+  const southEast = map.project(bounds.getSouthEast(), zoom).divideBy(256).floor();
+  const tiles = [];
+  for (let x = Math.max(0, northWest.x); x <= Math.min(lastIndex, southEast.x); x += 1) {
+    for (let y = Math.max(0, northWest.y); y <= Math.min(lastIndex, southEast.y); y += 1) {
+      tiles.push({ z: zoom, x, y, key: `${zoom}/${x}/${y}` });
+    }
+  }
+  return tiles;
+}
+
+async function refreshStaticLayerTiles() {
+  const tiles = visibleTileCoords();
+  const wantedKeys = new Set(tiles.map((coords) => coords.key));
+  const loads = [];
+
+  state.availableLayers.forEach((_layer, layerKey) => {
+    if (
+      layerKey === FEELINGS_LAYER_KEY ||
+      layerKey === HEX_OVERLAY_LAYER_KEY ||
+      !isLayerVisible(layerKey)
+    ) {
+      return;
+    }
+    if (!state.staticLayerTiles.has(layerKey)) {
+      state.staticLayerTiles.set(layerKey, new Map());
+    }
+    const layerTiles = state.staticLayerTiles.get(layerKey);
+    Array.from(layerTiles.keys()).forEach((tileKey) => {
+      if (!wantedKeys.has(tileKey)) {
+        removeStaticTile(layerKey, tileKey);
+      }
+    });
+    tiles.forEach((coords) => {
+      if (!layerTiles.has(coords.key)) {
+        loads.push(loadStaticTile(layerKey, coords));
+      }
+    });
+  });
+
+  if (loads.length === 0) {
+    return;
+  }
+  await Promise.all(loads);
+  updateLayerCounts();
+}
+
+async function loadStaticTile(layerKey, coords) {
+  const layerTiles = state.staticLayerTiles.get(layerKey);
+  const tile = { ids: [], clusterMarkers: [] };
+  layerTiles.set(coords.key, tile);
+
+  let payload = null;
+  try {
+    payload = await apiGetTile(layerKey, coords);
+  } catch {
+    if (layerTiles.get(coords.key) === tile) {
+      layerTiles.delete(coords.key);
+    }
+    return;
+  }
+  if (layerTiles.get(coords.key) !== tile) {
+    return;
+  }
+
+  const group = ensureLayerGroup(layerKey);
+  const layerMap = state.staticLayerMarkers.get(layerKey);
+  (payload.points || []).forEach((point) => {
+    addStaticPointToLayer(layerKey, point);
+    if (layerMap.has(point.id)) {
+      tile.ids.push(point.id);
+    }
+  });
+  const isCityBuildingLayer = layerKey === "city_buildings";
+  const clusterStyle = {
+    color: isCityBuildingLayer ? "#2f5678" : "#45545f",
+    fillColor: isCityBuildingLayer ? "#5f90bb" : "#7f95a7",
+  };
+  (payload.clusters || []).forEach((cluster) => {
+    const marker = createClusterMarker(cluster, cluster.count, clusterStyle);
+    marker.addTo(group);
+    tile.clusterMarkers.push(marker);
+  });
+}
+
+function removeStaticTile(layerKey, tileKey) {
+  const layerTiles = state.staticLayerTiles.get(layerKey);
+  const tile = layerTiles?.get(tileKey);
+  if (!tile) {
+    return;
+  }
+  const group = ensureLayerGroup(layerKey);
+  const layerMap = state.staticLayerMarkers.get(layerKey);
+  tile.ids.forEach((pointId) => {
+    const existing = layerMap.get(pointId);
+    if (existing) {
+      group.removeLayer(existing.marker);
+      layerMap.delete(pointId);
+    }
+  });
+  tile.clusterMarkers.forEach((marker) => group.removeLayer(marker));
+  layerTiles.delete(tileKey);
+}
+
+function createClusterMarker(cluster, count, style) {
+  const marker = L.circleMarker([cluster.lat, cluster.lng], {
+    radius: Math.min(22, 9 + Math.log2(count) * 3),
+    color: style.color,
+    weight: 2,
+    fillColor: style.fillColor,
+    fillOpacity: 0.82,
+    bubblingMouseEvents: false,
+  });
+  marker.bindTooltip(String(count), {
+    permanent: true,
+    direction: "center",
+    className: "cluster-count",
+  });
+  marker.on("click", () => {
+    map.setView([cluster.lat, cluster.lng], Math.min(map.getZoom() + 2, map.getMaxZoom()));
+  });
+  return marker;
 }
 
 function addStaticPointToLayer(layerKey, point) {
@@ -1256,36 +1462,15 @@ async function loadLayersFromServer() {
 
 async function loadDataForAllLayers() {
   try {
-    const pins = await apiListPins();
+    const { pins, cursor } = await apiListPins();
+    state.feelingsSyncCursor = cursor;
     clearAllMarkers();
     pins.forEach((pin) => {
       addPinToMap(pin, false);
     });
 
     clearAllStaticLayerMarkers();
-    const staticLayerKeys = Array.from(state.availableLayers.keys()).filter(
-      (key) => key !== FEELINGS_LAYER_KEY && key !== HEX_OVERLAY_LAYER_KEY
-    );
-
-    const staticResults = await Promise.all(
-      staticLayerKeys.map(async (layerKey) => {
-        try {
-          return {
-            layerKey,
-            points: await apiListLayerPoints(layerKey),
-          };
-        } catch {
-          return {
-            layerKey,
-            points: [],
-          };
-        }
-      })
-    );
-
-    staticResults.forEach(({ layerKey, points }) => {
-      points.forEach((point) => addStaticPointToLayer(layerKey, point));
-    });
+    await refreshStaticLayerTiles();
 
     applyFilterToMarkers();
     applyLayerVisibility();
@@ -1296,6 +1481,127 @@ async function loadDataForAllLayers() {
   }
 }
 
+function subscribeToLayerEvents() {
+  if (typeof EventSource === "undefined") {
+    return;
+  }
+  state.availableLayers.forEach((layer) => {
+    if (!layer.is_enabled || !layer.allow_user_points || state.layerEventSources.has(layer.key)) {
+      return;
+    }
+    const source = new EventSource(`${API_BASE}/layers/${encodeURIComponent(layer.key)}/events`);
+    ["create", "update", "delete"].forEach((eventType) => {
+      source.addEventListener(eventType, (event) => {
+        try {
+          applyLayerEvent(layer.key, eventType, JSON.parse(event.data));
+        } catch {
+          scheduleLayerReload();
+        }
+      });
+    });
+    source.addEventListener("reset", () => scheduleLayerReload(layer.key));
+    state.layerEventSources.set(layer.key, source);
+  });
+}
+
+function scheduleLayerReload(layerKey = null) {
+  if (state.layerReloadTimer) {
+    return;
+  }
+  state.layerReloadTimer = setTimeout(async () => {
+    state.layerReloadTimer = null;
+    if (layerKey === FEELINGS_LAYER_KEY && state.feelingsSyncCursor) {
+      await syncFeelingsChanges();
+      return;
+    }
+    await loadLayersFromServer();
+    await loadDataForAllLayers();
+  }, 500);
+}
+
+async function syncFeelingsChanges() {
+  let changes = null;
+  try {
+    changes = await apiListLayerPointChanges(FEELINGS_LAYER_KEY, state.feelingsSyncCursor);
+  } catch {
+    changes = null;
+  }
+  if (!changes || changes.reset) {
+    await loadDataForAllLayers();
+    return;
+  }
+
+  changes.deleted.forEach((pinId) => removePinFromMap(pinId));
+  changes.points.forEach((point) => {
+    if (state.markers.has(point.id)) {
+      upsertPinFromEvent(point);
+    } else {
+      addPinToMap(point, false);
+    }
+  });
+  if (changes.points.length > 0) {
+    invalidateHexbins();
+  }
+  state.feelingsSyncCursor = changes.cursor;
+  refreshFeelingsClusters();
+  updateFilterCounts();
+  updateLayerCounts();
+}
+
+function applyLayerEvent(layerKey, eventType, payload) {
+  if (layerKey !== FEELINGS_LAYER_KEY) {
+    applyStaticLayerEvent(layerKey, eventType, payload);
+  } else {
+    if (eventType === "delete") {
+      removePinFromMap(payload.id);
+    } else {
+      upsertPinFromEvent(payload.point);
+    }
+    refreshFeelingsClusters();
+  }
+  updateFilterCounts();
+  updateLayerCounts();
+}
+
+function upsertPinFromEvent(point) {
+  if (!isValidPin(point)) {
+    return;
+  }
+
+  const target = state.markers.get(point.id);
+  if (!target) {
+    const isAdmin = Boolean(state.authUser && state.authUser.role === "admin");
+    addPinToMap({ ...point, can_edit: isAdmin, can_delete: isAdmin }, false);
+    invalidateHexbins();
+    return;
+  }
+
+  const typeChanged = target.pin.type !== point.type;
+  target.pin.type = point.type;
+  if (!state.commentSaveTimers.has(point.id)) {
+    target.pin.comment = point.comment;
+  }
+  target.marker.setIcon(markerIconForPin(target.pin));
+  if (!target.marker.isPopupOpen()) {
+    target.marker.setPopupContent(buildPopupContent(point.id));
+  }
+  if (typeChanged) {
+    ensureCategory(point.type);
+    applyFilterToMarkers();
+    invalidateHexbins();
+  }
+}
+
+function applyStaticLayerEvent(layerKey, _eventType, _payload) {
+  // Tiles carry cluster counts, so a change reloads the visible tiles of the
+  // layer; unchanged tiles come back as 304 from the browser cache.
+  const layerTiles = state.staticLayerTiles.get(layerKey);
+  if (layerTiles) {
+    Array.from(layerTiles.keys()).forEach((tileKey) => removeStaticTile(layerKey, tileKey));
+  }
+  refreshStaticLayerTiles();
+}
+
 function isValidPin(pin) {
   return (
     typeof pin?.id === "string" &&
@@ -1353,8 +1659,11 @@ async function apiRequest(path, options = {}) {
 }
 
 async function apiListPins() {
-  const payload = await apiRequest(`${API_BASE}/pins`);
-  return Array.isArray(payload.pins) ? payload.pins : [];
+  const payload = await apiRequest(`${API_BASE}/pins?format=columnar`);
+  return {
+    pins: decodeListPayload(payload, "pins"),
+    cursor: typeof payload.cursor === "string" ? payload.cursor : null,
+  };
 }
 
 async function apiListLayers() {
@@ -1362,9 +1671,71 @@ async function apiListLayers() {
   return Array.isArray(payload.layers) ? payload.layers : [];
 }
 
-async function apiListLayerPoints(layerKey) {
-  const payload = await apiRequest(`${API_BASE}/layers/${encodeURIComponent(layerKey)}/points`);
-  return Array.isArray(payload.points) ? payload.points : [];
+async function apiGetTile(layerKey, coords) {
+  return apiRequest(
+    `/tiles/${encodeURIComponent(layerKey)}/${coords.z}/${coords.x}/${coords.y}`
+  );
+}
+
+function decodeListPayload(payload, listKey) {
+  if (payload?.format !== "columnar") {
+    return Array.isArray(payload?.[listKey]) ? payload[listKey] : [];
+  }
+
+  const count = Number(payload.count) || 0;
+  const columns = payload.columns || {};
+  const types = Array.isArray(payload.types) ? payload.types : [];
+  const flags = Array.isArray(payload.flags) ? payload.flags : [];
+  const items = new Array(count);
+  for (let index = 0; index < count; index += 1) {
+    items[index] = {};
+  }
+
+  Object.entries(columns).forEach(([key, values]) => {
+    for (let index = 0; index < count; index += 1) {
+      const value = values[index];
+      const item = items[index];
+      if (key === "type") {
+        item.type = types[value] ?? "";
+      } else if (key === "flags") {
+        flags.forEach((flagName, bit) => {
+          item[flagName] = Boolean(value & (1 << bit));
+        });
+      } else {
+        item[key] = value;
+      }
+    }
+  });
+  return items;
+}
+
+async function apiListLayerPointChanges(layerKey, since) {
+  const params = new URLSearchParams({ since });
+  const payload = await apiRequest(
+    `${API_BASE}/layers/${encodeURIComponent(layerKey)}/points?${params.toString()}`
+  );
+  return {
+    points: Array.isArray(payload.points) ? payload.points : [],
+    deleted: Array.isArray(payload.deleted) ? payload.deleted : [],
+    cursor: typeof payload.cursor === "string" ? payload.cursor : null,
+    reset: Boolean(payload.reset),
+  };
+}
+
+async function apiGetClusters(layerKey, zoom, bounds) {
+  const bbox = [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()].join(",");
+  const params = new URLSearchParams({ zoom: String(zoom), bbox });
+  return apiRequest(
+    `${API_BASE}/layers/${encodeURIComponent(layerKey)}/clusters?${params.toString()}`
+  );
+}
+
+async function apiGetHexbins(radiusMeters, bounds) {
+  const bbox = [bounds.south, bounds.west, bounds.north, bounds.east].join(",");
+  const params = new URLSearchParams({ radius: String(radiusMeters), bbox });
+  return apiRequest(
+    `${API_BASE}/layers/${encodeURIComponent(FEELINGS_LAYER_KEY)}/hexbins?${params.toString()}`
+  );
 }
 
 async function apiCreatePin(pin) {
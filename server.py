@@ -1,18 +1,38 @@
 ﻿
+import asyncio
+import base64
+import gzip
+import hashlib
+import http.client
+import io
 import json
 import math
 import os
+import queue
 import re
 import secrets
+import selectors
+import signal
+import socket
 import sqlite3
+import ssl
+import tempfile
+import threading
+import time
+import traceback
 import unicodedata
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import partial
 from http import HTTPStatus
-from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
 from html import unescape
 from pathlib import Path
-from urllib.error import URLError
-from urllib.parse import urljoin, urlparse
-from urllib.request import Request, urlopen
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urljoin, urlparse
 
 
 ROOT = Path(__file__).resolve().parent
@@ -26,6 +46,96 @@ SEED_IF_EMPTY = os.environ.get("SEED_IF_EMPTY", "1").strip().lower() not in (
     "false",
     "no",
 )
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+STATIC_CACHE_MAX_AGE = int(os.environ.get("STATIC_CACHE_MAX_AGE", "300"))
+GZIP_MIN_SIZE = int(os.environ.get("GZIP_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+HTTP_IDLE_TIMEOUT = float(os.environ.get("HTTP_IDLE_TIMEOUT", "15"))
+HTTP_REQUEST_TIMEOUT = float(os.environ.get("HTTP_REQUEST_TIMEOUT", "60"))
+HTTP_MAX_DRAIN_BYTES = 1024 * 1024
+SERVER_MODE = os.environ.get("SERVER_MODE", "threading").strip().lower()
+HTTP_WORKERS = max(1, int(os.environ.get("HTTP_WORKERS", "16")))
+HTTP_BACKLOG = max(1, int(os.environ.get("HTTP_BACKLOG", "64")))
+HTTP_RETRY_AFTER = max(1, int(os.environ.get("HTTP_RETRY_AFTER", "1")))
+ASYNC_EXECUTOR_WORKERS = max(1, int(os.environ.get("ASYNC_EXECUTOR_WORKERS", "8")))
+ASYNC_MAX_BODY_BYTES = 32 * 1024 * 1024
+WORKERS = max(1, int(os.environ.get("WORKERS", "1")))
+LAYER_EVENT_LOG_SIZE = max(1, int(os.environ.get("LAYER_EVENT_LOG_SIZE", "1000")))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.environ.get("SSE_MAX_STREAM_SECONDS", "300"))
+SSE_RETRY_MS = 3000
+SSE_POLL_SECONDS = float(os.environ.get("SSE_POLL_SECONDS", "1"))
+SSE_MAX_PENDING_BYTES = 256 * 1024
+WORKER_RESPAWN_DELAY = 1.0
+WORKER_READY_TIMEOUT = 30.0
+WORKER_DRAIN_TIMEOUT = float(os.environ.get("WORKER_DRAIN_TIMEOUT", "30"))
+IMPORT_CONCURRENCY = max(1, int(os.environ.get("IMPORT_CONCURRENCY", "8")))
+FETCH_PER_HOST_LIMIT = max(1, int(os.environ.get("FETCH_PER_HOST_LIMIT", "4")))
+FETCH_TIMEOUT_SECONDS = 15
+FETCH_RETRIES = max(0, int(os.environ.get("FETCH_RETRIES", "2")))
+FETCH_RETRY_BACKOFF_SECONDS = float(os.environ.get("FETCH_RETRY_BACKOFF_SECONDS", "0.5"))
+FETCH_MAX_REDIRECTS = 5
+FETCH_IDLE_SECONDS = 30.0
+FETCH_REDIRECT_STATUSES = (
+    HTTPStatus.MOVED_PERMANENTLY,
+    HTTPStatus.FOUND,
+    HTTPStatus.SEE_OTHER,
+    HTTPStatus.TEMPORARY_REDIRECT,
+    HTTPStatus.PERMANENT_REDIRECT,
+)
+FETCH_RETRY_STATUSES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+JOB_BATCH_SIZE = max(1, int(os.environ.get("JOB_BATCH_SIZE", "25")))
+JOB_POLL_SECONDS = 5.0
+JOB_STALE_SECONDS = 300
+JOB_HEARTBEAT_SECONDS = JOB_STALE_SECONDS / 10
+JOB_OWNER_BOOT_ID = secrets.token_hex(4)
+JOB_RETENTION_DAYS = 30
+COORDINATE_REFRESH_MODES = ("all", "missing", "older_than", "ids")
+COORDINATE_REFRESH_DEFAULT_DAYS = 30
+COORDINATE_REFRESH_MAX_IDS = 10_000
+HTTP_CACHE_TTL_SECONDS = int(os.environ.get("HTTP_CACHE_TTL_SECONDS", "86400"))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+HTTP_CACHE_TOUCH_SECONDS = 60
+DB_PRAGMA_PROFILE = os.environ.get("DB_PRAGMA_PROFILE", "tuned").strip().lower()
+
+TUNED_DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": "134217728",
+    "cache_size": "-16000",
+    "temp_store": "MEMORY",
+}
+DB_PRAGMA_ENV = {
+    "journal_mode": "DB_JOURNAL_MODE",
+    "synchronous": "DB_SYNCHRONOUS",
+    "mmap_size": "DB_MMAP_SIZE",
+    "cache_size": "DB_CACHE_SIZE",
+    "temp_store": "DB_TEMP_STORE",
+}
+
+
+def load_db_pragmas() -> dict[str, str]:
+    if DB_PRAGMA_PROFILE in ("off", "none", "default", "0", "false", "no"):
+        pragmas = {}
+    else:
+        pragmas = dict(TUNED_DB_PRAGMAS)
+    for name, env_name in DB_PRAGMA_ENV.items():
+        value = os.environ.get(env_name, "").strip()
+        if not value:
+            continue
+        if not re.fullmatch(r"-?[A-Za-z0-9_]+", value):
+            print(f"Ignoring invalid {env_name}={value!r}")
+            continue
+        pragmas[name] = value
+    return pragmas
+
+
+DB_PRAGMAS = load_db_pragmas()
 
 FEELINGS_LAYER_KEY = "feelings"
 CITY_BUILDINGS_LAYER_KEY = "city_buildings"
@@ -42,6 +152,38 @@ CZECH_BOUNDS = {
     "east": 18.95,
 }
 
+TILE_SIZE = 256
+MAX_ZOOM = 22
+MAX_MERCATOR_LAT = 85.05112878
+POINTS_DETAIL_ZOOM = 14
+POINTS_THIN_CELL_PX = 8
+METERS_PER_DEGREE_LAT = 111320
+HEXBIN_DEFAULT_RADIUS_M = 56
+HEXBIN_MIN_RADIUS_M = 10
+HEXBIN_MAX_RADIUS_M = 5000
+HEXBIN_MAX_CELLS = 250_000
+PAGE_MAX_LIMIT = 1000
+USER_ROLE_RANK_SQL = "CASE role WHEN 'admin' THEN 0 WHEN 'moderator' THEN 1 ELSE 2 END"
+HEXBIN_CACHE_SIZE = 64
+TILE_CACHE_SIZE = max(1, int(os.environ.get("TILE_CACHE_SIZE", "1024")))
+CLUSTER_CELL_PX = 64
+LISTING_CACHE_SIZE = 32
+LISTING_CACHE_MAX_ROWS = int(os.environ.get("LISTING_CACHE_MAX_ROWS", "50000"))
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+LISTING_STREAM_SPOOL = os.environ.get("LISTING_STREAM_SPOOL", "0").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+COLUMNAR_MEDIA_TYPE = "application/vnd.pocitova-mapa.columnar+json"
+COLUMNAR_FLAG_KEYS = ("is_owner", "can_edit", "can_delete")
+LAYER_POINT_TOMBSTONE_RETENTION_DAYS = max(
+    1, int(os.environ.get("LAYER_POINT_TOMBSTONE_RETENTION_DAYS", "30"))
+)
+GZIP_CACHE_SIZE = 64
+STATIC_PRECOMPRESS_EXTENSIONS = (".html", ".js", ".css")
+
 DEFAULT_LAYERS = [
     {
         "key": FEELINGS_LAYER_KEY,
@@ -63,22 +205,36 @@ DEFAULT_LAYERS = [
 
 
 def init_db() -> None:
+    global data_epoch
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     try:
-        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        apply_journal_mode(conn)
         conn.execute(create_users_table_sql())
         conn.execute(create_pins_table_sql())
         conn.execute(create_layers_table_sql())
         conn.execute(create_layer_points_table_sql())
+        conn.execute(create_layer_point_tombstones_table_sql())
         conn.execute(create_city_building_parcels_table_sql())
+        conn.execute(create_app_meta_table_sql())
+        conn.execute(create_jobs_table_sql())
+        conn.execute(create_http_cache_table_sql())
+        ensure_table_indexes(conn, "http_cache", HTTP_CACHE_INDEXES)
+        ensure_http_cache_size_tracking(conn)
         migrate_pins_table(conn)
         migrate_layers_table(conn)
         migrate_layer_points_table(conn)
         migrate_city_building_parcels_table(conn)
+        ensure_table_indexes(conn, "users", USERS_INDEXES)
+        apply_schema_migrations(conn)
+        ensure_spatial_indexes(conn)
+        data_epoch = ensure_data_epoch(conn)
+        ensure_layer_point_change_tracking(conn)
         ensure_default_layers(conn)
         migrate_pins_to_layer_points(conn)
         seed_from_file_if_needed(conn)
+        requeue_interrupted_jobs(conn)
         conn.commit()
     finally:
         conn.close()
@@ -99,6 +255,56 @@ def create_users_table_sql() -> str:
     """
 
 
+def create_app_meta_table_sql() -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS app_meta (
+          key TEXT PRIMARY KEY,
+          value TEXT NOT NULL
+        )
+    """
+
+
+def create_jobs_table_sql() -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS jobs (
+          id TEXT PRIMARY KEY,
+          kind TEXT NOT NULL,
+          status TEXT NOT NULL DEFAULT 'queued'
+            CHECK (status IN ('queued', 'running', 'done', 'failed')),
+          payload_json TEXT NOT NULL,
+          result_json TEXT,
+          total INTEGER NOT NULL DEFAULT 0,
+          position INTEGER NOT NULL DEFAULT 0,
+          started_position INTEGER NOT NULL DEFAULT 0,
+          done INTEGER NOT NULL DEFAULT 0,
+          failed INTEGER NOT NULL DEFAULT 0,
+          skipped INTEGER NOT NULL DEFAULT 0,
+          error TEXT,
+          owner TEXT,
+          created_by_user_id TEXT,
+          created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          started_at TEXT,
+          updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          finished_at TEXT
+        )
+    """
+
+
+def create_http_cache_table_sql() -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS http_cache (
+          url TEXT PRIMARY KEY,
+          body BLOB NOT NULL,
+          content_type TEXT NOT NULL DEFAULT '',
+          etag TEXT,
+          last_modified TEXT,
+          size INTEGER NOT NULL,
+          fetched_at REAL NOT NULL,
+          last_used_at REAL NOT NULL
+        )
+    """
+
+
 def create_pins_table_sql() -> str:
     return """
         CREATE TABLE IF NOT EXISTS pins (
@@ -125,6 +331,8 @@ def create_layers_table_sql() -> str:
           allow_user_points INTEGER NOT NULL DEFAULT 0,
           is_enabled INTEGER NOT NULL DEFAULT 1,
           sort_order INTEGER NOT NULL DEFAULT 100,
+          data_version INTEGER NOT NULL DEFAULT 0,
+          data_updated_at TEXT,
           created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
           updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
@@ -148,12 +356,26 @@ def create_layer_points_table_sql() -> str:
           created_from_ip TEXT,
           created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
           updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          change_seq INTEGER NOT NULL DEFAULT 0,
+          created_seq INTEGER NOT NULL DEFAULT 0,
           FOREIGN KEY (layer_key) REFERENCES layers(key),
           FOREIGN KEY (created_by_user_id) REFERENCES users(id)
         )
     """
 
 
+def create_layer_point_tombstones_table_sql() -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS layer_point_tombstones (
+          layer_key TEXT NOT NULL,
+          id TEXT NOT NULL,
+          change_seq INTEGER NOT NULL,
+          deleted_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (layer_key, id)
+        )
+    """
+
+
 def create_city_building_parcels_table_sql() -> str:
     return """
         CREATE TABLE IF NOT EXISTS city_building_parcels (
@@ -169,7 +391,8 @@ def create_city_building_parcels_table_sql() -> str:
           lng REAL,
           has_building INTEGER NOT NULL DEFAULT 1,
           imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-          updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+          updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          coordinates_checked_at TEXT
         )
     """
 
@@ -230,6 +453,10 @@ def migrate_layers_table(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE layers ADD COLUMN is_enabled INTEGER NOT NULL DEFAULT 1")
     if "sort_order" not in columns:
         conn.execute("ALTER TABLE layers ADD COLUMN sort_order INTEGER NOT NULL DEFAULT 100")
+    if "data_version" not in columns:
+        conn.execute("ALTER TABLE layers ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+    if "data_updated_at" not in columns:
+        conn.execute("ALTER TABLE layers ADD COLUMN data_updated_at TEXT")
 
 
 def migrate_layer_points_table(conn: sqlite3.Connection) -> None:
@@ -260,6 +487,16 @@ def migrate_layer_points_table(conn: sqlite3.Connection) -> None:
         )
     if "created_from_ip" not in columns:
         conn.execute("ALTER TABLE layer_points ADD COLUMN created_from_ip TEXT")
+    if "change_seq" not in columns:
+        conn.execute(
+            "ALTER TABLE layer_points ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
+        )
+    if "created_seq" not in columns:
+        conn.execute(
+            "ALTER TABLE layer_points ADD COLUMN created_seq INTEGER NOT NULL DEFAULT 0"
+        )
+    ensure_table_indexes(conn, "layer_points", LAYER_POINTS_INDEXES)
+    ensure_table_indexes(conn, "layer_point_tombstones", LAYER_POINT_TOMBSTONES_INDEXES)
 
 
 def migrate_city_building_parcels_table(conn: sqlite3.Connection) -> None:
@@ -312,6 +549,8 @@ def migrate_city_building_parcels_table(conn: sqlite3.Connection) -> None:
         conn.execute(
             "ALTER TABLE city_building_parcels ADD COLUMN updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP"
         )
+    if "coordinates_checked_at" not in columns:
+        conn.execute("ALTER TABLE city_building_parcels ADD COLUMN coordinates_checked_at TEXT")
 
     # Legacy migration from older builds that stored only EPSG:2065 coordinates.
     has_legacy_krovak = "krovak_y" in columns and "krovak_x" in columns
@@ -349,6 +588,10 @@ def migrate_city_building_parcels_table(conn: sqlite3.Connection) -> None:
             """
         )
 
+    ensure_table_indexes(conn, "city_building_parcels", CITY_BUILDING_PARCELS_INDEXES)
+
+
+def normalize_city_building_parcels(conn: sqlite3.Connection) -> None:
     rows_to_normalize = conn.execute(
         """
         SELECT id, object_type, street, address
@@ -376,6 +619,396 @@ def migrate_city_building_parcels_table(conn: sqlite3.Connection) -> None:
             )
 
 
+LAYER_POINTS_INDEXES = {
+    "idx_layer_points_layer_created_v2": """
+        CREATE INDEX IF NOT EXISTS idx_layer_points_layer_created_v2
+        ON layer_points (layer_key, created_at, id)
+    """,
+    "idx_layer_points_layer_change_seq_v1": """
+        CREATE INDEX IF NOT EXISTS idx_layer_points_layer_change_seq_v1
+        ON layer_points (layer_key, change_seq)
+    """,
+}
+
+LAYER_POINT_TOMBSTONES_INDEXES = {
+    "idx_layer_point_tombstones_layer_change_seq_v1": """
+        CREATE INDEX IF NOT EXISTS idx_layer_point_tombstones_layer_change_seq_v1
+        ON layer_point_tombstones (layer_key, change_seq)
+    """,
+}
+
+CITY_BUILDING_PARCELS_INDEXES = {
+    "idx_city_building_parcels_updated_label_v2": """
+        CREATE INDEX IF NOT EXISTS idx_city_building_parcels_updated_label_v2
+        ON city_building_parcels (updated_at DESC, parcel_label COLLATE NOCASE, id)
+    """,
+    "idx_city_building_parcels_building_updated_v2": """
+        CREATE INDEX IF NOT EXISTS idx_city_building_parcels_building_updated_v2
+        ON city_building_parcels (has_building, updated_at DESC, parcel_label COLLATE NOCASE, id)
+    """,
+    "idx_city_building_parcels_coordinates_checked_v1": """
+        CREATE INDEX IF NOT EXISTS idx_city_building_parcels_coordinates_checked_v1
+        ON city_building_parcels (coordinates_checked_at)
+    """,
+}
+
+HTTP_CACHE_INDEXES = {
+    "idx_http_cache_last_used_v1": """
+        CREATE INDEX IF NOT EXISTS idx_http_cache_last_used_v1
+        ON http_cache (last_used_at)
+    """,
+}
+
+USERS_INDEXES = {
+    "idx_users_role_email_v1": f"""
+        CREATE INDEX IF NOT EXISTS idx_users_role_email_v1
+        ON users (({USER_ROLE_RANK_SQL}), email COLLATE NOCASE, id)
+    """,
+}
+
+
+def ensure_table_indexes(
+    conn: sqlite3.Connection, table_name: str, indexes: dict[str, str]
+) -> None:
+    # Index names carry a version suffix; bumping it drops the old definition.
+    existing = {
+        row["name"]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+            (table_name,),
+        ).fetchall()
+    }
+    managed_prefix = f"idx_{table_name}_"
+    for name in existing:
+        if name.startswith(managed_prefix) and name not in indexes:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, create_sql in indexes.items():
+        if name not in existing:
+            conn.execute(create_sql)
+
+
+SPATIAL_INDEXES = {
+    "layer_points": "layer_points_rtree",
+    "city_building_parcels": "city_building_parcels_rtree",
+}
+spatial_index_state: bool | None = None
+data_epoch = "0"
+
+
+def spatial_index_in_sync(conn: sqlite3.Connection, table_name: str, rtree_name: str) -> bool:
+    indexed = conn.execute(f"SELECT COUNT(*) FROM {rtree_name}").fetchone()[0]
+    row = conn.execute(
+        f"""
+        SELECT COUNT(*) AS total,
+               SUM(EXISTS (
+                 SELECT 1 FROM {rtree_name} AS r
+                 WHERE r.id = t.rowid
+                   AND r.min_lat <= t.lat AND r.max_lat >= t.lat
+                   AND r.min_lng <= t.lng AND r.max_lng >= t.lng
+               )) AS matched
+        FROM {table_name} AS t
+        WHERE lat IS NOT NULL AND lng IS NOT NULL
+        """
+    ).fetchone()
+    return indexed == row["total"] == (row["matched"] or 0)
+
+
+def ensure_spatial_indexes(conn: sqlite3.Connection) -> None:
+    # R*Tree entries point at the table rowid, which VACUUM may renumber for
+    # tables with a TEXT primary key, so a mismatching index is rebuilt.
+    for table_name, rtree_name in SPATIAL_INDEXES.items():
+        try:
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {rtree_name}
+                USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+                """
+            )
+        except sqlite3.OperationalError as error:
+            print(f"Spatial index disabled (R*Tree unavailable): {error}")
+            return
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree_name}_ai
+            AFTER INSERT ON {table_name}
+            WHEN NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL
+            BEGIN
+              INSERT OR REPLACE INTO {rtree_name} (id, min_lat, max_lat, min_lng, max_lng)
+              VALUES (NEW.rowid, NEW.lat, NEW.lat, NEW.lng, NEW.lng);
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree_name}_au
+            AFTER UPDATE OF lat, lng ON {table_name}
+            BEGIN
+              DELETE FROM {rtree_name} WHERE id = OLD.rowid;
+              INSERT INTO {rtree_name} (id, min_lat, max_lat, min_lng, max_lng)
+              SELECT NEW.rowid, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+              WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL;
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree_name}_ad
+            AFTER DELETE ON {table_name}
+            BEGIN
+              DELETE FROM {rtree_name} WHERE id = OLD.rowid;
+            END
+            """
+        )
+        if spatial_index_in_sync(conn, table_name, rtree_name):
+            continue
+        print(f"Rebuilding spatial index {rtree_name}")
+        conn.execute(f"DELETE FROM {rtree_name}")
+        conn.execute(
+            f"""
+            INSERT INTO {rtree_name} (id, min_lat, max_lat, min_lng, max_lng)
+            SELECT rowid, lat, lat, lng, lng
+            FROM {table_name}
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+            """
+        )
+
+
+def spatial_index_enabled() -> bool:
+    # Looked up once per process: init_db only creates the R*Tree tables when
+    # the SQLite build ships the rtree module.
+    global spatial_index_state
+    if spatial_index_state is None:
+        conn = get_conn()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+                tuple(SPATIAL_INDEXES.values()),
+            ).fetchone()
+        finally:
+            conn.close()
+        spatial_index_state = row[0] == len(SPATIAL_INDEXES)
+    return spatial_index_state
+
+
+def spatial_filter_sql(
+    table_name: str, bbox: tuple[float, float, float, float]
+) -> tuple[str, str, tuple[float, ...]]:
+    south, west, north, east = bbox
+    # R*Tree stores 32-bit floats rounded outwards, so the exact range check
+    # on the base table stays in place.
+    sql = "lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?"
+    params: tuple[float, ...] = (south, north, west, east)
+    if not spatial_index_enabled():
+        return table_name, sql, params
+    rtree_name = SPATIAL_INDEXES[table_name]
+    sql = (
+        f"rowid IN (SELECT id FROM {rtree_name}"
+        " WHERE max_lat >= ? AND min_lat <= ? AND max_lng >= ? AND min_lng <= ?)"
+        f" AND {sql}"
+    )
+    # NOT INDEXED keeps the planner on rowid lookups driven by the R*Tree
+    # instead of walking the whole layer through the listing index.
+    return f"{table_name} NOT INDEXED", sql, (south, north, west, east) + params
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    parts = [part.strip() for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be south,west,north,east")
+    south, west, north, east = (float(part) for part in parts)
+    if not all(math.isfinite(number) for number in (south, west, north, east)):
+        raise ValueError("bbox must be finite")
+    if south > north or west > east:
+        raise ValueError("bbox must be south,west,north,east")
+    return south, west, north, east
+
+
+def parse_zoom(value: str) -> int:
+    zoom = int(value)
+    if zoom < 0 or zoom > MAX_ZOOM:
+        raise ValueError("zoom out of range")
+    return zoom
+
+
+def lat_lng_to_world_pixels(lat: float, lng: float, zoom: int) -> tuple[float, float]:
+    scale = TILE_SIZE * (2**zoom)
+    lat_clamped = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    sin_lat = math.sin(math.radians(lat_clamped))
+    x = (lng + 180.0) / 360.0 * scale
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def cluster_cell_rows(cells: dict[tuple[int, int], list]) -> tuple[list, list[dict]]:
+    points = []
+    clusters = []
+    for cell in sorted(cells):
+        members = cells[cell]
+        if len(members) == 1:
+            points.append(members[0])
+            continue
+        counts: dict[str, int] = {}
+        for row in members:
+            point_type = row["type"] or ""
+            counts[point_type] = counts.get(point_type, 0) + 1
+        clusters.append(
+            {
+                "lat": sum(row["lat"] for row in members) / len(members),
+                "lng": sum(row["lng"] for row in members) / len(members),
+                "count": len(members),
+                "counts": counts,
+            }
+        )
+    return points, clusters
+
+
+def cluster_points_for_zoom(rows, zoom: int) -> tuple[list, list[dict]]:
+    # Below the detail zoom, points sharing a small pixel cell are merged into
+    # a cluster with counts so no point disappears from the response.
+    if zoom >= POINTS_DETAIL_ZOOM:
+        return list(rows), []
+    cells: dict[tuple[int, int], list] = {}
+    for row in rows:
+        x, y = lat_lng_to_world_pixels(row["lat"], row["lng"], zoom)
+        cell = (int(x // POINTS_THIN_CELL_PX), int(y // POINTS_THIN_CELL_PX))
+        cells.setdefault(cell, []).append(row)
+    return cluster_cell_rows(cells)
+
+
+def parse_tile_path(path: str) -> tuple[str, int, int, int]:
+    parts = path[len("/tiles/") :].removesuffix(".json").split("/")
+    if len(parts) != 4 or not parts[0]:
+        raise ValueError("tile path must be /tiles/{layer}/{z}/{x}/{y}")
+    layer_key = parts[0]
+    zoom = parse_zoom(parts[1])
+    x, y = int(parts[2]), int(parts[3])
+    if not (0 <= x < 2**zoom and 0 <= y < 2**zoom):
+        raise ValueError("tile out of range")
+    return layer_key, zoom, x, y
+
+
+def tile_bbox(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    n = 2**zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def cluster_tile_rows(rows, zoom: int, x: int, y: int) -> tuple[list, list[dict]]:
+    # Membership is decided in pixel space so a point on a tile edge lands in
+    # exactly one tile, and cluster cells never straddle two tiles.
+    points = []
+    cells: dict[tuple[int, int], list] = {}
+    for row in rows:
+        px, py = lat_lng_to_world_pixels(row["lat"], row["lng"], zoom)
+        if int(px // TILE_SIZE) != x or int(py // TILE_SIZE) != y:
+            continue
+        if zoom >= POINTS_DETAIL_ZOOM:
+            points.append(row)
+            continue
+        cell = (int(px // CLUSTER_CELL_PX), int(py // CLUSTER_CELL_PX))
+        cells.setdefault(cell, []).append(row)
+    cell_points, clusters = cluster_cell_rows(cells)
+    return points + cell_points, clusters
+
+
+def hex_grid_for_bbox(
+    bbox: tuple[float, float, float, float], radius_m: float
+) -> dict:
+    # Flat-top hexagons in "odd-q" offset layout, anchored one step outside
+    # the bbox; this is the same grid the map client draws.
+    south, west, north, east = bbox
+    center_lat = (south + north) / 2
+    meters_per_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(center_lat))
+    lat_step = math.sqrt(3) * radius_m / METERS_PER_DEGREE_LAT
+    lng_step = 1.5 * radius_m / meters_per_lng
+    return {
+        "radius": radius_m,
+        "bbox": [south, west, north, east],
+        "origin": {"lat": south - lat_step, "lng": west - lng_step},
+        "lat_step": lat_step,
+        "lng_step": lng_step,
+        "columns": int(math.floor((east - west) / lng_step + 1e-9)) + 3,
+        "rows": int(math.floor((north - south) / lat_step + 1e-9)) + 3,
+        "meters_per_lng": meters_per_lng,
+    }
+
+
+def compute_hexbins(rows, grid: dict) -> list[dict]:
+    radius_m = grid["radius"]
+    origin_lat = grid["origin"]["lat"]
+    origin_lng = grid["origin"]["lng"]
+    meters_per_lng = grid["meters_per_lng"]
+    cells: dict[tuple[int, int], dict[str, int]] = {}
+    for row in rows:
+        x = (row["lng"] - origin_lng) * meters_per_lng
+        y = (row["lat"] - origin_lat) * METERS_PER_DEGREE_LAT
+        q = (2 / 3 * x) / radius_m
+        r = (-1 / 3 * x + math.sqrt(3) / 3 * y) / radius_m
+        s = -q - r
+        rq, rr, rs = round(q), round(r), round(s)
+        dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+        if dq > dr and dq > ds:
+            rq = -rr - rs
+        elif dr > ds:
+            rr = -rq - rs
+        col = rq
+        cell_row = rr + (rq - (rq & 1)) // 2
+        if not (0 <= col < grid["columns"] and 0 <= cell_row < grid["rows"]):
+            continue
+        counts = cells.setdefault((col, cell_row), {})
+        point_type = row["type"] or ""
+        counts[point_type] = counts.get(point_type, 0) + 1
+
+    result = []
+    for (col, cell_row), counts in sorted(cells.items()):
+        result.append(
+            {
+                "col": col,
+                "row": cell_row,
+                "lat": origin_lat + cell_row * grid["lat_step"] + (col & 1) * grid["lat_step"] / 2,
+                "lng": origin_lng + col * grid["lng_step"],
+                "counts": counts,
+                "total": sum(counts.values()),
+            }
+        )
+    return result
+
+
+def create_schema_version_table_sql() -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS schema_version (
+          version INTEGER PRIMARY KEY,
+          name TEXT NOT NULL,
+          applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+
+
+SCHEMA_MIGRATIONS = [
+    (1, "normalize_city_building_parcels", normalize_city_building_parcels),
+]
+
+
+def apply_schema_migrations(conn: sqlite3.Connection) -> None:
+    conn.execute(create_schema_version_table_sql())
+    applied = {
+        row["version"]
+        for row in conn.execute("SELECT version FROM schema_version").fetchall()
+    }
+    for version, name, migration in SCHEMA_MIGRATIONS:
+        if version in applied:
+            continue
+        migration(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+            (version, name),
+        )
+        print(f"Applied schema migration {version}: {name}")
+
+
 def city_building_table_has_legacy_krovak(conn: sqlite3.Connection) -> bool:
     columns = {
         row["name"]
@@ -447,109 +1080,983 @@ def migrate_pins_to_layer_points(conn: sqlite3.Connection) -> None:
     )
 
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def bump_layer_version(conn: sqlite3.Connection, layer_key: str) -> None:
+    conn.execute(
+        """
+        UPDATE layers
+        SET data_version = data_version + 1, data_updated_at = CURRENT_TIMESTAMP
+        WHERE key = ?
+        """,
+        (layer_key,),
+    )
 
-def seed_from_file_if_needed(conn: sqlite3.Connection) -> None:
-    if not SEED_IF_EMPTY:
-        return
 
-    if not SEED_FILE.exists():
-        return
+def ensure_data_epoch(conn: sqlite3.Connection) -> str:
+    # Random per-database token mixed into ETags, so a recreated database
+    # (e.g. after a redeploy on an ephemeral disk) never matches old ones.
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'data_epoch'").fetchone()
+    if row:
+        return row["value"]
+    epoch = secrets.token_hex(4)
+    conn.execute("INSERT INTO app_meta (key, value) VALUES ('data_epoch', ?)", (epoch,))
+    return epoch
 
-    try:
-        payload = json.loads(SEED_FILE.read_text(encoding="utf-8"))
-    except (OSError, json.JSONDecodeError) as error:
-        print(f"Seed skipped (cannot read {SEED_FILE}): {error}")
-        return
 
-    if not isinstance(payload, dict):
-        print(f"Seed skipped ({SEED_FILE} has invalid structure)")
-        return
+def ensure_layer_point_change_tracking(conn: sqlite3.Connection) -> None:
+    # change_seq comes from one counter in app_meta bumped by triggers, so
+    # every insert, update and delete (tombstone) gets a strictly higher value.
+    conn.execute(
+        "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('layer_points_change_seq', '0')"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('layer_points_tombstone_floor', '0')"
+    )
+    conn.execute(
+        """
+        UPDATE layer_points
+        SET change_seq = rowid + (
+          SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'layer_points_change_seq'
+        )
+        WHERE change_seq = 0
+        """
+    )
+    conn.execute(
+        """
+        UPDATE app_meta
+        SET value = CAST(MAX(
+          CAST(value AS INTEGER),
+          (SELECT COALESCE(MAX(change_seq), 0) FROM layer_points)
+        ) AS TEXT)
+        WHERE key = 'layer_points_change_seq'
+        """
+    )
+    next_seq_sql = """
+        UPDATE app_meta SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT)
+        WHERE key = 'layer_points_change_seq';
+    """
+    current_seq_sql = (
+        "(SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'layer_points_change_seq')"
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS layer_points_change_seq_ai
+        AFTER INSERT ON layer_points
+        BEGIN
+          {next_seq_sql}
+          UPDATE layer_points
+          SET change_seq = {current_seq_sql}, created_seq = {current_seq_sql}
+          WHERE rowid = NEW.rowid;
+          DELETE FROM layer_point_tombstones WHERE layer_key = NEW.layer_key AND id = NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS layer_points_change_seq_au
+        AFTER UPDATE OF layer_key, lat, lng, title, description, data_json, type, comment,
+                        created_by_name, updated_at ON layer_points
+        BEGIN
+          {next_seq_sql}
+          UPDATE layer_points SET change_seq = {current_seq_sql} WHERE rowid = NEW.rowid;
+          INSERT OR REPLACE INTO layer_point_tombstones (layer_key, id, change_seq)
+          SELECT OLD.layer_key, OLD.id, {current_seq_sql}
+          WHERE OLD.layer_key != NEW.layer_key;
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS layer_points_change_seq_ad
+        AFTER DELETE ON layer_points
+        BEGIN
+          {next_seq_sql}
+          INSERT OR REPLACE INTO layer_point_tombstones (layer_key, id, change_seq)
+          VALUES (OLD.layer_key, OLD.id, {current_seq_sql});
+        END
+        """
+    )
+    cutoff = f"-{LAYER_POINT_TOMBSTONE_RETENTION_DAYS} days"
+    conn.execute(
+        """
+        UPDATE app_meta
+        SET value = CAST(MAX(
+          CAST(value AS INTEGER),
+          (
+            SELECT COALESCE(MAX(change_seq), 0) FROM layer_point_tombstones
+            WHERE deleted_at < datetime('now', ?)
+          )
+        ) AS TEXT)
+        WHERE key = 'layer_points_tombstone_floor'
+        """,
+        (cutoff,),
+    )
+    conn.execute(
+        "DELETE FROM layer_point_tombstones WHERE deleted_at < datetime('now', ?)",
+        (cutoff,),
+    )
 
-    for layer in payload.get("layers", []):
-        if not is_valid_seed_layer(layer):
-            continue
+
+def ensure_http_cache_size_tracking(conn: sqlite3.Connection) -> None:
+    # The total body size lives in app_meta and is kept current by triggers,
+    # so storing an entry never has to SUM the whole table.
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO app_meta (key, value)
+        SELECT 'http_cache_bytes', CAST(COALESCE(SUM(size), 0) AS TEXT) FROM http_cache
+        """
+    )
+    add_bytes_sql = """
+        UPDATE app_meta SET value = CAST(CAST(value AS INTEGER) + ({delta}) AS TEXT)
+        WHERE key = 'http_cache_bytes';
+    """
+    for name, event, delta in (
+        ("http_cache_bytes_ai", "AFTER INSERT ON http_cache", "NEW.size"),
+        ("http_cache_bytes_au", "AFTER UPDATE OF size ON http_cache", "NEW.size - OLD.size"),
+        ("http_cache_bytes_ad", "AFTER DELETE ON http_cache", "-OLD.size"),
+    ):
         conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            BEGIN
+              {add_bytes_sql.format(delta=delta)}
+            END
             """
-            INSERT INTO layers (key, name, kind, allow_user_points, is_enabled, sort_order)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET
-              name = excluded.name,
-              kind = excluded.kind,
-              allow_user_points = excluded.allow_user_points,
-              is_enabled = excluded.is_enabled,
-              sort_order = excluded.sort_order,
-              updated_at = CURRENT_TIMESTAMP
-            """,
-            (
-                layer["key"].strip(),
-                layer["name"].strip(),
-                str(layer.get("kind", "static"))[:40],
-                int(bool(layer.get("allow_user_points", False))),
-                int(bool(layer.get("is_enabled", True))),
-                int(layer.get("sort_order", 100)),
-            ),
         )
 
-    inserted = 0
 
-    feelings_count = conn.execute(
-        "SELECT COUNT(*) AS c FROM layer_points WHERE layer_key = ?",
-        (FEELINGS_LAYER_KEY,),
-    ).fetchone()["c"]
-    pins = payload.get("pins")
-    if isinstance(pins, list) and feelings_count == 0:
-        for pin in pins:
-            if not is_valid_seed_pin(pin):
-                continue
-            data_json = safe_json_dump(pin.get("data"))
-            conn.execute(
-                """
-                INSERT OR IGNORE INTO layer_points (
-                    id, layer_key, lat, lng, type, comment,
-                    created_by_name, data_json
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    pin["id"].strip(),
-                    FEELINGS_LAYER_KEY,
-                    float(pin["lat"]),
-                    float(pin["lng"]),
-                    pin["type"].strip(),
-                    str(pin.get("comment", ""))[:300],
-                    str(pin.get("created_by_name", "Seed data"))[:80],
-                    data_json,
-                ),
-            )
-            inserted += 1
+def read_app_meta_int(conn: sqlite3.Connection, key: str) -> int:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    try:
+        return int(row["value"]) if row else 0
+    except ValueError:
+        return 0
 
-    points = payload.get("points")
-    if isinstance(points, dict):
-        for layer_key, point_list in points.items():
-            if not isinstance(layer_key, str) or not isinstance(point_list, list):
-                continue
-            layer_count = conn.execute(
-                "SELECT COUNT(*) AS c FROM layer_points WHERE layer_key = ?",
-                (layer_key.strip(),),
-            ).fetchone()["c"]
-            if layer_count > 0:
-                continue
-            for point in point_list:
-                if not is_valid_seed_point(point):
-                    continue
-                conn.execute(
-                    """
-                    INSERT OR IGNORE INTO layer_points (
-                        id, layer_key, lat, lng, title, description, data_json,
-                        type, comment, created_by_name
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
+
+def parse_page_limit(value: str) -> int:
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if not 1 <= limit <= PAGE_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {PAGE_MAX_LIMIT}")
+    return limit
+
+
+def encode_page_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def paginate_rows(rows: list, limit: int | None, cursor_values) -> tuple[list, str | None]:
+    # Queries fetch limit + 1 rows; the extra one only signals a next page.
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_page_cursor(cursor_values(rows[-1]))
+
+
+def layer_point_cursor_values(row) -> list:
+    return [row["created_at"], row["id"]]
+
+
+def city_building_cursor_values(row) -> list:
+    return [row["updated_at"], row["parcel_label"], row["id"]]
+
+
+def city_building_keyset_sql(after: list | None) -> tuple[str, tuple]:
+    if not after:
+        return "", ()
+    updated_at, parcel_label, parcel_id = after
+    return (
+        " AND updated_at <= ?"
+        " AND (updated_at < ? OR (parcel_label COLLATE NOCASE, id) > (?, ?))",
+        (updated_at, updated_at, parcel_label, parcel_id),
+    )
+
+
+def format_sync_cursor(change_seq: int) -> str:
+    return f"{data_epoch}.{change_seq}"
+
+
+def parse_sync_cursor(cursor: str) -> int | None:
+    epoch, _, change_seq = cursor.strip().partition(".")
+    if epoch != data_epoch or not change_seq.isdigit():
+        return None
+    return int(change_seq)
+
+
+def layer_etag(layer, *parts: str) -> str:
+    variant = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+    return f'"{data_epoch}-{layer["key"]}-{layer["data_version"]}-{variant}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{data_epoch}-{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def gzip_etag(etag: str) -> str:
+    # The gzip body is a different byte sequence, so it needs its own strong tag.
+    return f'{etag[:-1]}-gz"'
+
+
+class PooledConnection(sqlite3.Connection):
+    pool: "ConnectionPool | None" = None
+    checked_out = False
+
+    def close(self) -> None:
+        # Idempotent, so a handler may hand its connection back early and
+        # still close it again in its finally block.
+        pool = self.pool
+        if pool is None:
+            super().close()
+            return
+        if not self.checked_out:
+            return
+        self.checked_out = False
+        pool.release(self)
+
+    def close_for_real(self) -> None:
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, db_path: Path, size: int) -> None:
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.idle: queue.LifoQueue[PooledConnection] = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+        )
+        configure_connection(conn)
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+                conn.checked_out = True
+                return conn
+            if self.is_healthy(conn):
+                conn.checked_out = True
+                return conn
+            conn.close_for_real()
+
+    def release(self, conn: PooledConnection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.close_for_real()
+            return
+        with self.lock:
+            if self.idle.qsize() < self.size:
+                self.idle.put_nowait(conn)
+                return
+        conn.close_for_real()
+
+    def is_healthy(self, conn: PooledConnection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close_for_real()
+
+
+def configure_connection(conn: sqlite3.Connection) -> None:
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    for name, value in DB_PRAGMAS.items():
+        if name == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def apply_journal_mode(conn: sqlite3.Connection) -> None:
+    journal_mode = DB_PRAGMAS.get("journal_mode")
+    if not journal_mode:
+        return
+    row = conn.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()
+    active_mode = str(row[0]).lower() if row else ""
+    if active_mode != journal_mode.lower():
+        print(f"SQLite journal_mode {journal_mode} not applied (active: {active_mode})")
+
+
+_connection_pool: ConnectionPool | None = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    global _connection_pool
+    with _connection_pool_lock:
+        if _connection_pool is None or _connection_pool.db_path != DB_PATH:
+            if _connection_pool is not None:
+                _connection_pool.close_all()
+            _connection_pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+        return _connection_pool
+
+
+def get_conn() -> sqlite3.Connection:
+    return get_connection_pool().acquire()
+
+
+class LRUCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+hexbin_cache = LRUCache(HEXBIN_CACHE_SIZE)
+tile_cache = LRUCache(TILE_CACHE_SIZE)
+listing_cache = LRUCache(LISTING_CACHE_SIZE)
+layer_point_count_cache = LRUCache(LISTING_CACHE_SIZE)
+
+
+def format_sse_event(event_id: str, event_type: str, data: bytes) -> bytes:
+    return f"id: {event_id}\nevent: {event_type}\ndata: ".encode("ascii") + data + b"\n\n"
+
+
+def load_layer_point_events(
+    conn: sqlite3.Connection, layer_key: str, since_seq: int, current_seq: int, serialize
+) -> bytes | None:
+    # Returns the encoded create/update/delete events in (since_seq, current_seq],
+    # or None when the client has to reload: tombstones were pruned or the gap
+    # is longer than LAYER_EVENT_LOG_SIZE. A point inserted after since_seq is a
+    # "create" even if it was edited again before this poll.
+    if since_seq < read_app_meta_int(conn, "layer_points_tombstone_floor"):
+        return None
+    rows = conn.execute(
+        """
+        SELECT id, layer_key, lat, lng, title, description, data_json, type, comment,
+               created_by_user_id, created_by_name, created_from_ip, created_at,
+               change_seq, created_seq
+        FROM layer_points
+        WHERE layer_key = ? AND change_seq > ? AND change_seq <= ?
+        ORDER BY change_seq ASC
+        LIMIT ?
+        """,
+        (layer_key, since_seq, current_seq, LAYER_EVENT_LOG_SIZE + 1),
+    ).fetchall()
+    tombstones = conn.execute(
+        """
+        SELECT id, change_seq FROM layer_point_tombstones
+        WHERE layer_key = ? AND change_seq > ? AND change_seq <= ?
+        ORDER BY change_seq ASC
+        LIMIT ?
+        """,
+        (layer_key, since_seq, current_seq, LAYER_EVENT_LOG_SIZE + 1),
+    ).fetchall()
+    if len(rows) + len(tombstones) > LAYER_EVENT_LOG_SIZE:
+        return None
+    events = [
+        (
+            row["change_seq"],
+            "create" if row["created_seq"] > since_seq else "update",
+            {"id": row["id"], "point": serialize(row)},
+        )
+        for row in rows
+    ] + [(row["change_seq"], "delete", {"id": row["id"]}) for row in tombstones]
+    events.sort(key=lambda event: event[0])
+    return b"".join(
+        format_sse_event(format_sync_cursor(seq), event_type, encode_json(payload))
+        for seq, event_type, payload in events
+    )
+
+
+class SocketEventStream:
+    def __init__(self, sock: socket.socket) -> None:
+        sock.setblocking(False)
+        self.sock = sock
+        self.pending = b""
+
+    def send(self, data: bytes) -> bool:
+        self.pending += data
+        try:
+            while self.pending:
+                sent = self.sock.send(self.pending)
+                self.pending = self.pending[sent:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            return False
+        return len(self.pending) <= SSE_MAX_PENDING_BYTES
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class LoopEventStream:
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter) -> None:
+        self.loop = loop
+        self.writer = writer
+
+    def send(self, data: bytes) -> bool:
+        transport = self.writer.transport
+        if transport.is_closing():
+            return False
+        if data:
+            self.loop.call_soon_threadsafe(self.writer.write, data)
+        return transport.get_write_buffer_size() <= SSE_MAX_PENDING_BYTES
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class LayerEventSubscription:
+    def __init__(self, stream, layer_key: str, seq: int, serialize) -> None:
+        self.stream = stream
+        self.layer_key = layer_key
+        self.seq = seq
+        self.serialize = serialize
+        now = time.monotonic()
+        self.next_heartbeat = now + SSE_HEARTBEAT_SECONDS
+        self.deadline = now + SSE_MAX_STREAM_SECONDS
+
+
+class LayerEventFeed:
+    # One thread per process owns every open SSE stream. It follows the
+    # layer_points change_seq counter in the database, so writes made by other
+    # WORKERS processes reach the stream too; local writes only wake it early.
+    def __init__(self) -> None:
+        self.subscriptions: list[LayerEventSubscription] = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def subscribe(self, subscription: LayerEventSubscription) -> None:
+        with self.lock:
+            self.subscriptions.append(subscription)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.loop, name="layer-events", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def notify(self) -> None:
+        self.wakeup.set()
+
+    def loop(self) -> None:
+        while True:
+            self.wakeup.wait(SSE_POLL_SECONDS)
+            self.wakeup.clear()
+            with self.lock:
+                subscriptions = list(self.subscriptions)
+            if not subscriptions:
+                continue
+            try:
+                closed = self.dispatch(subscriptions)
+            except Exception:
+                traceback.print_exc()
+                continue
+            if closed:
+                with self.lock:
+                    self.subscriptions = [
+                        item for item in self.subscriptions if item not in closed
+                    ]
+                for subscription in closed:
+                    subscription.stream.close()
+
+    def dispatch(self, subscriptions: list[LayerEventSubscription]) -> list:
+        conn = get_conn()
+        try:
+            current_seq = read_app_meta_int(conn, "layer_points_change_seq")
+            batches: dict[tuple[str, int], bytes | None] = {}
+            for subscription in subscriptions:
+                key = (subscription.layer_key, subscription.seq)
+                if subscription.seq < current_seq and key not in batches:
+                    batches[key] = load_layer_point_events(
+                        conn, subscription.layer_key, subscription.seq, current_seq,
+                        subscription.serialize,
+                    )
+        finally:
+            conn.close()
+
+        now = time.monotonic()
+        closed = []
+        for subscription in subscriptions:
+            data = b""
+            if subscription.seq < current_seq:
+                data = batches[(subscription.layer_key, subscription.seq)]
+                if data is None:
+                    data = format_sse_event(format_sync_cursor(current_seq), "reset", b"{}")
+                subscription.seq = current_seq
+            if not data and now >= subscription.next_heartbeat:
+                data = b": ping\n\n"
+            if data:
+                subscription.next_heartbeat = now + SSE_HEARTBEAT_SECONDS
+            if not subscription.stream.send(data) or now >= subscription.deadline:
+                closed.append(subscription)
+        return closed
+
+
+layer_event_feed = LayerEventFeed()
+detached_connections: set = set()
+
+
+class LayerClusterIndex:
+    # One grid of CLUSTER_CELL_PX cells per zoom below POINTS_DETAIL_ZOOM,
+    # kept up to date point by point; above that every point is its own cluster.
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.version: int | None = None
+        self.change_seq = 0
+        self.points: dict[str, tuple[float, float, str]] = {}
+        self.levels: list[dict[tuple[int, int], list]] = [
+            {} for _ in range(POINTS_DETAIL_ZOOM)
+        ]
+
+    def reset(self) -> None:
+        self.points = {}
+        self.levels = [{} for _ in range(POINTS_DETAIL_ZOOM)]
+
+    def point_cells(self, lat: float, lng: float):
+        x, y = lat_lng_to_world_pixels(lat, lng, 0)
+        for zoom, cells in enumerate(self.levels):
+            scale = 2**zoom / CLUSTER_CELL_PX
+            yield cells, (int(x * scale), int(y * scale))
+
+    def add(
+        self, point_id: str, lat: float | None, lng: float | None, point_type: str
+    ) -> None:
+        self.remove(point_id)
+        if lat is None or lng is None:
+            # A point whose coordinates were cleared drops out of the grid.
+            return
+        self.points[point_id] = (lat, lng, point_type)
+        for cells, cell in self.point_cells(lat, lng):
+            entry = cells.get(cell)
+            if entry is None:
+                entry = cells[cell] = [0.0, 0.0, {}, set()]
+            entry[0] += lat
+            entry[1] += lng
+            entry[2][point_type] = entry[2].get(point_type, 0) + 1
+            entry[3].add(point_id)
+
+    def remove(self, point_id: str) -> None:
+        point = self.points.pop(point_id, None)
+        if point is None:
+            return
+        lat, lng, point_type = point
+        for cells, cell in self.point_cells(lat, lng):
+            entry = cells[cell]
+            entry[3].discard(point_id)
+            if not entry[3]:
+                del cells[cell]
+                continue
+            entry[0] -= lat
+            entry[1] -= lng
+            entry[2][point_type] -= 1
+            if entry[2][point_type] == 0:
+                del entry[2][point_type]
+
+    def sync(self, conn: sqlite3.Connection, layer) -> None:
+        # Caller holds self.lock. layer_points layers catch up through the
+        # change_seq log; city parcels have no log and are rebuilt.
+        if self.version == layer["data_version"]:
+            return
+        if layer["key"] == CITY_BUILDINGS_LAYER_KEY:
+            self.reset()
+            for row in conn.execute(
+                "SELECT id, lat, lng FROM city_building_parcels "
+                "WHERE has_building = 1 AND lat IS NOT NULL AND lng IS NOT NULL"
+            ):
+                self.add(row["id"], row["lat"], row["lng"], "")
+            self.version = layer["data_version"]
+            return
+
+        current_seq = read_app_meta_int(conn, "layer_points_change_seq")
+        if self.version is None or self.change_seq < read_app_meta_int(
+            conn, "layer_points_tombstone_floor"
+        ):
+            self.reset()
+            self.change_seq = -1
+        else:
+            for row in conn.execute(
+                "SELECT id FROM layer_point_tombstones WHERE layer_key = ? AND change_seq > ?",
+                (layer["key"], self.change_seq),
+            ):
+                self.remove(row["id"])
+        for row in conn.execute(
+            "SELECT id, lat, lng, type FROM layer_points WHERE layer_key = ? AND change_seq > ?",
+            (layer["key"], self.change_seq),
+        ):
+            self.add(row["id"], row["lat"], row["lng"], row["type"] or "")
+        self.change_seq = current_seq
+        self.version = layer["data_version"]
+
+    def query(self, zoom: int, bbox: tuple[float, float, float, float]) -> list[dict]:
+        south, west, north, east = bbox
+        if zoom >= len(self.levels):
+            return [
+                {"id": point_id, "lat": lat, "lng": lng, "count": 1, "counts": {point_type: 1}}
+                for point_id, (lat, lng, point_type) in self.points.items()
+                if south <= lat <= north and west <= lng <= east
+            ]
+
+        min_x, min_y = lat_lng_to_world_pixels(north, west, zoom)
+        max_x, max_y = lat_lng_to_world_pixels(south, east, zoom)
+        min_cell = (int(min_x // CLUSTER_CELL_PX), int(min_y // CLUSTER_CELL_PX))
+        max_cell = (int(max_x // CLUSTER_CELL_PX), int(max_y // CLUSTER_CELL_PX))
+        clusters = []
+        for cell, (lat_sum, lng_sum, counts, point_ids) in sorted(self.levels[zoom].items()):
+            if not (
+                min_cell[0] <= cell[0] <= max_cell[0] and min_cell[1] <= cell[1] <= max_cell[1]
+            ):
+                continue
+            count = len(point_ids)
+            cluster = {
+                "lat": lat_sum / count,
+                "lng": lng_sum / count,
+                "count": count,
+                "counts": dict(counts),
+            }
+            if count == 1:
+                cluster["id"] = next(iter(point_ids))
+            clusters.append(cluster)
+        return clusters
+
+
+layer_cluster_indexes: dict[str, LayerClusterIndex] = {}
+layer_cluster_indexes_lock = threading.Lock()
+
+
+def get_layer_cluster_index(layer_key: str) -> LayerClusterIndex:
+    with layer_cluster_indexes_lock:
+        index = layer_cluster_indexes.get(layer_key)
+        if index is None:
+            index = LayerClusterIndex()
+            layer_cluster_indexes[layer_key] = index
+        return index
+
+
+def encode_json(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def gzip_bytes(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+gzip_body_cache = LRUCache(GZIP_CACHE_SIZE)
+static_assets: dict[str, dict] = {}
+static_assets_lock = threading.Lock()
+
+
+def load_static_asset(url_path: str) -> dict | None:
+    name = "index.html" if url_path == "/" else url_path.removeprefix("/")
+    if not name or "/" in name or not name.endswith(STATIC_PRECOMPRESS_EXTENSIONS):
+        return None
+    file_path = ROOT / name
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    with static_assets_lock:
+        asset = static_assets.get(name)
+        if asset and asset["mtime_ns"] == stat.st_mtime_ns and asset["size"] == stat.st_size:
+            return asset
+    try:
+        raw = file_path.read_bytes()
+    except OSError:
+        return None
+    compressed = gzip_bytes(raw)
+    asset = {
+        "name": name,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "raw": raw,
+        "gzip": compressed if len(compressed) < len(raw) else None,
+        "etag": f'"{hashlib.sha1(raw).hexdigest()[:20]}"',
+        "last_modified": format_datetime(
+            datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc), usegmt=True
+        ),
+    }
+    with static_assets_lock:
+        static_assets[name] = asset
+    return asset
+
+
+def precompress_static_assets() -> None:
+    for file_path in sorted(ROOT.iterdir()):
+        if file_path.is_file():
+            load_static_asset(f"/{file_path.name}")
+
+
+def join_listing_body(list_key: str, encoded_rows: list[bytes], extra: dict | None = None) -> bytes:
+    body = b"{" + encode_json(list_key) + b": [" + b", ".join(encoded_rows) + b"]"
+    for key, value in (extra or {}).items():
+        body += b", " + encode_json(key) + b": " + encode_json(value)
+    return body + b"}"
+
+
+def columnar_row_values(item, type_codes: dict[str, int]) -> dict:
+    # "type" is dictionary-encoded and the permission booleans are packed into
+    # one bit field per row.
+    values = dict(item)
+    if "type" in values:
+        values["type"] = type_codes.setdefault(values["type"], len(type_codes))
+    if any(key in values for key in COLUMNAR_FLAG_KEYS):
+        values["flags"] = sum(
+            1 << bit for bit, key in enumerate(COLUMNAR_FLAG_KEYS) if values.pop(key, False)
+        )
+    return values
+
+
+def build_columnar_payload(list_key: str, items) -> dict:
+    # Parallel arrays per field, see columnar_row_values.
+    columns: dict[str, list] = {}
+    type_codes: dict[str, int] = {}
+    count = 0
+    for item in items:
+        values = columnar_row_values(item, type_codes)
+        for key, value in values.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * count
+            column.append(value)
+        count += 1
+        for column in columns.values():
+            if len(column) < count:
+                column.append(None)
+    return {
+        "format": "columnar",
+        "list": list_key,
+        "count": count,
+        "types": list(type_codes),
+        "flags": list(COLUMNAR_FLAG_KEYS),
+        "columns": columns,
+    }
+
+
+def iter_json_listing(list_key: str, rows, serialize_row, extra: dict | None = None):
+    yield b"{" + encode_json(list_key) + b": ["
+    separator = b""
+    for row in rows:
+        yield separator + encode_json(serialize_row(row))
+        separator = b", "
+    yield b"]"
+    for key, value in (extra or {}).items():
+        yield b", " + encode_json(key) + b": " + encode_json(value)
+    yield b"}"
+
+
+def iter_columnar_listing(list_key: str, items, extra: dict | None = None):
+    # Same document as build_columnar_payload, but each column is spooled to
+    # its own temporary file, so memory stays flat for layers of any size.
+    columns: dict[str, tempfile.SpooledTemporaryFile] = {}
+    type_codes: dict[str, int] = {}
+    count = 0
+    try:
+        for item in items:
+            values = columnar_row_values(item, type_codes)
+            for key in values:
+                if key not in columns:
+                    column = columns[key] = tempfile.SpooledTemporaryFile(
+                        max_size=STREAM_SPOOL_MEMORY_BYTES
+                    )
+                    for index in range(count):
+                        column.write(b", null" if index else b"null")
+            for key, column in columns.items():
+                if count:
+                    column.write(b", ")
+                column.write(encode_json(values[key]) if key in values else b"null")
+            count += 1
+
+        yield (
+            b'{"format": "columnar", "list": ' + encode_json(list_key)
+            + b", \"count\": " + encode_json(count)
+            + b", \"types\": " + encode_json(list(type_codes))
+            + b", \"flags\": " + encode_json(list(COLUMNAR_FLAG_KEYS))
+            + b', "columns": {'
+        )
+        separator = b""
+        for key, column in columns.items():
+            yield separator + encode_json(key) + b": ["
+            separator = b", "
+            column.seek(0)
+            while chunk := column.read(STREAM_CHUNK_SIZE):
+                yield chunk
+            yield b"]"
+        yield b"}"
+        for key, value in (extra or {}).items():
+            yield b", " + encode_json(key) + b": " + encode_json(value)
+        yield b"}"
+    finally:
+        for column in columns.values():
+            column.close()
+
+
+def build_cached_listing(
+    list_key: str, version: int, rows: list, serialize, extra: dict | None = None
+) -> dict:
+    # Rows are encoded once for anonymous viewers; a signed-in user only pays
+    # for re-encoding the rows they own (is_owner / can_edit / can_delete).
+    encoded_rows = [encode_json(serialize(row)) for row in rows]
+    owner_rows: dict[str, list[int]] = {}
+    personalized = bool(rows) and "created_by_user_id" in rows[0].keys()
+    if personalized:
+        for index, row in enumerate(rows):
+            owner_id = row["created_by_user_id"]
+            if owner_id:
+                owner_rows.setdefault(owner_id, []).append(index)
+    return {
+        "version": version,
+        "list_key": list_key,
+        "rows": rows,
+        "encoded_rows": encoded_rows,
+        "owner_rows": owner_rows,
+        "personalized": personalized,
+        "extra": extra or {},
+        "body": join_listing_body(list_key, encoded_rows, extra),
+    }
+
+
+def seed_from_file_if_needed(conn: sqlite3.Connection) -> None:
+    if not SEED_IF_EMPTY:
+        return
+
+    if not SEED_FILE.exists():
+        return
+
+    try:
+        payload = json.loads(SEED_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as error:
+        print(f"Seed skipped (cannot read {SEED_FILE}): {error}")
+        return
+
+    if not isinstance(payload, dict):
+        print(f"Seed skipped ({SEED_FILE} has invalid structure)")
+        return
+
+    for layer in payload.get("layers", []):
+        if not is_valid_seed_layer(layer):
+            continue
+        conn.execute(
+            """
+            INSERT INTO layers (key, name, kind, allow_user_points, is_enabled, sort_order)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+              name = excluded.name,
+              kind = excluded.kind,
+              allow_user_points = excluded.allow_user_points,
+              is_enabled = excluded.is_enabled,
+              sort_order = excluded.sort_order,
+              updated_at = CURRENT_TIMESTAMP
+            """,
+            (
+                layer["key"].strip(),
+                layer["name"].strip(),
+                str(layer.get("kind", "static"))[:40],
+                int(bool(layer.get("allow_user_points", False))),
+                int(bool(layer.get("is_enabled", True))),
+                int(layer.get("sort_order", 100)),
+            ),
+        )
+
+    inserted = 0
+
+    feelings_count = conn.execute(
+        "SELECT COUNT(*) AS c FROM layer_points WHERE layer_key = ?",
+        (FEELINGS_LAYER_KEY,),
+    ).fetchone()["c"]
+    pins = payload.get("pins")
+    if isinstance(pins, list) and feelings_count == 0:
+        for pin in pins:
+            if not is_valid_seed_pin(pin):
+                continue
+            data_json = safe_json_dump(pin.get("data"))
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO layer_points (
+                    id, layer_key, lat, lng, type, comment,
+                    created_by_name, data_json
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    pin["id"].strip(),
+                    FEELINGS_LAYER_KEY,
+                    float(pin["lat"]),
+                    float(pin["lng"]),
+                    pin["type"].strip(),
+                    str(pin.get("comment", ""))[:300],
+                    str(pin.get("created_by_name", "Seed data"))[:80],
+                    data_json,
+                ),
+            )
+            inserted += 1
+
+    points = payload.get("points")
+    if isinstance(points, dict):
+        for layer_key, point_list in points.items():
+            if not isinstance(layer_key, str) or not isinstance(point_list, list):
+                continue
+            layer_count = conn.execute(
+                "SELECT COUNT(*) AS c FROM layer_points WHERE layer_key = ?",
+                (layer_key.strip(),),
+            ).fetchone()["c"]
+            if layer_count > 0:
+                continue
+            for point in point_list:
+                if not is_valid_seed_point(point):
+                    continue
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO layer_points (
+                        id, layer_key, lat, lng, title, description, data_json,
+                        type, comment, created_by_name
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
                         point["id"].strip(),
                         layer_key.strip(),
                         float(point["lat"]),
@@ -737,17 +2244,246 @@ def parse_building_parcels_from_html(html_text: str, source_url: str) -> list[di
     return list(results_by_url.values())
 
 
-def fetch_remote_html(url: str) -> str:
-    request = Request(
-        url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (compatible; PocitovaMapaBot/1.0; +https://example.invalid)"
-        },
-        method="GET",
-    )
-    with urlopen(request, timeout=15) as response:
-        raw = response.read()
-        content_type = response.headers.get("Content-Type", "")
+fetch_host_slots: dict[str, threading.BoundedSemaphore] = {}
+fetch_host_slots_lock = threading.Lock()
+
+
+def fetch_host_slot(url: str) -> threading.BoundedSemaphore:
+    host = (urlparse(url).hostname or "").lower()
+    with fetch_host_slots_lock:
+        slot = fetch_host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT)
+            fetch_host_slots[host] = slot
+        return slot
+
+
+def load_http_cache_entry(url: str):
+    # Returns (entry, fresh). A fresh hit is recorded on the same connection,
+    # at most once per HTTP_CACHE_TOUCH_SECONDS so reads rarely need the
+    # database write lock.
+    if HTTP_CACHE_MAX_BYTES <= 0:
+        return None, False
+    now = time.time()
+    conn = get_conn()
+    try:
+        entry = conn.execute(
+            """
+            SELECT body, content_type, etag, last_modified, fetched_at, last_used_at
+            FROM http_cache
+            WHERE url = ?
+            """,
+            (url,),
+        ).fetchone()
+        fresh = entry is not None and now - entry["fetched_at"] < HTTP_CACHE_TTL_SECONDS
+        if fresh and now - entry["last_used_at"] >= HTTP_CACHE_TOUCH_SECONDS:
+            conn.execute("UPDATE http_cache SET last_used_at = ? WHERE url = ?", (now, url))
+            conn.commit()
+        return entry, fresh
+    except sqlite3.Error:
+        conn.rollback()
+        return None, False
+    finally:
+        conn.close()
+
+
+def mark_http_cache_entry_revalidated(url: str) -> None:
+    now = time.time()
+    conn = get_conn()
+    try:
+        conn.execute(
+            "UPDATE http_cache SET fetched_at = ?, last_used_at = ? WHERE url = ?",
+            (now, now, url),
+        )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def store_http_cache_entry(
+    url: str, body: bytes, content_type: str, etag: str | None, last_modified: str | None
+) -> None:
+    if HTTP_CACHE_MAX_BYTES <= 0 or len(body) > HTTP_CACHE_MAX_BYTES:
+        return
+    now = time.time()
+    conn = get_conn()
+    try:
+        conn.execute(
+            """
+            INSERT INTO http_cache (
+                url, body, content_type, etag, last_modified, size, fetched_at, last_used_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                body = excluded.body,
+                content_type = excluded.content_type,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                size = excluded.size,
+                fetched_at = excluded.fetched_at,
+                last_used_at = excluded.last_used_at
+            """,
+            (url, body, content_type, etag, last_modified, len(body), now, now),
+        )
+        overflow = read_app_meta_int(conn, "http_cache_bytes") - HTTP_CACHE_MAX_BYTES
+        if overflow > 0:
+            evicted = []
+            for row in conn.execute(
+                "SELECT url, size FROM http_cache WHERE url != ? ORDER BY last_used_at ASC",
+                (url,),
+            ):
+                evicted.append((row["url"],))
+                overflow -= row["size"]
+                if overflow <= 0:
+                    break
+            conn.executemany("DELETE FROM http_cache WHERE url = ?", evicted)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+class HostConnectionPool:
+    # Idle keep-alive connections per (scheme, host, port). Each connection is
+    # used by one thread at a time; fetch_host_slot keeps the number of open
+    # connections per host at FETCH_PER_HOST_LIMIT.
+    def __init__(self, max_idle_per_host: int) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.idle: dict[tuple[str, str, int], list] = {}
+        self.lock = threading.Lock()
+        self.ssl_context: ssl.SSLContext | None = None
+
+    def acquire(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        now = time.monotonic()
+        with self.lock:
+            idle = self.idle.get(key, [])
+            while idle:
+                conn, released_at = idle.pop()
+                if now - released_at < FETCH_IDLE_SECONDS:
+                    return conn
+                conn.close()
+            if key[0] == "https" and self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=FETCH_TIMEOUT_SECONDS, context=self.ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=FETCH_TIMEOUT_SECONDS)
+
+    def release(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def request(self, url: str, headers: dict[str, str]):
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in ("http", "https") or not parsed.hostname:
+            raise URLError(f"unsupported URL: {url}")
+        key = (scheme, parsed.hostname, parsed.port or (443 if scheme == "https" else 80))
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+
+        conn = self.acquire(key)
+        # A reused connection may have been closed by the server while idle;
+        # that failure is retried once right away on a fresh connection.
+        for fresh in (conn.sock is None, True):
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except TimeoutError:
+                conn.close()
+                raise
+            except (http.client.HTTPException, OSError) as error:
+                conn.close()
+                if fresh:
+                    raise URLError(error) from error
+        if response.will_close:
+            conn.close()
+        else:
+            self.release(key, conn)
+        return response, body
+
+
+outbound_pool = HostConnectionPool(FETCH_PER_HOST_LIMIT)
+
+
+def open_remote_url(url: str, headers: dict[str, str]):
+    for _ in range(FETCH_MAX_REDIRECTS + 1):
+        with fetch_host_slot(url):
+            response, body = outbound_pool.request(url, headers)
+        location = response.headers.get("Location")
+        if response.status in FETCH_REDIRECT_STATUSES and location:
+            next_url = urljoin(url, location)
+            if next_url != url:
+                # The cached validators belong to the original URL; another
+                # resource must not answer them with a 304.
+                headers = {
+                    name: value
+                    for name, value in headers.items()
+                    if name.lower() not in ("if-none-match", "if-modified-since")
+                }
+            url = next_url
+            continue
+        if response.status >= 300 and response.status != HTTPStatus.NOT_MODIFIED:
+            # Includes a redirect without Location, which has no usable body.
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        return response, body
+    raise URLError(f"too many redirects: {url}")
+
+
+def fetch_remote_bytes(url: str, revalidate: bool = False) -> tuple[bytes, str]:
+    # Fresh entries (HTTP_CACHE_TTL_SECONDS) are served from the http_cache
+    # table; stale ones, and every entry when revalidate is set, are checked
+    # with the server using their ETag/Last-Modified.
+    cached, fresh = load_http_cache_entry(url)
+    if fresh and not revalidate:
+        return cached["body"], cached["content_type"]
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (compatible; PocitovaMapaBot/1.0; +https://example.invalid)"
+    }
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    for attempt in range(FETCH_RETRIES + 1):
+        try:
+            response, raw = open_remote_url(url, headers)
+            break
+        except (URLError, TimeoutError) as error:
+            transient = not isinstance(error, HTTPError) or error.code in FETCH_RETRY_STATUSES
+            if not transient or attempt == FETCH_RETRIES:
+                raise
+            time.sleep(FETCH_RETRY_BACKOFF_SECONDS * 2**attempt)
+
+    if response.status == HTTPStatus.NOT_MODIFIED:
+        if not cached:
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        mark_http_cache_entry_revalidated(url)
+        return cached["body"], cached["content_type"]
+    content_type = response.headers.get("Content-Type", "")
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    cache_control = response.headers.get("Cache-Control", "")
+
+    if "no-store" not in cache_control.lower():
+        store_http_cache_entry(url, raw, content_type, etag, last_modified)
+    return raw, content_type
+
+
+def fetch_remote_html(url: str, revalidate: bool = False) -> str:
+    raw, content_type = fetch_remote_bytes(url, revalidate)
     content_type_normalized = content_type.lower()
     if "charset=" in content_type_normalized:
         charset = content_type_normalized.split("charset=", 1)[1].split(";", 1)[0].strip()
@@ -1056,22 +2792,481 @@ def convert_epsg2065_to_wgs84(
         (-source_y, source_x),
     ]
 
-    best: tuple[float, float, int] | None = None
-    for x, y in variants:
-        for czech_variant in (False, True):
-            converted = convert_epsg2065_variant_to_wgs84(x, y, czech_variant)
-            if not converted:
-                continue
-            lat, lng = converted
-            score = coordinate_score(lat, lng)
-            if score <= 0:
+    best: tuple[float, float, int] | None = None
+    for x, y in variants:
+        for czech_variant in (False, True):
+            converted = convert_epsg2065_variant_to_wgs84(x, y, czech_variant)
+            if not converted:
+                continue
+            lat, lng = converted
+            score = coordinate_score(lat, lng)
+            if score <= 0:
+                continue
+            if not best or score > best[2]:
+                best = (lat, lng, score)
+
+    if not best:
+        return None, None
+    return best[0], best[1]
+
+
+def enrich_building_parcel(parcel: dict) -> tuple[dict, bool, bool]:
+    details = {
+        "building_object_url": "",
+        "object_type": "",
+        "street": "",
+        "address": "",
+        "lat": None,
+        "lng": None,
+        "coordinates_checked": False,
+    }
+    detail_failed = False
+    coordinate_failed = False
+    try:
+        detail_html = fetch_remote_html(parcel["parcel_url"])
+        details = parse_building_detail_from_parcel_html(detail_html, parcel["parcel_url"])
+        details["lat"] = None
+        details["lng"] = None
+        details["coordinates_checked"] = False
+        if details.get("building_object_url"):
+            try:
+                object_html = fetch_remote_html(details["building_object_url"])
+                details["coordinates_checked"] = True
+                y, x = parse_epsg2065_coordinates_from_object_html(object_html)
+                lat, lng = convert_epsg2065_to_wgs84(y, x)
+                details["lat"] = lat
+                details["lng"] = lng
+                if lat is None or lng is None:
+                    coordinate_failed = True
+            except URLError:
+                coordinate_failed = True
+            except TimeoutError:
+                coordinate_failed = True
+    except URLError:
+        detail_failed = True
+    except TimeoutError:
+        detail_failed = True
+    return {**parcel, **details}, detail_failed, coordinate_failed
+
+
+def fetch_building_coordinates(
+    object_url: str, revalidate: bool = False
+) -> tuple[float | None, float | None] | None:
+    # None means the object page could not be retrieved at all, as opposed to
+    # (None, None) for a page without usable coordinates.
+    try:
+        object_html = fetch_remote_html(object_url, revalidate)
+    except (URLError, TimeoutError):
+        return None
+    y, x = parse_epsg2065_coordinates_from_object_html(object_html)
+    return convert_epsg2065_to_wgs84(y, x)
+
+
+def run_concurrent_fetches(fetch, items: list) -> list:
+    # executor.map yields in submission order, so results line up with the
+    # input no matter which fetch finishes first.
+    if not items:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(IMPORT_CONCURRENCY, len(items)),
+        thread_name_prefix="remote-fetch",
+    ) as executor:
+        return list(executor.map(fetch, items))
+
+
+def enrich_building_parcels(parcels: list[dict]) -> list[tuple[dict, bool, bool]]:
+    return run_concurrent_fetches(enrich_building_parcel, parcels)
+
+
+def upsert_city_building_parcels(
+    conn: sqlite3.Connection, parsed_parcels: list[dict], source_url: str
+) -> list[str]:
+    # Returns "inserted", "updated" or "unchanged" per parcel; an unchanged
+    # row is left alone apart from a fresh coordinates_checked_at.
+    statuses = []
+    has_legacy_krovak = city_building_table_has_legacy_krovak(conn)
+    # coordinates_checked_at is only stamped when the object page was actually
+    # retrieved; if that fetch failed, the stored coordinates stay as they were.
+    keep_coordinates_sql = (
+        "excluded.coordinates_checked_at IS NULL"
+        " AND excluded.building_object_url = city_building_parcels.building_object_url"
+    )
+    for parcel in parsed_parcels:
+        existing = conn.execute(
+            """
+            SELECT id, source_url, parcel_label, building_object_url, object_type,
+                   street, address, lat, lng, has_building
+            FROM city_building_parcels
+            WHERE parcel_url = ?
+            """,
+            (parcel["parcel_url"],),
+        ).fetchone()
+        object_type_norm, street_norm, address_norm = normalize_city_building_row(
+            str(parcel.get("object_type", "")),
+            str(parcel.get("street", "")),
+            str(parcel.get("address", "")),
+        )
+        building_object_url = str(parcel.get("building_object_url", ""))[:800]
+        coordinates_checked = bool(parcel.get("coordinates_checked"))
+        parcel_id = existing["id"] if existing else generate_id("parcel")
+        if existing:
+            lat, lng = parcel.get("lat"), parcel.get("lng")
+            if not coordinates_checked and building_object_url == existing["building_object_url"]:
+                lat, lng = existing["lat"], existing["lng"]
+            if (
+                existing["has_building"] == 1
+                and existing["source_url"] == source_url[:800]
+                and existing["parcel_label"] == parcel["parcel_label"][:200]
+                and existing["building_object_url"] == building_object_url
+                and existing["object_type"] == object_type_norm[:200]
+                and existing["street"] == street_norm[:200]
+                and existing["address"] == address_norm[:260]
+                and (existing["lat"], existing["lng"]) == (lat, lng)
+            ):
+                if coordinates_checked:
+                    conn.execute(
+                        """
+                        UPDATE city_building_parcels
+                        SET coordinates_checked_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                        """,
+                        (parcel_id,),
+                    )
+                statuses.append("unchanged")
+                continue
+        statuses.append("updated" if existing else "inserted")
+
+        conn.execute(
+            """
+            INSERT INTO city_building_parcels (
+                id, source_url, parcel_label, parcel_url,
+                building_object_url, object_type, street, address,
+                lat, lng, has_building, coordinates_checked_at
+            )
+            VALUES (
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1,
+                CASE WHEN ?11 THEN CURRENT_TIMESTAMP END
+            )
+            ON CONFLICT(parcel_url) DO UPDATE SET
+                source_url = excluded.source_url,
+                parcel_label = excluded.parcel_label,
+                building_object_url = excluded.building_object_url,
+                object_type = excluded.object_type,
+                street = excluded.street,
+                address = excluded.address,
+                lat = CASE WHEN {keep_coordinates} THEN lat ELSE excluded.lat END,
+                lng = CASE WHEN {keep_coordinates} THEN lng ELSE excluded.lng END,
+                has_building = 1,
+                coordinates_checked_at = CASE
+                    WHEN {keep_coordinates} THEN coordinates_checked_at
+                    ELSE excluded.coordinates_checked_at
+                END,
+                updated_at = CURRENT_TIMESTAMP
+            """.format(keep_coordinates=keep_coordinates_sql),
+            (
+                parcel_id,
+                source_url[:800],
+                parcel["parcel_label"][:200],
+                parcel["parcel_url"][:800],
+                building_object_url,
+                object_type_norm[:200],
+                street_norm[:200],
+                address_norm[:260],
+                parcel.get("lat"),
+                parcel.get("lng"),
+                coordinates_checked,
+            ),
+        )
+        if has_legacy_krovak:
+            conn.execute(
+                """
+                UPDATE city_building_parcels
+                SET krovak_y = NULL, krovak_x = NULL
+                WHERE id = ?
+                """,
+                (parcel_id,),
+            )
+    return statuses
+
+
+def run_import_parcels_batch(
+    conn: sqlite3.Connection, payload: dict, start: int, end: int, result: dict
+) -> tuple[int, int, int]:
+    results = enrich_building_parcels(payload["parcels"][start:end])
+    enriched_parcels = [parcel for parcel, _, _ in results]
+    detail_failures = sum(1 for _, detail_failed, _ in results if detail_failed)
+    coordinate_failures = sum(1 for _, _, coord_failed in results if coord_failed)
+    statuses = upsert_city_building_parcels(conn, enriched_parcels, payload["source_url"])
+    # Parcels already stored exactly as parsed count as skipped in the job
+    # progress, failed detail pages as failed and everything else as done.
+    unchanged = sum(
+        1
+        for status, (_, detail_failed, _) in zip(statuses, results)
+        if status == "unchanged" and not detail_failed
+    )
+    if statuses.count("unchanged") < len(statuses):
+        bump_layer_version(conn, CITY_BUILDINGS_LAYER_KEY)
+    for key, value in (
+        ("imported", len(enriched_parcels)),
+        ("inserted", statuses.count("inserted")),
+        ("updated", statuses.count("updated")),
+        ("unchanged", statuses.count("unchanged")),
+        ("detail_failures", detail_failures),
+        ("coordinate_failures", coordinate_failures),
+    ):
+        result[key] = result.get(key, 0) + value
+    return len(enriched_parcels) - detail_failures - unchanged, detail_failures, unchanged
+
+
+def run_refresh_coordinates_batch(
+    conn: sqlite3.Connection, payload: dict, start: int, end: int, result: dict
+) -> tuple[int, int, int]:
+    ids = payload["ids"][start:end]
+    placeholders = ", ".join("?" for _ in ids)
+    rows = conn.execute(
+        f"SELECT id, building_object_url FROM city_building_parcels WHERE id IN ({placeholders})",
+        ids,
+    ).fetchall()
+    targets = [
+        row
+        for row in rows
+        if isinstance(row["building_object_url"], str) and row["building_object_url"].strip()
+    ]
+    skipped = len(ids) - len(targets)
+    # A refresh asks the cadastre again even for pages still fresh in the
+    # http_cache; an unchanged page costs only a 304.
+    coordinates = run_concurrent_fetches(
+        partial(fetch_building_coordinates, revalidate=True),
+        [row["building_object_url"] for row in targets],
+    )
+    conn.executemany(
+        "UPDATE city_building_parcels SET coordinates_checked_at = CURRENT_TIMESTAMP WHERE id = ?",
+        [(row["id"],) for row, retrieved in zip(targets, coordinates) if retrieved is not None],
+    )
+
+    updated = 0
+    failed = 0
+    has_legacy_krovak = city_building_table_has_legacy_krovak(conn)
+    krovak_sql = ", krovak_y = NULL, krovak_x = NULL" if has_legacy_krovak else ""
+    for row, retrieved in zip(targets, coordinates):
+        lat, lng = retrieved or (None, None)
+        if lat is None or lng is None:
+            failed += 1
+            continue
+        conn.execute(
+            f"""
+            UPDATE city_building_parcels
+            SET lat = ?, lng = ?{krovak_sql}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (lat, lng, row["id"]),
+        )
+        updated += 1
+    if updated:
+        bump_layer_version(conn, CITY_BUILDINGS_LAYER_KEY)
+    for key, value in (("updated", updated), ("failed", failed), ("skipped", skipped)):
+        result[key] = result.get(key, 0) + value
+    return updated, failed, skipped
+
+
+JOB_HANDLERS = {
+    "import_parcels": run_import_parcels_batch,
+    "refresh_coordinates": run_refresh_coordinates_batch,
+}
+
+
+def submit_job(conn: sqlite3.Connection, kind: str, payload: dict, total: int, user_id: str):
+    job_id = generate_id("job")
+    conn.execute(
+        """
+        INSERT INTO jobs (id, kind, payload_json, total, created_by_user_id)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (job_id, kind, json.dumps(payload, ensure_ascii=False), total, user_id),
+    )
+    conn.commit()
+    job_runner.notify()
+    return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def requeue_interrupted_jobs(conn: sqlite3.Connection) -> None:
+    # Runs once before any worker starts, so every 'running' job was cut off
+    # by the previous shutdown; it continues from its last committed batch.
+    conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+    conn.execute(
+        "DELETE FROM jobs WHERE finished_at < datetime('now', ?)",
+        (f"-{JOB_RETENTION_DAYS} days",),
+    )
+
+
+def current_job_owner() -> str:
+    # Evaluated per call: forked workers share the boot id but not the pid.
+    return f"{JOB_OWNER_BOOT_ID}:{os.getpid()}"
+
+
+def claim_next_job() -> str | None:
+    # Claiming is a conditional UPDATE, so several processes (WORKERS > 1) can
+    # poll the same table; a running job whose heartbeat stopped is taken over.
+    stale_sql = f"(status = 'running' AND updated_at < datetime('now', '-{JOB_STALE_SECONDS} seconds'))"
+    conn = get_conn()
+    try:
+        while True:
+            row = conn.execute(
+                f"""
+                SELECT id FROM jobs
+                WHERE status = 'queued' OR {stale_sql}
+                ORDER BY created_at ASC, id ASC
+                LIMIT 1
+                """
+            ).fetchone()
+            if not row:
+                return None
+            cursor = conn.execute(
+                f"""
+                UPDATE jobs
+                SET status = 'running', owner = ?, started_at = CURRENT_TIMESTAMP,
+                    started_position = position, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND (status = 'queued' OR {stale_sql})
+                """,
+                (current_job_owner(), row["id"]),
+            )
+            conn.commit()
+            if cursor.rowcount == 1:
+                return row["id"]
+    finally:
+        conn.close()
+
+
+class JobHeartbeat:
+    # A single batch can outlast JOB_STALE_SECONDS when the cadastre is slow,
+    # so the job keeps its claim fresh from a side thread while it runs.
+    def __init__(self, job_id: str, owner: str) -> None:
+        self.job_id = job_id
+        self.owner = owner
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name="job-heartbeat", daemon=True)
+
+    def __enter__(self) -> "JobHeartbeat":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def loop(self) -> None:
+        while not self.stopped.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                conn = get_conn()
+                try:
+                    conn.execute(
+                        """
+                        UPDATE jobs SET updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND owner = ? AND status = 'running'
+                        """,
+                        (self.job_id, self.owner),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                traceback.print_exc()
+
+
+def finish_job_step(conn: sqlite3.Connection, job_id: str, owner: str, sql: str, params) -> bool:
+    # Every write to the job row is conditional on still owning it; if another
+    # worker took the job over, this batch is rolled back instead of applied twice.
+    cursor = conn.execute(f"{sql} WHERE id = ? AND owner = ?", (*params, job_id, owner))
+    if cursor.rowcount != 1:
+        conn.rollback()
+        print(f"Job {job_id} was taken over by another worker, stopping")
+        return False
+    conn.commit()
+    return True
+
+
+def run_job(job_id: str) -> None:
+    owner = current_job_owner()
+    conn = get_conn()
+    try:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        run_batch = JOB_HANDLERS[job["kind"]]
+        payload = json.loads(job["payload_json"])
+        result = json.loads(job["result_json"] or "{}")
+        position = job["position"]
+        with JobHeartbeat(job_id, owner):
+            while position < job["total"]:
+                end = min(position + JOB_BATCH_SIZE, job["total"])
+                done, failed, skipped = run_batch(conn, payload, position, end, result)
+                if not finish_job_step(
+                    conn,
+                    job_id,
+                    owner,
+                    """
+                    UPDATE jobs
+                    SET position = ?, done = done + ?, failed = failed + ?, skipped = skipped + ?,
+                        result_json = ?, updated_at = CURRENT_TIMESTAMP
+                    """,
+                    (end, done, failed, skipped, json.dumps(result)),
+                ):
+                    return
+                position = end
+        finish_job_step(
+            conn,
+            job_id,
+            owner,
+            """
+            UPDATE jobs
+            SET status = 'done', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            """,
+            (),
+        )
+    except Exception as error:
+        traceback.print_exc()
+        conn.rollback()
+        finish_job_step(
+            conn,
+            job_id,
+            owner,
+            """
+            UPDATE jobs
+            SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (repr(error)[:500],),
+        )
+    finally:
+        conn.close()
+
+
+class JobRunner:
+    def __init__(self) -> None:
+        self.wakeup = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.loop, name="job-runner", daemon=True)
+            self.thread.start()
+
+    def notify(self) -> None:
+        self.wakeup.set()
+
+    def loop(self) -> None:
+        while True:
+            try:
+                job_id = claim_next_job()
+            except sqlite3.Error:
+                traceback.print_exc()
+                job_id = None
+            if job_id is None:
+                self.wakeup.wait(JOB_POLL_SECONDS)
+                self.wakeup.clear()
                 continue
-            if not best or score > best[2]:
-                best = (lat, lng, score)
+            run_job(job_id)
 
-    if not best:
-        return None, None
-    return best[0], best[1]
+
+job_runner = JobRunner()
 
 
 def is_valid_seed_layer(layer: object) -> bool:
@@ -1127,13 +3322,147 @@ def generate_auth_token() -> str:
 
 
 class AppHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = HTTP_REQUEST_TIMEOUT
+    sending_error = False
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=str(ROOT), **kwargs)
 
+    def handle_one_request(self):
+        self.response_cache_control = None
+        self.request_parsed = False
+        self.request_body_consumed = False
+        # HTTP_IDLE_TIMEOUT only bounds the wait for the next request line;
+        # parse_request switches to HTTP_REQUEST_TIMEOUT for everything else.
+        self.set_socket_timeout(HTTP_IDLE_TIMEOUT)
+        super().handle_one_request()
+        if not self.close_connection:
+            self.discard_unread_body()
+
+    def set_socket_timeout(self, timeout: float) -> None:
+        self.connection.settimeout(timeout)
+
+    def parse_request(self) -> bool:
+        self.set_socket_timeout(HTTP_REQUEST_TIMEOUT)
+        self.request_parsed = super().parse_request()
+        return self.request_parsed
+
+    def discard_unread_body(self):
+        if self.request_body_consumed:
+            return
+        if self.headers.get("Transfer-Encoding"):
+            self.close_connection = True
+            return
+        try:
+            remaining = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            return
+        if remaining > HTTP_MAX_DRAIN_BYTES:
+            self.close_connection = True
+            return
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 65536))
+            if not chunk:
+                self.close_connection = True
+                return
+            remaining -= len(chunk)
+
+    def read_request_body(self, content_length: int) -> bytes:
+        if content_length < 0:
+            raise ValueError("Negative Content-Length")
+        self.request_body_consumed = True
+        return self.rfile.read(content_length)
+
+    def send_error(self, code, message=None, explain=None):
+        # The stdlib error page always carries a Content-Length, so once the
+        # request line is parsed the connection can stay open.
+        self.sending_error = getattr(self, "request_parsed", False)
+        try:
+            super().send_error(code, message, explain)
+        finally:
+            self.sending_error = False
+
+    def send_header(self, keyword, value):
+        if self.sending_error and keyword.lower() == "connection" and value.lower() == "close":
+            return
+        super().send_header(keyword, value)
+
     def end_headers(self):
-        self.send_header("Cache-Control", "no-store")
+        cache_control = self.response_cache_control or self.default_cache_control()
+        self.response_cache_control = None
+        self.send_header("Cache-Control", cache_control)
+        if self.server.connection_tracker.draining and not self.close_connection:
+            # Clients move over to the workers that keep running.
+            super().send_header("Connection", "close")
         super().end_headers()
 
+    def default_cache_control(self) -> str:
+        path = urlparse(self.path).path
+        if (
+            self.sending_error
+            or path.startswith(("/api/", "/tiles/"))
+            or path == "/healthz"
+            or self.command not in ("GET", "HEAD")
+        ):
+            return "no-store"
+        if path == "/" or path.endswith((".html", ".htm", ".js", ".css")):
+            # Script and style URLs are not versioned, so they revalidate by
+            # ETag and a deploy reaches clients on their next load.
+            return "no-cache"
+        return f"public, max-age={STATIC_CACHE_MAX_AGE}"
+
+    def if_none_match_candidates(self) -> set[str]:
+        if_none_match = self.headers.get("If-None-Match", "")
+        return {
+            candidate.strip().removeprefix("W/")
+            for candidate in if_none_match.split(",")
+            if candidate.strip()
+        }
+
+    def is_not_modified(self, etag: str, last_modified: str | None = None) -> bool:
+        candidates = self.if_none_match_candidates()
+        if candidates:
+            return "*" in candidates or etag in candidates or gzip_etag(etag) in candidates
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if not if_modified_since or not last_modified:
+            return False
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            return False
+
+    def send_cache_validators(
+        self, etag: str, last_modified: str | None, private: bool, gzipped: bool = False
+    ) -> None:
+        self.response_cache_control = "private, no-cache" if private else "no-cache"
+        self.send_header("ETag", gzip_etag(etag) if gzipped else etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Vary", "X-Auth-Token, Accept, Accept-Encoding")
+
+    def write_not_modified(self, etag: str, last_modified: str | None, private: bool):
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        gzipped = gzip_etag(etag) in self.if_none_match_candidates()
+        self.send_cache_validators(etag, last_modified, private, gzipped)
+        self.end_headers()
+
+    def check_layer_not_modified(self, layer, auth_user, personalized: bool, *parts: str):
+        user_part = ""
+        if personalized and auth_user:
+            user_part = f"{auth_user['id']}:{auth_user['role']}"
+        # ETag only: data_updated_at has one-second resolution and is shared
+        # by every user, so If-Modified-Since could confirm a stale body.
+        etag = layer_etag(layer, *parts, user_part, self.response_format())
+        validators = (etag, None, bool(user_part))
+        if self.is_not_modified(etag):
+            self.write_not_modified(*validators)
+            return None
+        return validators
+
     def do_GET(self):
         path = urlparse(self.path).path
         if path == "/healthz":
@@ -1145,12 +3474,37 @@ class AppHandler(SimpleHTTPRequestHandler):
         if path == "/api/admin/buildings/parcels":
             self.handle_get_admin_building_parcels()
             return
+        if path.startswith("/api/admin/jobs/"):
+            job_id = path.removeprefix("/api/admin/jobs/").strip()
+            if not job_id or "/" in job_id:
+                self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Missing job id"})
+                return
+            self.handle_get_admin_job(job_id)
+            return
         if path == "/api/pins":
             self.handle_get_pins()
             return
         if path == "/api/layers":
             self.handle_get_layers()
             return
+        if path.startswith("/tiles/"):
+            self.handle_get_tile(path)
+            return
+
+        layer_key = self.extract_layer_key(path, suffix="/hexbins")
+        if layer_key:
+            self.handle_get_layer_hexbins(layer_key)
+            return
+
+        layer_key = self.extract_layer_key(path, suffix="/events")
+        if layer_key:
+            self.handle_get_layer_events(layer_key)
+            return
+
+        layer_key = self.extract_layer_key(path, suffix="/clusters")
+        if layer_key:
+            self.handle_get_layer_clusters(layer_key)
+            return
 
         layer_key = self.extract_layer_key(path)
         if layer_key:
@@ -1160,8 +3514,16 @@ class AppHandler(SimpleHTTPRequestHandler):
         if path == "/api/auth/me":
             self.handle_auth_me()
             return
+        if self.serve_static_asset(path):
+            return
         super().do_GET()
 
+    def do_HEAD(self):
+        path = urlparse(self.path).path
+        if not path.startswith("/api/") and self.serve_static_asset(path, include_body=False):
+            return
+        super().do_HEAD()
+
     def do_POST(self):
         path = urlparse(self.path).path
         if path == "/api/admin/buildings/parcels/import-html":
@@ -1225,11 +3587,10 @@ class AppHandler(SimpleHTTPRequestHandler):
             return
         self.send_error(HTTPStatus.NOT_FOUND)
 
-    def extract_layer_key(self, path: str) -> str | None:
+    def extract_layer_key(self, path: str, suffix: str = "/points") -> str | None:
         if not path.startswith("/api/layers/"):
             return None
         prefix = "/api/layers/"
-        suffix = "/points"
         if not path.endswith(suffix):
             return None
         layer_key = path[len(prefix) : -len(suffix)].strip("/")
@@ -1237,6 +3598,10 @@ class AppHandler(SimpleHTTPRequestHandler):
             return None
         return layer_key
 
+    def get_query_params(self) -> dict[str, str]:
+        query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        return {key: values[0].strip() for key, values in query.items() if values}
+
     def get_auth_user(self, conn: sqlite3.Connection):
         token = self.headers.get("X-Auth-Token")
         if not token:
@@ -1252,7 +3617,8 @@ class AppHandler(SimpleHTTPRequestHandler):
     def get_layer(self, conn: sqlite3.Connection, layer_key: str):
         return conn.execute(
             """
-            SELECT key, name, kind, allow_user_points, is_enabled, sort_order
+            SELECT key, name, kind, allow_user_points, is_enabled, sort_order,
+                   data_version, data_updated_at
             FROM layers
             WHERE key = ?
             """,
@@ -1438,8 +3804,38 @@ class AppHandler(SimpleHTTPRequestHandler):
             "has_building": bool(row["has_building"]),
             "imported_at": row["imported_at"],
             "updated_at": row["updated_at"],
+            "coordinates_checked_at": row["coordinates_checked_at"],
+        }
+
+    def serialize_job(self, job_row):
+        eta_seconds = None
+        processed = job_row["position"] - job_row["started_position"]
+        if job_row["status"] == "running" and job_row["started_at"] and processed > 0:
+            started_at = datetime.strptime(job_row["started_at"], "%Y-%m-%d %H:%M:%S").replace(
+                tzinfo=timezone.utc
+            )
+            elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+            eta_seconds = round(elapsed / processed * (job_row["total"] - job_row["position"]))
+        return {
+            "id": job_row["id"],
+            "kind": job_row["kind"],
+            "status": job_row["status"],
+            "total": job_row["total"],
+            "processed": job_row["position"],
+            "done": job_row["done"],
+            "failed": job_row["failed"],
+            "skipped": job_row["skipped"],
+            "eta_seconds": eta_seconds,
+            "result": json.loads(job_row["result_json"] or "{}"),
+            "error": job_row["error"],
+            "created_at": job_row["created_at"],
+            "started_at": job_row["started_at"],
+            "finished_at": job_row["finished_at"],
         }
 
+    def serialize_city_building_layer_point_for(self, row, auth_user=None):
+        return self.serialize_city_building_layer_point(row)
+
     def serialize_city_building_layer_point(self, row):
         data = {
             "parcel_url": row["parcel_url"],
@@ -1608,14 +4004,27 @@ class AppHandler(SimpleHTTPRequestHandler):
         try:
             rows = conn.execute(
                 """
-                SELECT key, name, kind, allow_user_points, is_enabled, sort_order
+                SELECT key, name, kind, allow_user_points, is_enabled, sort_order, data_version
                 FROM layers
                 WHERE is_enabled = 1
                 ORDER BY sort_order ASC, key ASC
                 """
             ).fetchall()
-            layers = [self.serialize_layer(row) for row in rows]
-            self.write_json(HTTPStatus.OK, {"layers": layers})
+            # The ETag comes from the layer rows and their data versions, so a
+            # revalidation is answered before any point is counted.
+            layer_state = repr([tuple(row) for row in rows]).encode("utf-8")
+            etag = f'"{data_epoch}-layers-{hashlib.sha1(layer_state).hexdigest()[:20]}"'
+            validators = (etag, None, False)
+            if self.is_not_modified(etag):
+                self.write_not_modified(*validators)
+                return
+            # Totals for the layer panel: the map only loads the visible tiles
+            # of static layers, so it cannot count their points itself.
+            layers = [
+                {**self.serialize_layer(row), "point_count": self.cached_point_count(conn, row)}
+                for row in rows
+            ]
+            self.write_json_body(HTTPStatus.OK, encode_json({"layers": layers}), validators)
         finally:
             conn.close()
 
@@ -1630,24 +4039,42 @@ class AppHandler(SimpleHTTPRequestHandler):
                 self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
                 return
 
+            try:
+                page_limit, page_after = self.parse_page_params(self.get_query_params(), 3)
+            except ValueError as error:
+                self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+                return
+            keyset_sql = ""
+            query_params: tuple = ()
+            if page_after:
+                keyset_sql = f"WHERE ({USER_ROLE_RANK_SQL}, email COLLATE NOCASE, id) > (?, ?, ?)"
+                query_params = tuple(page_after)
+            limit_sql = ""
+            if page_limit is not None:
+                limit_sql = "LIMIT ?"
+                query_params = query_params + (page_limit + 1,)
             rows = conn.execute(
-                """
-                SELECT id, email, name, role, auth_token, last_login_at, created_at, updated_at
+                f"""
+                SELECT id, email, name, role, auth_token, last_login_at, created_at, updated_at,
+                       {USER_ROLE_RANK_SQL} AS role_rank
                 FROM users
-                ORDER BY
-                  CASE role
-                    WHEN 'admin' THEN 0
-                    WHEN 'moderator' THEN 1
-                    ELSE 2
-                  END ASC,
-                  email COLLATE NOCASE ASC
-                """
+                {keyset_sql}
+                ORDER BY {USER_ROLE_RANK_SQL} ASC, email COLLATE NOCASE ASC, id ASC
+                {limit_sql}
+                """,
+                query_params,
             ).fetchall()
+            rows, next_cursor = paginate_rows(
+                rows, page_limit, lambda row: [row["role_rank"], row["email"], row["id"]]
+            )
             users = [
                 self.serialize_admin_user(row, current_user_id=auth_user["id"])
                 for row in rows
             ]
-            self.write_json(HTTPStatus.OK, {"users": users})
+            payload = {"users": users}
+            if page_limit is not None:
+                payload["next_cursor"] = next_cursor
+            self.write_json(HTTPStatus.OK, payload)
         finally:
             conn.close()
 
@@ -1759,90 +4186,732 @@ class AppHandler(SimpleHTTPRequestHandler):
         finally:
             conn.close()
 
-    def handle_get_admin_building_parcels(self):
+    def handle_get_admin_building_parcels(self):
+        conn = get_conn()
+        try:
+            auth_user = self.get_auth_user(conn)
+            if not auth_user:
+                self.write_json(HTTPStatus.UNAUTHORIZED, {"error": "Login required"})
+                return
+            if not self.is_admin(auth_user):
+                self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
+                return
+
+            try:
+                page_limit, page_after = self.parse_page_params(self.get_query_params(), 3)
+            except ValueError as error:
+                self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+                return
+            keyset_sql, query_params = city_building_keyset_sql(page_after)
+            limit_sql = ""
+            if page_limit is not None:
+                limit_sql = "LIMIT ?"
+                query_params = query_params + (page_limit + 1,)
+            cursor = conn.execute(
+                f"""
+                SELECT id, source_url, parcel_label, parcel_url, building_object_url,
+                       object_type, street, address, lat, lng,
+                       has_building, imported_at, updated_at, coordinates_checked_at
+                FROM city_building_parcels
+                WHERE 1 = 1{keyset_sql}
+                ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC, id ASC
+                {limit_sql}
+                """,
+                query_params,
+            )
+            if page_limit is None:
+                self.write_json_stream(
+                    HTTPStatus.OK,
+                    "parcels",
+                    cursor,
+                    self.serialize_admin_building_parcel,
+                    release=conn.close,
+                )
+                return
+            rows, next_cursor = paginate_rows(
+                cursor.fetchall(), page_limit, city_building_cursor_values
+            )
+            parcels = [self.serialize_admin_building_parcel(row) for row in rows]
+            self.write_json(HTTPStatus.OK, {"parcels": parcels, "next_cursor": next_cursor})
+        finally:
+            conn.close()
+
+    def handle_get_layer_points(self, layer_key: str):
+        params = self.get_query_params()
+        bbox = None
+        zoom = None
+        try:
+            if params.get("bbox"):
+                bbox = parse_bbox(params["bbox"])
+            if params.get("zoom"):
+                zoom = parse_zoom(params["zoom"])
+        except ValueError as error:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
+        conn = get_conn()
+        try:
+            auth_user = self.get_auth_user(conn)
+            layer = self.get_layer(conn, layer_key)
+            if not layer or not bool(layer["is_enabled"]):
+                self.write_json(HTTPStatus.NOT_FOUND, {"error": "Layer not found"})
+                return
+
+            if layer_key == CITY_BUILDINGS_LAYER_KEY:
+                serialize = self.serialize_city_building_layer_point_for
+                load_rows = partial(self.query_city_building_rows, conn, bbox)
+                load_extra = None
+                cursor_values = city_building_cursor_values
+            else:
+                serialize = self.serialize_layer_point
+                load_rows = partial(self.query_layer_point_rows, conn, layer_key, bbox)
+                load_extra = partial(self.load_sync_cursor_extra, conn)
+                cursor_values = layer_point_cursor_values
+
+            try:
+                page_limit, page_after = self.parse_page_params(
+                    params, 3 if layer_key == CITY_BUILDINGS_LAYER_KEY else 2
+                )
+            except ValueError as error:
+                self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+                return
+            if page_limit is not None and (zoom is not None or "since" in params):
+                self.write_json(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": "limit cannot be combined with zoom or since"},
+                )
+                return
+            columnar = self.response_format() == "columnar"
+            if columnar and (page_limit is not None or "since" in params):
+                self.write_json(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": "columnar format cannot be combined with limit or since"},
+                )
+                return
+
+            if "since" in params:
+                if load_extra is None or bbox is not None or zoom is not None:
+                    self.write_json(
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": "since is only supported for user point layers without bbox/zoom"},
+                    )
+                    return
+                validators = self.check_layer_not_modified(
+                    layer, auth_user, True, "changes", params["since"]
+                )
+                if validators is None:
+                    return
+                self.write_json_body(
+                    HTTPStatus.OK,
+                    encode_json(
+                        self.load_layer_point_changes(conn, layer_key, params["since"], auth_user)
+                    ),
+                    validators,
+                )
+                return
+
+            validators = self.check_layer_not_modified(
+                layer,
+                auth_user,
+                layer_key != CITY_BUILDINGS_LAYER_KEY,
+                "points",
+                urlparse(self.path).query,
+            )
+            if validators is None:
+                return
+
+            if page_limit is not None:
+                rows, next_cursor = paginate_rows(
+                    load_rows(after=page_after, limit=page_limit), page_limit, cursor_values
+                )
+                points = [serialize(row, auth_user=auth_user) for row in rows]
+                self.write_json_body(
+                    HTTPStatus.OK,
+                    encode_json({"points": points, "next_cursor": next_cursor}),
+                    validators,
+                )
+                return
+
+            if bbox is None and zoom is None:
+                self.write_listing(
+                    conn,
+                    layer,
+                    ("points", layer_key),
+                    "points",
+                    load_rows,
+                    serialize,
+                    auth_user,
+                    validators,
+                    load_extra,
+                )
+                return
+
+            if columnar and zoom is None:
+                items = (serialize(row, auth_user=auth_user) for row in load_rows(stream=True))
+                self.write_json_pieces(
+                    HTTPStatus.OK,
+                    iter_columnar_listing("points", items),
+                    validators,
+                    release=conn.close,
+                )
+                return
+            if columnar:
+                rows, clusters = cluster_points_for_zoom(
+                    [row for row in load_rows() if row["lat"] is not None and row["lng"] is not None],
+                    zoom,
+                )
+                self.write_columnar(
+                    "points",
+                    (serialize(row, auth_user=auth_user) for row in rows),
+                    validators,
+                    {"clusters": clusters},
+                )
+                return
+
+            if zoom is None:
+                self.write_json_stream(
+                    HTTPStatus.OK,
+                    "points",
+                    load_rows(stream=True),
+                    partial(serialize, auth_user=auth_user),
+                    validators=validators,
+                    release=conn.close,
+                )
+                return
+
+            rows, clusters = cluster_points_for_zoom(
+                [row for row in load_rows() if row["lat"] is not None and row["lng"] is not None],
+                zoom,
+            )
+            points = [serialize(row, auth_user=auth_user) for row in rows]
+            self.write_json_body(
+                HTTPStatus.OK, encode_json({"points": points, "clusters": clusters}), validators
+            )
+        finally:
+            conn.close()
+
+    def load_layer_point_changes(
+        self, conn: sqlite3.Connection, layer_key: str, since: str, auth_user
+    ) -> dict:
+        # The counter is read before the rows, so every change up to the
+        # returned cursor is already visible; later ones may repeat next time.
+        current_seq = read_app_meta_int(conn, "layer_points_change_seq")
+        since_seq = parse_sync_cursor(since)
+        reset = since_seq is None or since_seq < read_app_meta_int(
+            conn, "layer_points_tombstone_floor"
+        )
+        rows = conn.execute(
+            """
+            SELECT id, layer_key, lat, lng, title, description, data_json, type, comment,
+                   created_by_user_id, created_by_name, created_from_ip, created_at
+            FROM layer_points
+            WHERE layer_key = ? AND change_seq > ?
+            ORDER BY change_seq ASC
+            """,
+            (layer_key, -1 if reset else since_seq),
+        ).fetchall()
+        deleted = []
+        if not reset:
+            deleted = [
+                row["id"]
+                for row in conn.execute(
+                    """
+                    SELECT id FROM layer_point_tombstones
+                    WHERE layer_key = ? AND change_seq > ?
+                    ORDER BY change_seq ASC
+                    """,
+                    (layer_key, since_seq),
+                ).fetchall()
+            ]
+        return {
+            "points": [self.serialize_layer_point(row, auth_user=auth_user) for row in rows],
+            "deleted": deleted,
+            "cursor": format_sync_cursor(current_seq),
+            "reset": reset,
+        }
+
+    def query_city_building_rows(
+        self,
+        conn: sqlite3.Connection,
+        bbox: tuple[float, float, float, float] | None = None,
+        after: list | None = None,
+        limit: int | None = None,
+        stream: bool = False,
+    ):
+        from_sql = "city_building_parcels"
+        where_sql = "has_building = 1"
+        where_params: tuple = ()
+        if bbox:
+            from_sql, bbox_sql, where_params = spatial_filter_sql("city_building_parcels", bbox)
+            where_sql = f"{where_sql} AND {bbox_sql}"
+        keyset_sql, keyset_params = city_building_keyset_sql(after)
+        limit_sql = ""
+        limit_params: tuple = ()
+        if limit is not None:
+            limit_sql = "LIMIT ?"
+            limit_params = (limit + 1,)
+        cursor = conn.execute(
+            f"""
+            SELECT id, parcel_label, parcel_url, building_object_url,
+                   object_type, street, address, lat, lng,
+                   imported_at, updated_at, '' AS type
+            FROM {from_sql}
+            WHERE {where_sql}{keyset_sql}
+            ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC, id ASC
+            {limit_sql}
+            """,
+            where_params + keyset_params + limit_params,
+        )
+        return cursor if stream else cursor.fetchall()
+
+    def query_layer_point_rows(
+        self,
+        conn: sqlite3.Connection,
+        layer_key: str,
+        bbox: tuple[float, float, float, float] | None = None,
+        after: list | None = None,
+        limit: int | None = None,
+        stream: bool = False,
+    ):
+        from_sql = "layer_points"
+        where_sql = "layer_key = ?"
+        where_params: tuple = (layer_key,)
+        if bbox:
+            from_sql, bbox_sql, bbox_params = spatial_filter_sql("layer_points", bbox)
+            where_sql = f"{where_sql} AND {bbox_sql}"
+            where_params = where_params + bbox_params
+        if after:
+            where_sql = f"{where_sql} AND (created_at, id) > (?, ?)"
+            where_params = where_params + tuple(after)
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = "LIMIT ?"
+            where_params = where_params + (limit + 1,)
+        cursor = conn.execute(
+            f"""
+            SELECT id, layer_key, lat, lng, title, description, data_json, type, comment,
+                   created_by_user_id, created_by_name, created_from_ip, created_at
+            FROM {from_sql}
+            WHERE {where_sql}
+            ORDER BY created_at ASC, id ASC
+            {limit_sql}
+            """,
+            where_params,
+        )
+        return cursor if stream else cursor.fetchall()
+
+    def cached_point_count(self, conn: sqlite3.Connection, layer) -> int:
+        cached = layer_point_count_cache.get(layer["key"])
+        if cached and cached[0] == layer["data_version"]:
+            return cached[1]
+        count = self.count_listing_rows(conn, layer["key"])
+        layer_point_count_cache.put(layer["key"], (layer["data_version"], count))
+        return count
+
+    def count_listing_rows(self, conn: sqlite3.Connection, layer_key: str) -> int:
+        if layer_key == CITY_BUILDINGS_LAYER_KEY:
+            row = conn.execute(
+                "SELECT COUNT(*) AS c FROM city_building_parcels WHERE has_building = 1"
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT COUNT(*) AS c FROM layer_points WHERE layer_key = ?", (layer_key,)
+            ).fetchone()
+        return row["c"]
+
+    def response_format(self) -> str:
+        requested = self.get_query_params().get("format", "").lower()
+        if requested:
+            return "columnar" if requested == "columnar" else "json"
+        if COLUMNAR_MEDIA_TYPE in self.headers.get("Accept", ""):
+            return "columnar"
+        return "json"
+
+    def write_columnar(self, list_key: str, items, validators, extra: dict | None = None):
+        payload = build_columnar_payload(list_key, items)
+        payload.update(extra or {})
+        self.write_json_body(HTTPStatus.OK, encode_json(payload), validators)
+
+    def write_listing(
+        self,
+        conn: sqlite3.Connection,
+        layer,
+        cache_key,
+        list_key: str,
+        load_rows,
+        serialize,
+        auth_user,
+        validators,
+        load_extra=None,
+    ):
+        # Small layers are served from the pre-encoded cache; layers above
+        # LISTING_CACHE_MAX_ROWS are streamed straight from the SQLite cursor.
+        listing = listing_cache.get(cache_key)
+        cache_miss = listing is None or listing["version"] != layer["data_version"]
+        too_large = cache_miss and self.count_listing_rows(conn, layer["key"]) > LISTING_CACHE_MAX_ROWS
+        if self.response_format() == "columnar":
+            if too_large:
+                extra = load_extra() if load_extra else None
+                items = (serialize(row, auth_user=auth_user) for row in load_rows(stream=True))
+                self.write_json_pieces(
+                    HTTPStatus.OK,
+                    iter_columnar_listing(list_key, items, extra),
+                    validators,
+                    release=conn.close,
+                )
+                return
+            listing = self.load_cached_listing(
+                cache_key, list_key, layer["data_version"], load_rows, serialize, load_extra
+            )
+            if (
+                listing["personalized"]
+                and auth_user
+                and (self.is_admin(auth_user) or auth_user["id"] in listing["owner_rows"])
+            ):
+                items = (serialize(row, auth_user=auth_user) for row in listing["rows"])
+                self.write_columnar(list_key, items, validators, listing["extra"])
+                return
+            body = listing.get("columnar_body")
+            if body is None:
+                payload = build_columnar_payload(
+                    list_key, (serialize(row) for row in listing["rows"])
+                )
+                payload.update(listing["extra"])
+                body = listing["columnar_body"] = encode_json(payload)
+            self.write_json_body(HTTPStatus.OK, body, validators)
+            return
+        if too_large:
+            extra = load_extra() if load_extra else None
+            self.write_json_stream(
+                HTTPStatus.OK,
+                list_key,
+                load_rows(stream=True),
+                partial(serialize, auth_user=auth_user),
+                extra,
+                validators,
+                release=conn.close,
+            )
+            return
+        listing = self.load_cached_listing(
+            cache_key, list_key, layer["data_version"], load_rows, serialize, load_extra
+        )
+        self.write_json_body(
+            HTTPStatus.OK, self.render_cached_listing(listing, auth_user, serialize), validators
+        )
+
+    def parse_page_params(self, params: dict[str, str], cursor_size: int):
+        if "limit" not in params:
+            if params.get("cursor"):
+                raise ValueError("cursor requires limit")
+            return None, None
+        limit = parse_page_limit(params["limit"])
+        after = None
+        if params.get("cursor"):
+            after = decode_page_cursor(params["cursor"], cursor_size)
+        return limit, after
+
+    def load_cached_listing(
+        self, cache_key, list_key: str, version: int, load_rows, serialize, load_extra=None
+    ):
+        listing = listing_cache.get(cache_key)
+        if listing is not None and listing["version"] == version:
+            return listing
+        extra = load_extra() if load_extra else None
+        listing = build_cached_listing(list_key, version, load_rows(), serialize, extra)
+        listing_cache.put(cache_key, listing)
+        return listing
+
+    def load_sync_cursor_extra(self, conn: sqlite3.Connection) -> dict:
+        return {"cursor": format_sync_cursor(read_app_meta_int(conn, "layer_points_change_seq"))}
+
+    def render_cached_listing(self, listing: dict, auth_user, serialize) -> bytes:
+        if not listing["personalized"] or not auth_user:
+            return listing["body"]
+        if self.is_admin(auth_user):
+            items = [serialize(row, auth_user=auth_user) for row in listing["rows"]]
+            return encode_json({listing["list_key"]: items, **listing["extra"]})
+        owned_indexes = listing["owner_rows"].get(auth_user["id"])
+        if not owned_indexes:
+            return listing["body"]
+        encoded_rows = list(listing["encoded_rows"])
+        for index in owned_indexes:
+            encoded_rows[index] = encode_json(serialize(listing["rows"][index], auth_user=auth_user))
+        return join_listing_body(listing["list_key"], encoded_rows, listing["extra"])
+
+    def handle_get_layer_events(self, layer_key: str):
+        conn = get_conn()
+        try:
+            layer = self.get_layer(conn, layer_key)
+            current_seq = read_app_meta_int(conn, "layer_points_change_seq")
+        finally:
+            conn.close()
+        if not layer or not bool(layer["is_enabled"]):
+            self.write_json(HTTPStatus.NOT_FOUND, {"error": "Layer not found"})
+            return
+
+        last_event_id = self.headers.get("Last-Event-ID")
+        if last_event_id is None:
+            last_event_id = self.get_query_params().get("last_event_id")
+        seq = parse_sync_cursor(last_event_id or "")
+        needs_reset = bool(last_event_id) and (seq is None or seq > current_seq)
+        if seq is None or needs_reset:
+            seq = current_seq
+
+        self.close_connection = True
+        self.response_cache_control = "no-cache"
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+        try:
+            self.wfile.write(f"retry: {SSE_RETRY_MS}\n\n".encode("ascii"))
+            if needs_reset:
+                self.wfile.write(format_sse_event(format_sync_cursor(seq), "reset", b"{}"))
+            self.wfile.flush()
+        except (ConnectionError, OSError):
+            return
+        layer_event_feed.subscribe(
+            LayerEventSubscription(
+                self.detach_event_stream(), layer_key, seq, self.serialize_layer_point
+            )
+        )
+
+    def detach_event_stream(self):
+        # The open stream is handed over to layer_event_feed so this worker
+        # thread is free again; the server must not close the socket.
+        detached_connections.add(self.connection)
+        return SocketEventStream(self.connection)
+
+    def handle_get_layer_hexbins(self, layer_key: str):
+        params = self.get_query_params()
+        try:
+            bbox = (
+                parse_bbox(params["bbox"])
+                if params.get("bbox")
+                else (
+                    HUSTOPECE_BOUNDS["south"],
+                    HUSTOPECE_BOUNDS["west"],
+                    HUSTOPECE_BOUNDS["north"],
+                    HUSTOPECE_BOUNDS["east"],
+                )
+            )
+            radius_m = float(params.get("radius") or HEXBIN_DEFAULT_RADIUS_M)
+            if not (HEXBIN_MIN_RADIUS_M <= radius_m <= HEXBIN_MAX_RADIUS_M):
+                raise ValueError("radius out of range")
+        except ValueError as error:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
+        grid = hex_grid_for_bbox(bbox, radius_m)
+        if grid["columns"] * grid["rows"] > HEXBIN_MAX_CELLS:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Too many hex cells"})
+            return
+
+        conn = get_conn()
+        try:
+            layer = self.get_layer(conn, layer_key)
+            if not layer or not bool(layer["is_enabled"]):
+                self.write_json(HTTPStatus.NOT_FOUND, {"error": "Layer not found"})
+                return
+
+            validators = self.check_layer_not_modified(
+                layer, None, False, "hexbins", repr((bbox, radius_m))
+            )
+            if validators is None:
+                return
+
+            cache_key = (layer_key, bbox, radius_m)
+            cached = hexbin_cache.get(cache_key)
+            if cached and cached[0] == layer["data_version"]:
+                self.write_json_body(HTTPStatus.OK, cached[1], validators)
+                return
+
+            south, west, north, east = bbox
+            padded_bbox = (
+                south - grid["lat_step"],
+                west - grid["lng_step"],
+                north + grid["lat_step"],
+                east + grid["lng_step"],
+            )
+            if layer_key == CITY_BUILDINGS_LAYER_KEY:
+                from_sql, bbox_sql, bbox_params = spatial_filter_sql(
+                    "city_building_parcels", padded_bbox
+                )
+                rows = conn.execute(
+                    f"""
+                    SELECT lat, lng, '' AS type
+                    FROM {from_sql}
+                    WHERE has_building = 1 AND {bbox_sql}
+                    """,
+                    bbox_params,
+                ).fetchall()
+            else:
+                from_sql, bbox_sql, bbox_params = spatial_filter_sql(
+                    "layer_points", padded_bbox
+                )
+                rows = conn.execute(
+                    f"""
+                    SELECT lat, lng, type
+                    FROM {from_sql}
+                    WHERE layer_key = ? AND {bbox_sql}
+                    """,
+                    (layer_key,) + bbox_params,
+                ).fetchall()
+
+            public_grid = {key: value for key, value in grid.items() if key != "meters_per_lng"}
+            body = encode_json({**public_grid, "cells": compute_hexbins(rows, grid)})
+            hexbin_cache.put(cache_key, (layer["data_version"], body))
+            self.write_json_body(HTTPStatus.OK, body, validators)
+        finally:
+            conn.close()
+
+    def handle_get_layer_clusters(self, layer_key: str):
+        params = self.get_query_params()
+        try:
+            if not params.get("zoom"):
+                raise ValueError("zoom is required")
+            zoom = parse_zoom(params["zoom"])
+            bbox = (
+                parse_bbox(params["bbox"])
+                if params.get("bbox")
+                else (
+                    HUSTOPECE_BOUNDS["south"],
+                    HUSTOPECE_BOUNDS["west"],
+                    HUSTOPECE_BOUNDS["north"],
+                    HUSTOPECE_BOUNDS["east"],
+                )
+            )
+        except ValueError as error:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
         conn = get_conn()
         try:
-            conn.execute(create_city_building_parcels_table_sql())
-            migrate_city_building_parcels_table(conn)
-            auth_user = self.get_auth_user(conn)
-            if not auth_user:
-                self.write_json(HTTPStatus.UNAUTHORIZED, {"error": "Login required"})
+            layer = self.get_layer(conn, layer_key)
+            if not layer or not bool(layer["is_enabled"]):
+                self.write_json(HTTPStatus.NOT_FOUND, {"error": "Layer not found"})
                 return
-            if not self.is_admin(auth_user):
-                self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
+
+            validators = self.check_layer_not_modified(
+                layer, None, False, "clusters", repr((zoom, bbox))
+            )
+            if validators is None:
                 return
 
-            rows = conn.execute(
-                """
-                SELECT id, source_url, parcel_label, parcel_url, building_object_url,
-                       object_type, street, address, lat, lng,
-                       has_building, imported_at, updated_at
-                FROM city_building_parcels
-                ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC
-                """,
-            ).fetchall()
-            parcels = [self.serialize_admin_building_parcel(row) for row in rows]
-            self.write_json(HTTPStatus.OK, {"parcels": parcels})
+            index = get_layer_cluster_index(layer_key)
+            with index.lock:
+                index.sync(conn, layer)
+                clusters = index.query(zoom, bbox)
         finally:
             conn.close()
 
-    def handle_get_layer_points(self, layer_key: str):
+        body = encode_json({"zoom": zoom, "bbox": list(bbox), "clusters": clusters})
+        self.write_json_body(HTTPStatus.OK, body, validators)
+
+    def handle_get_tile(self, path: str):
+        try:
+            layer_key, zoom, x, y = parse_tile_path(path)
+        except ValueError as error:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
         conn = get_conn()
         try:
-            auth_user = self.get_auth_user(conn)
             layer = self.get_layer(conn, layer_key)
             if not layer or not bool(layer["is_enabled"]):
                 self.write_json(HTTPStatus.NOT_FOUND, {"error": "Layer not found"})
                 return
 
-            if layer_key == CITY_BUILDINGS_LAYER_KEY:
-                conn.execute(create_city_building_parcels_table_sql())
-                migrate_city_building_parcels_table(conn)
-                rows = conn.execute(
-                    """
-                    SELECT id, parcel_label, parcel_url, building_object_url,
-                           object_type, street, address, lat, lng,
-                           imported_at, updated_at
-                    FROM city_building_parcels
-                    WHERE has_building = 1
-                    ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC
-                    """
-                ).fetchall()
-                points = [self.serialize_city_building_layer_point(row) for row in rows]
-                self.write_json(HTTPStatus.OK, {"points": points})
+            validators = self.check_layer_not_modified(
+                layer, None, False, "tile", f"{zoom}/{x}/{y}"
+            )
+            if validators is None:
                 return
 
-            rows = conn.execute(
-                """
-                SELECT id, layer_key, lat, lng, title, description, data_json, type, comment,
-                       created_by_user_id, created_by_name, created_from_ip, created_at
-                FROM layer_points
-                WHERE layer_key = ?
-                ORDER BY created_at ASC
-                """,
-                (layer_key,),
-            ).fetchall()
-            points = [self.serialize_layer_point(row, auth_user=auth_user) for row in rows]
-            self.write_json(HTTPStatus.OK, {"points": points})
+            cache_key = (layer_key, zoom, x, y)
+            cached = tile_cache.get(cache_key)
+            if cached and cached[0] == layer["data_version"]:
+                self.write_json_body(HTTPStatus.OK, cached[1], validators)
+                return
+
+            south, west, north, east = tile_bbox(zoom, x, y)
+            # Pad by a hair so float rounding at the edges cannot drop a point;
+            # cluster_tile_rows makes the exact per-tile cut.
+            bbox = (south - 1e-9, west - 1e-9, north + 1e-9, east + 1e-9)
+            if layer_key == CITY_BUILDINGS_LAYER_KEY:
+                rows = self.query_city_building_rows(conn, bbox)
+                serialize = self.serialize_city_building_layer_point
+            else:
+                rows = self.query_layer_point_rows(conn, layer_key, bbox)
+                serialize = self.serialize_layer_point
+
+            points, clusters = cluster_tile_rows(rows, zoom, x, y)
+            body = encode_json(
+                {
+                    "layer": layer_key,
+                    "z": zoom,
+                    "x": x,
+                    "y": y,
+                    "points": [serialize(row) for row in points],
+                    "clusters": clusters,
+                }
+            )
+            tile_cache.put(cache_key, (layer["data_version"], body))
+            self.write_json_body(HTTPStatus.OK, body, validators)
         finally:
             conn.close()
 
     def handle_get_pins(self):
+        try:
+            page_limit, page_after = self.parse_page_params(self.get_query_params(), 2)
+        except ValueError as error:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+        if page_limit is not None and self.response_format() == "columnar":
+            self.write_json(
+                HTTPStatus.BAD_REQUEST, {"error": "columnar format cannot be combined with limit"}
+            )
+            return
+
         conn = get_conn()
         try:
             auth_user = self.get_auth_user(conn)
-            rows = conn.execute(
-                """
-                SELECT id, layer_key, lat, lng, title, description, data_json, type, comment,
-                       created_by_user_id, created_by_name, created_from_ip, created_at
-                FROM layer_points
-                WHERE layer_key = ?
-                ORDER BY created_at ASC
-                """,
-                (FEELINGS_LAYER_KEY,),
-            ).fetchall()
-            pins = [self.serialize_pin(row, auth_user=auth_user) for row in rows]
-            self.write_json(HTTPStatus.OK, {"pins": pins})
+            layer = self.get_layer(conn, FEELINGS_LAYER_KEY)
+            if not layer:
+                self.write_json(HTTPStatus.OK, {"pins": []})
+                return
+            validators = self.check_layer_not_modified(
+                layer, auth_user, True, "pins", urlparse(self.path).query
+            )
+            if validators is None:
+                return
+            if page_limit is not None:
+                rows, next_cursor = paginate_rows(
+                    self.query_layer_point_rows(
+                        conn, FEELINGS_LAYER_KEY, after=page_after, limit=page_limit
+                    ),
+                    page_limit,
+                    layer_point_cursor_values,
+                )
+                pins = [self.serialize_pin(row, auth_user=auth_user) for row in rows]
+                self.write_json_body(
+                    HTTPStatus.OK,
+                    encode_json({"pins": pins, "next_cursor": next_cursor}),
+                    validators,
+                )
+                return
+            self.write_listing(
+                conn,
+                layer,
+                ("pins", FEELINGS_LAYER_KEY),
+                "pins",
+                partial(self.query_layer_point_rows, conn, FEELINGS_LAYER_KEY),
+                self.serialize_pin,
+                auth_user,
+                validators,
+                partial(self.load_sync_cursor_extra, conn),
+            )
         finally:
             conn.close()
 
@@ -1915,8 +4984,10 @@ class AppHandler(SimpleHTTPRequestHandler):
                     auth_user["name"][:80],
                 ),
             )
+            bump_layer_version(conn, layer_key)
             conn.commit()
             row = self.get_layer_point_row(conn, point_id.strip(), layer_key=layer_key)
+            layer_event_feed.notify()
             self.write_json(
                 HTTPStatus.CREATED, self.serialize_layer_point(row, auth_user=auth_user)
             )
@@ -1974,10 +5045,12 @@ class AppHandler(SimpleHTTPRequestHandler):
                     source_ip,
                 ),
             )
+            bump_layer_version(conn, FEELINGS_LAYER_KEY)
             conn.commit()
             row = self.get_layer_point_row(
                 conn, pin_id.strip(), layer_key=FEELINGS_LAYER_KEY
             )
+            layer_event_feed.notify()
             self.write_json(HTTPStatus.CREATED, self.serialize_pin(row, auth_user=auth_user))
         except sqlite3.IntegrityError:
             self.write_json(HTTPStatus.CONFLICT, {"error": "Pin id already exists"})
@@ -2017,8 +5090,10 @@ class AppHandler(SimpleHTTPRequestHandler):
                 """,
                 (comment[:300], pin_id, FEELINGS_LAYER_KEY),
             )
+            bump_layer_version(conn, FEELINGS_LAYER_KEY)
             conn.commit()
             row = self.get_layer_point_row(conn, pin_id, layer_key=FEELINGS_LAYER_KEY)
+            layer_event_feed.notify()
             self.write_json(HTTPStatus.OK, self.serialize_pin(row, auth_user=auth_user))
         finally:
             conn.close()
@@ -2044,8 +5119,6 @@ class AppHandler(SimpleHTTPRequestHandler):
 
         conn = get_conn()
         try:
-            conn.execute(create_city_building_parcels_table_sql())
-            migrate_city_building_parcels_table(conn)
             auth_user = self.get_auth_user(conn)
             if not auth_user:
                 self.write_json(HTTPStatus.UNAUTHORIZED, {"error": "Login required"})
@@ -2061,196 +5134,100 @@ class AppHandler(SimpleHTTPRequestHandler):
                 )
                 return
 
-            enriched_parcels = []
-            enrichment_failures = 0
-            coordinate_failures = 0
-            for parcel in parsed_parcels:
-                details = {
-                    "building_object_url": "",
-                    "object_type": "",
-                    "street": "",
-                    "address": "",
-                    "lat": None,
-                    "lng": None,
-                }
-                try:
-                    detail_html = fetch_remote_html(parcel["parcel_url"])
-                    details = parse_building_detail_from_parcel_html(
-                        detail_html, parcel["parcel_url"]
-                    )
-                    details["lat"] = None
-                    details["lng"] = None
-                    if details.get("building_object_url"):
-                        try:
-                            object_html = fetch_remote_html(details["building_object_url"])
-                            y, x = parse_epsg2065_coordinates_from_object_html(object_html)
-                            lat, lng = convert_epsg2065_to_wgs84(y, x)
-                            details["lat"] = lat
-                            details["lng"] = lng
-                            if lat is None or lng is None:
-                                coordinate_failures += 1
-                        except URLError:
-                            coordinate_failures += 1
-                        except TimeoutError:
-                            coordinate_failures += 1
-                except URLError:
-                    enrichment_failures += 1
-                except TimeoutError:
-                    enrichment_failures += 1
-
-                enriched_parcels.append(
-                    {
-                        **parcel,
-                        **details,
-                    }
-                )
-
-            inserted_count, updated_count = self.upsert_admin_building_parcels(
-                conn, enriched_parcels, source_url
-            )
-            conn.commit()
-            self.write_json(
-                HTTPStatus.OK,
-                {
-                    "imported": len(enriched_parcels),
-                    "inserted": inserted_count,
-                    "updated": updated_count,
-                    "detail_failures": enrichment_failures,
-                    "coordinate_failures": coordinate_failures,
-                },
+            job = submit_job(
+                conn,
+                "import_parcels",
+                {"source_url": source_url, "parcels": parsed_parcels},
+                len(parsed_parcels),
+                auth_user["id"],
             )
+            self.write_json(HTTPStatus.ACCEPTED, {"job": self.serialize_job(job)})
         finally:
             conn.close()
 
-    def upsert_admin_building_parcels(
-        self, conn: sqlite3.Connection, parsed_parcels: list[dict], source_url: str
-    ) -> tuple[int, int]:
-        inserted_count = 0
-        updated_count = 0
-        has_legacy_krovak = city_building_table_has_legacy_krovak(conn)
-        for parcel in parsed_parcels:
-            existing = conn.execute(
-                "SELECT id FROM city_building_parcels WHERE parcel_url = ?",
-                (parcel["parcel_url"],),
-            ).fetchone()
-            object_type_norm, street_norm, address_norm = normalize_city_building_row(
-                str(parcel.get("object_type", "")),
-                str(parcel.get("street", "")),
-                str(parcel.get("address", "")),
-            )
-            parcel_id = existing["id"] if existing else generate_id("parcel")
-            if existing:
-                updated_count += 1
-            else:
-                inserted_count += 1
-
-            conn.execute(
-                """
-                INSERT INTO city_building_parcels (
-                    id, source_url, parcel_label, parcel_url,
-                    building_object_url, object_type, street, address,
-                    lat, lng, has_building
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-                ON CONFLICT(parcel_url) DO UPDATE SET
-                    source_url = excluded.source_url,
-                    parcel_label = excluded.parcel_label,
-                    building_object_url = excluded.building_object_url,
-                    object_type = excluded.object_type,
-                    street = excluded.street,
-                    address = excluded.address,
-                    lat = excluded.lat,
-                    lng = excluded.lng,
-                    has_building = 1,
-                    updated_at = CURRENT_TIMESTAMP
-                """,
-                (
-                    parcel_id,
-                    source_url[:800],
-                    parcel["parcel_label"][:200],
-                    parcel["parcel_url"][:800],
-                    str(parcel.get("building_object_url", ""))[:800],
-                    object_type_norm[:200],
-                    street_norm[:200],
-                    address_norm[:260],
-                    parcel.get("lat"),
-                    parcel.get("lng"),
-                ),
-            )
-            if has_legacy_krovak:
-                conn.execute(
-                    """
-                    UPDATE city_building_parcels
-                    SET krovak_y = NULL, krovak_x = NULL
-                    WHERE id = ?
-                    """,
-                    (parcel_id,),
-                )
-        return inserted_count, updated_count
-
     def handle_refresh_admin_building_coordinates(self):
+        payload = self.read_json() if self.headers.get("Content-Length") else {}
+        if payload is None:
+            return
+        if not isinstance(payload, dict):
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid refresh payload"})
+            return
+        mode = payload.get("mode") or "all"
+        if mode not in COORDINATE_REFRESH_MODES:
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid mode"})
+            return
+        days = payload.get("days", COORDINATE_REFRESH_DEFAULT_DAYS)
+        if mode == "older_than" and (
+            not isinstance(days, int) or isinstance(days, bool) or days < 0
+        ):
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid days"})
+            return
+        requested_ids = payload.get("ids")
+        if mode == "ids" and (
+            not isinstance(requested_ids, list)
+            or not requested_ids
+            or len(requested_ids) > COORDINATE_REFRESH_MAX_IDS
+            or not all(isinstance(item, str) and item for item in requested_ids)
+        ):
+            self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid ids"})
+            return
+
         conn = get_conn()
         try:
-            conn.execute(create_city_building_parcels_table_sql())
-            migrate_city_building_parcels_table(conn)
             auth_user = self.get_auth_user(conn)
             if not self.is_admin(auth_user):
                 self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
                 return
 
-            rows = conn.execute(
-                """
-                SELECT id, building_object_url
-                FROM city_building_parcels
-                ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC
-                """
-            ).fetchall()
-
-            updated = 0
-            failed = 0
-            skipped = 0
-            has_legacy_krovak = city_building_table_has_legacy_krovak(conn)
-            for row in rows:
-                object_url = row["building_object_url"]
-                if not isinstance(object_url, str) or not object_url.strip():
-                    skipped += 1
-                    continue
-                try:
-                    object_html = fetch_remote_html(object_url)
-                    y, x = parse_epsg2065_coordinates_from_object_html(object_html)
-                    lat, lng = convert_epsg2065_to_wgs84(y, x)
-                    if lat is None or lng is None:
-                        failed += 1
-                        continue
-                    if has_legacy_krovak:
-                        conn.execute(
-                            """
-                            UPDATE city_building_parcels
-                            SET lat = ?, lng = ?, krovak_y = NULL, krovak_x = NULL, updated_at = CURRENT_TIMESTAMP
-                            WHERE id = ?
-                            """,
-                            (lat, lng, row["id"]),
-                        )
-                    else:
-                        conn.execute(
-                            """
-                            UPDATE city_building_parcels
-                            SET lat = ?, lng = ?, updated_at = CURRENT_TIMESTAMP
-                            WHERE id = ?
-                            """,
-                            (lat, lng, row["id"]),
-                        )
-                    updated += 1
-                except URLError:
-                    failed += 1
-                except TimeoutError:
-                    failed += 1
-
-            conn.commit()
-            self.write_json(
-                HTTPStatus.OK,
-                {"updated": updated, "failed": failed, "skipped": skipped},
+            if mode == "ids":
+                # Unknown ids are counted as skipped by the job.
+                ids = list(dict.fromkeys(requested_ids))
+            else:
+                where_sql = "1 = 1"
+                where_params: tuple = ()
+                if mode == "missing":
+                    where_sql = "lat IS NULL OR lng IS NULL"
+                elif mode == "older_than":
+                    where_sql = (
+                        "coordinates_checked_at IS NULL"
+                        " OR coordinates_checked_at < datetime('now', ?)"
+                    )
+                    where_params = (f"-{days} days",)
+                ids = [
+                    row["id"]
+                    for row in conn.execute(
+                        f"""
+                        SELECT id
+                        FROM city_building_parcels
+                        WHERE {where_sql}
+                        ORDER BY updated_at DESC, parcel_label COLLATE NOCASE ASC
+                        """,
+                        where_params,
+                    ).fetchall()
+                ]
+            job = submit_job(
+                conn,
+                "refresh_coordinates",
+                {"mode": mode, "ids": ids},
+                len(ids),
+                auth_user["id"],
             )
+            self.write_json(HTTPStatus.ACCEPTED, {"job": self.serialize_job(job)})
+        finally:
+            conn.close()
+
+    def handle_get_admin_job(self, job_id: str):
+        conn = get_conn()
+        try:
+            auth_user = self.get_auth_user(conn)
+            if not self.is_admin(auth_user):
+                self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
+                return
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not job:
+                self.write_json(HTTPStatus.NOT_FOUND, {"error": "Job not found"})
+                return
+            self.write_json(HTTPStatus.OK, {"job": self.serialize_job(job)})
         finally:
             conn.close()
 
@@ -2264,7 +5241,9 @@ class AppHandler(SimpleHTTPRequestHandler):
             cursor = conn.execute(
                 "DELETE FROM layer_points WHERE layer_key = ?", (FEELINGS_LAYER_KEY,)
             )
+            bump_layer_version(conn, FEELINGS_LAYER_KEY)
             conn.commit()
+            layer_event_feed.notify()
             self.write_json(HTTPStatus.OK, {"deleted": cursor.rowcount})
         finally:
             conn.close()
@@ -2272,13 +5251,12 @@ class AppHandler(SimpleHTTPRequestHandler):
     def handle_delete_admin_building_parcels(self):
         conn = get_conn()
         try:
-            conn.execute(create_city_building_parcels_table_sql())
-            migrate_city_building_parcels_table(conn)
             auth_user = self.get_auth_user(conn)
             if not self.is_admin(auth_user):
                 self.write_json(HTTPStatus.FORBIDDEN, {"error": "Admin only"})
                 return
             cursor = conn.execute("DELETE FROM city_building_parcels")
+            bump_layer_version(conn, CITY_BUILDINGS_LAYER_KEY)
             conn.commit()
             self.write_json(HTTPStatus.OK, {"deleted": cursor.rowcount})
         finally:
@@ -2303,7 +5281,9 @@ class AppHandler(SimpleHTTPRequestHandler):
                 "DELETE FROM layer_points WHERE id = ? AND layer_key = ?",
                 (pin_id, FEELINGS_LAYER_KEY),
             )
+            bump_layer_version(conn, FEELINGS_LAYER_KEY)
             conn.commit()
+            layer_event_feed.notify()
             self.write_json(HTTPStatus.OK, {"deleted": 1})
         finally:
             conn.close()
@@ -2314,27 +5294,840 @@ class AppHandler(SimpleHTTPRequestHandler):
             self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Missing JSON body"})
             return None
         try:
-            raw = self.rfile.read(int(content_length))
+            raw = self.read_request_body(int(content_length))
             return json.loads(raw.decode("utf-8"))
         except (ValueError, json.JSONDecodeError):
             self.write_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON"})
             return None
 
     def write_json(self, status: HTTPStatus, payload):
-        body = json.dumps(payload, ensure_ascii=True).encode("utf-8")
+        self.write_json_body(status, encode_json(payload))
+
+    def write_json_body(self, status: HTTPStatus, body: bytes, validators=None):
+        compress = len(body) >= GZIP_MIN_SIZE and self.accepts_gzip()
+        if compress:
+            etag = validators[0] if validators else None
+            compressed = gzip_body_cache.get(etag) if etag else None
+            if compressed is None:
+                compressed = gzip_bytes(body)
+                if etag:
+                    gzip_body_cache.put(etag, compressed)
+            body = compressed
         self.send_response(status)
+        if validators:
+            self.send_cache_validators(*validators, gzipped=compress)
+        elif len(body) >= GZIP_MIN_SIZE or compress:
+            self.send_header("Vary", "Accept-Encoding")
         self.send_header("Content-Type", "application/json; charset=utf-8")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
 
+    def write_json_stream(
+        self,
+        status: HTTPStatus,
+        list_key: str,
+        rows,
+        serialize_row,
+        extra: dict | None = None,
+        validators=None,
+        release=None,
+    ):
+        self.write_json_pieces(
+            status, iter_json_listing(list_key, rows, serialize_row, extra), validators, release
+        )
+
+    def write_json_pieces(self, status: HTTPStatus, pieces, validators=None, release=None):
+        if LISTING_STREAM_SPOOL:
+            self.write_spooled_json(status, pieces, validators, release)
+        else:
+            self.write_chunked_json(status, pieces, validators, release)
+
+    def send_json_stream_headers(self, status: HTTPStatus, validators, gzipped: bool):
+        self.send_response(status)
+        if validators:
+            self.send_cache_validators(*validators, gzipped=gzipped)
+        else:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+
+    def write_chunked_json(self, status: HTTPStatus, pieces, validators=None, release=None):
+        # Pieces are sent as they are produced. Headers wait for the first
+        # STREAM_CHUNK_SIZE of body, so an encoding error there is still a
+        # normal error response and a small listing gets a Content-Length.
+        # A failure after that ends the body without the terminating chunk and
+        # drops the connection, so the client sees a truncated response.
+        compressor = None
+        if self.accepts_gzip():
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        pieces = iter(pieces)
+        buffer = bytearray()
+        try:
+            for piece in pieces:
+                buffer += piece
+                if len(buffer) >= STREAM_CHUNK_SIZE:
+                    break
+            else:
+                pieces = None
+        except Exception:
+            self.log_error("Failed to encode response:\n%s", traceback.format_exc())
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        if pieces is None:
+            if release:
+                release()
+            body = compressor.compress(buffer) + compressor.flush() if compressor else buffer
+            self.send_json_stream_headers(status, validators, compressor is not None)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_json_stream_headers(status, validators, compressor is not None)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+            self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            while True:
+                self.write_stream_chunk(
+                    compressor.compress(buffer) if compressor else bytes(buffer), chunked
+                )
+                buffer.clear()
+                for piece in pieces:
+                    buffer += piece
+                    if len(buffer) >= STREAM_CHUNK_SIZE:
+                        break
+                else:
+                    break
+            if release:
+                release()
+            self.write_stream_chunk(
+                compressor.compress(buffer) + compressor.flush() if compressor else bytes(buffer),
+                chunked,
+            )
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (ConnectionError, OSError):
+            self.close_connection = True
+        except Exception:
+            self.log_error("Aborted streamed response:\n%s", traceback.format_exc())
+            self.close_connection = True
+
+    def write_stream_chunk(self, data: bytes, chunked: bool) -> None:
+        # An empty chunk would end a chunked body early.
+        if not data:
+            return
+        if chunked:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        else:
+            self.wfile.write(data)
+
+    def write_spooled_json(self, status: HTTPStatus, pieces, validators=None, release=None):
+        # LISTING_STREAM_SPOOL fallback: the body is encoded into a spool file
+        # (memory, then disk) before anything is sent, so release() hands the
+        # database connection and its read snapshot back before a slow client
+        # is fed, at the cost of time to first byte.
+        compressor = None
+        if self.accepts_gzip():
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        with tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_MEMORY_BYTES) as spool:
+            buffer = bytearray()
+            try:
+                for piece in pieces:
+                    buffer += piece
+                    if len(buffer) >= STREAM_CHUNK_SIZE:
+                        spool.write(compressor.compress(buffer) if compressor else buffer)
+                        buffer.clear()
+            except Exception:
+                self.log_error("Failed to encode response:\n%s", traceback.format_exc())
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+                return
+            spool.write(compressor.compress(buffer) + compressor.flush() if compressor else buffer)
+            if release:
+                release()
+            length = spool.tell()
+            spool.seek(0)
+
+            self.send_json_stream_headers(status, validators, compressor is not None)
+            self.send_header("Content-Length", str(length))
+            self.end_headers()
+            try:
+                while chunk := spool.read(STREAM_CHUNK_SIZE):
+                    self.wfile.write(chunk)
+            except (ConnectionError, OSError):
+                self.close_connection = True
+            except Exception:
+                # Headers are out: drop the connection so the client sees a
+                # short body instead of a response that looks complete.
+                self.log_error("Aborted response body:\n%s", traceback.format_exc())
+                self.close_connection = True
+
+    def accepts_gzip(self) -> bool:
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        for part in accept_encoding.lower().split(","):
+            coding, _, params = part.strip().partition(";")
+            if coding.strip() not in ("gzip", "*"):
+                continue
+            quality = params.strip().removeprefix("q=")
+            try:
+                return not params.strip() or float(quality) > 0
+            except ValueError:
+                return True
+        return False
+
+    def serve_static_asset(self, path: str, include_body: bool = True) -> bool:
+        asset = load_static_asset(path)
+        if not asset:
+            return False
+        compressed = asset["gzip"] is not None and self.accepts_gzip()
+        etag = gzip_etag(asset["etag"]) if compressed else asset["etag"]
+        if self.is_not_modified(asset["etag"], asset["last_modified"]):
+            candidates = self.if_none_match_candidates()
+            if candidates:
+                gzipped = gzip_etag(asset["etag"]) in candidates
+                etag = gzip_etag(asset["etag"]) if gzipped else asset["etag"]
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return True
+        body = asset["gzip"] if compressed else asset["raw"]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(asset["name"]))
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", asset["last_modified"])
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+        return True
+
+
+class KeepAliveParkingHandler(AppHandler):
+    # Handles the requests already buffered on a connection, then parks it in
+    # the server's selector so an idle keep-alive socket does not hold a worker.
+    parked = False
+
+    def handle(self):
+        self.handle_one_request()
+        while not self.close_connection and self.has_buffered_request():
+            self.handle_one_request()
+        self.parked = not self.close_connection
+
+    def has_buffered_request(self) -> bool:
+        self.set_socket_timeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.set_socket_timeout(HTTP_REQUEST_TIMEOUT)
+
+    def finish(self):
+        if not self.parked:
+            super().finish()
+
+    def resume(self):
+        self.parked = False
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+
+class ConnectionTracker:
+    """Counts open client connections so a stopping server can let them finish."""
+
+    def __init__(self):
+        self.active = 0
+        self.draining = False
+        self.condition = threading.Condition()
+
+    def opened(self) -> None:
+        with self.condition:
+            self.active += 1
+
+    def closed(self) -> None:
+        with self.condition:
+            self.active -= 1
+            if not self.active:
+                self.condition.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        with self.condition:
+            self.draining = True
+            return self.condition.wait_for(lambda: not self.active, timeout)
+
+
+class DrainingServerMixin:
+    def __init__(self, *args, **kwargs):
+        self.connection_tracker = ConnectionTracker()
+        super().__init__(*args, **kwargs)
+
+    def get_request(self):
+        request = super().get_request()
+        self.connection_tracker.opened()
+        return request
+
+    def shutdown_request(self, request):
+        # Every accepted connection ends here, including rejected, detached
+        # and timed-out parked ones.
+        try:
+            super().shutdown_request(request)
+        finally:
+            self.connection_tracker.closed()
+
+    def drain(self, timeout: float) -> bool:
+        # Called after shutdown(). With SO_REUSEPORT the kernel keeps queueing
+        # new connections on this socket until it is closed, and closing it
+        # resets whatever is still queued, so take those first.
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.socket, selectors.EVENT_READ)
+            while selector.select(0):
+                self._handle_request_noblock()
+        self.socket.close()
+        return self.connection_tracker.drain(timeout)
+
+
+class DetachingServerMixin:
+    def shutdown_request(self, request):
+        if request in detached_connections:
+            detached_connections.discard(request)
+            return
+        super().shutdown_request(request)
+
+
+class AppThreadingHTTPServer(DrainingServerMixin, DetachingServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class WorkerPoolHTTPServer(DrainingServerMixin, DetachingServerMixin, HTTPServer):
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        workers: int,
+        backlog: int,
+        bind_and_activate: bool = True,
+    ):
+        self.request_queue_size = backlog
+        # New connections are bounded by the backlog; parked connections that
+        # become readable again are always let back in.
+        self.pending_requests = queue.SimpleQueue()
+        self.backlog_slots = threading.BoundedSemaphore(backlog)
+        self.parking = queue.SimpleQueue()
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        self.closing = False
+        super().__init__(server_address, handler_class, bind_and_activate)
+        self.workers = [
+            threading.Thread(target=self.worker_loop, name=f"http-worker-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        threading.Thread(target=self.parking_loop, name="http-keepalive", daemon=True).start()
+
+    def worker_loop(self):
+        while True:
+            item = self.pending_requests.get()
+            if item is None:
+                return
+            handler, request, client_address = item
+            try:
+                if handler is None:
+                    self.backlog_slots.release()
+                    handler = self.RequestHandlerClass(request, client_address, self)
+                else:
+                    handler.resume()
+            except Exception:
+                self.handle_error(request, client_address)
+                handler = None
+            if handler is not None and handler.parked:
+                self.park(handler)
+            else:
+                self.shutdown_request(request)
+
+    def park(self, handler: KeepAliveParkingHandler) -> None:
+        self.parking.put(handler)
+        self.wake_parking_loop()
+
+    def wake_parking_loop(self):
+        try:
+            self.wakeup_writer.send(b"\0")
+        except OSError:
+            pass
+
+    def parking_loop(self):
+        deadlines: dict[KeepAliveParkingHandler, float] = {}
+        while not self.closing:
+            timeout = min(deadlines.values(), default=time.monotonic() + 1) - time.monotonic()
+            for key, _ in self.selector.select(max(0.0, min(timeout, 1.0))):
+                if key.data is None:
+                    try:
+                        while self.wakeup_reader.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                handler = key.data
+                self.selector.unregister(handler.connection)
+                deadlines.pop(handler, None)
+                self.pending_requests.put((handler, handler.connection, handler.client_address))
+            while True:
+                try:
+                    handler = self.parking.get_nowait()
+                except queue.Empty:
+                    break
+                deadlines[handler] = time.monotonic() + HTTP_IDLE_TIMEOUT
+                self.selector.register(handler.connection, selectors.EVENT_READ, handler)
+            now = time.monotonic()
+            for handler in [item for item, deadline in deadlines.items() if deadline <= now]:
+                del deadlines[handler]
+                self.selector.unregister(handler.connection)
+                self.close_parked(handler)
+        for handler in deadlines:
+            self.close_parked(handler)
+
+    def close_parked(self, handler: KeepAliveParkingHandler) -> None:
+        handler.parked = False
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.connection)
+
+    def process_request(self, request, client_address):
+        if self.backlog_slots.acquire(blocking=False):
+            self.pending_requests.put((None, request, client_address))
+        else:
+            self.reject_request(request)
+
+    def reject_request(self, request):
+        body = encode_json({"error": "Server is busy, try again later"})
+        head = (
+            "HTTP/1.1 503 Service Unavailable\r\n"
+            f"Retry-After: {HTTP_RETRY_AFTER}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Cache-Control: no-store\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        # A single non-blocking send: a fresh socket's buffer takes the whole
+        # response, and a client that cannot take it must not stall accept().
+        try:
+            request.setblocking(False)
+            request.send(head.encode("ascii") + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.closing = True
+        self.wake_parking_loop()
+        for _ in self.workers:
+            self.pending_requests.put(None)
+
+
+class LoopStreamWriter:
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter):
+        self.loop = loop
+        self.writer = writer
+
+    def write(self, data) -> int:
+        if not data:
+            return 0
+        asyncio.run_coroutine_threadsafe(self.send(bytes(data)), self.loop).result()
+        return len(data)
+
+    async def send(self, data: bytes):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def flush(self):
+        pass
+
+
+class AsyncBridgeHandler(AppHandler):
+    detached = False
+
+    def setup(self):
+        raw_request, self.wfile = self.request
+        self.rfile = io.BytesIO(raw_request)
+
+    def detach_event_stream(self):
+        self.detached = True
+        return LoopEventStream(self.wfile.loop, self.wfile.writer)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+
+    def set_socket_timeout(self, timeout: float) -> None:
+        pass
+
+    def finish(self):
+        pass
+
+    def handle_expect_100(self) -> bool:
+        return True
+
+
+def parse_request_body_length(head: bytes) -> tuple[int | None, bool]:
+    content_length = 0
+    expect_continue = False
+    for line in head.decode("latin-1").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        name = name.strip().lower()
+        value = value.strip()
+        if name == "transfer-encoding":
+            return None, False
+        if name == "expect":
+            expect_continue = value.lower() == "100-continue"
+        if name == "content-length":
+            try:
+                content_length = int(value)
+            except ValueError:
+                return None, False
+            if content_length < 0:
+                return None, False
+    return content_length, expect_continue
+
+
+class AsyncHTTPServer:
+    address_family = socket.AF_INET
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        executor_workers: int,
+        backlog: int,
+        bind_and_activate: bool = True,
+    ):
+        self.server_address = server_address
+        self.handler_class = handler_class
+        self.request_queue_size = backlog
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_workers, thread_name_prefix="http-async"
+        )
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.stop_event: asyncio.Event | None = None
+        self.connection_tracker = ConnectionTracker()
+        self.socket = socket.socket(self.address_family, socket.SOCK_STREAM)
+        if bind_and_activate:
+            try:
+                self.server_bind()
+                self.server_activate()
+            except BaseException:
+                self.server_close()
+                raise
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(self.server_address)
+        self.server_address = self.socket.getsockname()
+
+    def server_activate(self):
+        self.socket.listen(self.request_queue_size)
+
+    def serve_forever(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        server = await asyncio.start_server(self.handle_connection, sock=self.socket)
+        async with server:
+            await self.stop_event.wait()
+            # Responses are written through this loop, so requests still in
+            # the executor are drained before it stops.
+            server.close()
+            await asyncio.to_thread(self.connection_tracker.drain, WORKER_DRAIN_TIMEOUT)
+
+    def shutdown(self):
+        if self.loop and self.stop_event:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    def drain(self, timeout: float) -> bool:
+        return self.connection_tracker.drain(timeout)
+
+    def server_close(self):
+        self.socket.close()
+        self.executor.shutdown(wait=False)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client_address = writer.get_extra_info("peername")
+        detached = False
+        self.connection_tracker.opened()
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), HTTP_IDLE_TIMEOUT
+                    )
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError):
+                    break
+                body_length, expect_continue = parse_request_body_length(head)
+                if body_length is None or body_length > ASYNC_MAX_BODY_BYTES:
+                    status = (
+                        HTTPStatus.LENGTH_REQUIRED
+                        if body_length is None
+                        else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    )
+                    writer.write(
+                        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                        "Content-Length: 0\r\nConnection: close\r\n\r\n".encode("ascii")
+                    )
+                    await writer.drain()
+                    break
+                if expect_continue and body_length:
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+                body = await reader.readexactly(body_length) if body_length else b""
+                keep_alive = await self.loop.run_in_executor(
+                    self.executor,
+                    self.process_request,
+                    head + body,
+                    client_address,
+                    writer,
+                )
+                if keep_alive is None:
+                    # An event stream now owns the writer (layer_event_feed).
+                    detached = True
+                    return
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connection_tracker.closed()
+            if not detached:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+
+    def process_request(self, raw_request: bytes, client_address, writer) -> bool | None:
+        response_writer = LoopStreamWriter(self.loop, writer)
+        try:
+            handler = self.handler_class((raw_request, response_writer), client_address, self)
+        except (ConnectionError, OSError):
+            return False
+        except Exception:
+            traceback.print_exc()
+            return False
+        if handler.detached:
+            return None
+        return not handler.close_connection
+
+
+def create_server(host: str, port: int, reuse_port: bool = False):
+    if SERVER_MODE == "pool":
+        server = WorkerPoolHTTPServer(
+            (host, port),
+            KeepAliveParkingHandler,
+            HTTP_WORKERS,
+            HTTP_BACKLOG,
+            bind_and_activate=False,
+        )
+    elif SERVER_MODE == "asyncio":
+        server = AsyncHTTPServer(
+            (host, port),
+            AsyncBridgeHandler,
+            ASYNC_EXECUTOR_WORKERS,
+            HTTP_BACKLOG,
+            bind_and_activate=False,
+        )
+    else:
+        if SERVER_MODE != "threading":
+            print(f"Ignoring unknown SERVER_MODE={SERVER_MODE!r}, using threading")
+        server = AppThreadingHTTPServer((host, port), AppHandler, bind_and_activate=False)
+    try:
+        if reuse_port:
+            server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    return server
+
+
+def prefork_supported() -> bool:
+    return hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")
+
+
+def serve_worker(host: str, port: int, ready_fd: int | None = None) -> None:
+    server = create_server(host, port, reuse_port=True)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    job_runner.start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if ready_fd is not None:
+        # The parent waits for this before retiring an old worker.
+        try:
+            os.write(ready_fd, b"1")
+        except OSError:
+            pass
+        os.close(ready_fd)
+    try:
+        server.serve_forever()
+        if not server.drain(WORKER_DRAIN_TIMEOUT):
+            print(f"Worker {os.getpid()} stopped with requests still running", flush=True)
+    finally:
+        server.server_close()
+
+
+def run_prefork(host: str, port: int, workers: int) -> None:
+    children: dict[int, float] = {}
+    retiring: set[int] = set()
+    stopping = False
+    restart_requested = False
+    wakeup_reader, wakeup_writer = os.pipe()
+    os.set_blocking(wakeup_reader, False)
+    os.set_blocking(wakeup_writer, False)
+
+    def spawn() -> tuple[int, bool]:
+        ready_reader, ready_writer = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                os.close(wakeup_reader)
+                os.close(wakeup_writer)
+                os.close(ready_reader)
+                serve_worker(host, port, ready_writer)
+            except BaseException as exc:
+                print(f"Worker {os.getpid()} failed: {exc!r}", flush=True)
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+        os.close(ready_writer)
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(ready_reader, selectors.EVENT_READ)
+                ready = bool(selector.select(WORKER_READY_TIMEOUT)) and os.read(ready_reader, 1) == b"1"
+        finally:
+            os.close(ready_reader)
+        return pid, ready
+
+    def retire(pid: int) -> None:
+        retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def roll_workers() -> None:
+        # One worker at a time: the replacement is already accepting on the
+        # shared port before an old worker stops and drains.
+        for old_pid in [pid for pid in children if pid not in retiring]:
+            if stopping:
+                return
+            new_pid, ready = spawn()
+            if not ready:
+                print(f"Worker {new_pid} did not start, stopping the restart", flush=True)
+                retire(new_pid)
+                return
+            retire(old_pid)
+
+    def reap() -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started_at = children.pop(pid, None)
+            if pid in retiring:
+                retiring.discard(pid)
+                continue
+            if stopping or started_at is None:
+                continue
+            print(f"Worker {pid} exited with status {status}, restarting", flush=True)
+            if time.monotonic() - started_at < WORKER_RESPAWN_DELAY:
+                time.sleep(WORKER_RESPAWN_DELAY)
+            if not stopping:
+                spawn()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def restart(signum, frame):
+        nonlocal restart_requested
+        restart_requested = True
+
+    # Handlers only set flags; the wakeup fd gets the main loop out of select.
+    signal.set_wakeup_fd(wakeup_writer)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, restart)
+    for _ in range(workers):
+        spawn()
+    with selectors.DefaultSelector() as selector:
+        selector.register(wakeup_reader, selectors.EVENT_READ)
+        while children:
+            selector.select()
+            try:
+                while os.read(wakeup_reader, 512):
+                    pass
+            except BlockingIOError:
+                pass
+            reap()
+            if restart_requested and not stopping:
+                restart_requested = False
+                roll_workers()
+
 
 def run(host: str = "0.0.0.0", port: int = 8080):
     init_db()
-    server = ThreadingHTTPServer((host, port), AppHandler)
+    precompress_static_assets()
+    workers = WORKERS
+    if workers > 1 and not prefork_supported():
+        print("WORKERS > 1 needs os.fork and SO_REUSEPORT, running a single process")
+        workers = 1
     print(f"Serving on http://{host}:{port}")
     print(f"Using DB: {DB_PATH}")
     print(f"Seed file: {SEED_FILE} (enabled: {SEED_IF_EMPTY})")
+    if workers > 1:
+        print(f"Workers: {workers}", flush=True)
+        run_prefork(host, port, workers)
+        return
+    server = create_server(host, port)
+    job_runner.start()
     server.serve_forever()
 
 
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# server reads its configuration at import time; keep the default pins.db
+# untouched even if a test forgets to use ServerTestCase.
+os.environ.setdefault("DB_PATH", str(Path(tempfile.gettempdir()) / "pocitova-mapa-tests.db"))
+os.environ.setdefault("SEED_IF_EMPTY", "0")
+
+import server  # noqa: E402
+
+
+class ServerTestCase(unittest.TestCase):
+    """Runs every test against a fresh database in a temporary directory."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.db_path = Path(temp_dir.name) / "pins.db"
+
+        for name, value in (
+            ("DB_PATH", self.db_path),
+            ("SEED_IF_EMPTY", False),
+            ("spatial_index_state", None),
+        ):
+            patcher = mock.patch.object(server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        server.layer_cluster_indexes.clear()
+        self.addCleanup(server.layer_cluster_indexes.clear)
+        # Cached responses are keyed by layer version, which restarts with
+        # every fresh database.
+        for cache in (
+            server.hexbin_cache,
+            server.tile_cache,
+            server.listing_cache,
+            server.layer_point_count_cache,
+        ):
+            cache.entries.clear()
+        self.addCleanup(lambda: server.get_connection_pool().close_all())
+
+        server.init_db()
+
+    def connect(self):
+        conn = server.get_conn()
+        self.addCleanup(conn.close)
+        return conn
+
+    def get_layer(self, conn, layer_key: str):
+        return conn.execute("SELECT * FROM layers WHERE key = ?", (layer_key,)).fetchone()
+
+
+class AppServerTestCase(ServerTestCase):
+    """Serves the app on an ephemeral port in a background thread."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.httpd = server.create_server("127.0.0.1", 0)
+        thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        thread.start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+    def request(self, method: str, path: str, payload=None, token: str | None = None):
+        request = Request(
+            f"http://127.0.0.1:{self.httpd.server_port}{path}",
+            data=None if payload is None else json.dumps(payload).encode("utf-8"),
+            method=method,
+        )
+        if token:
+            request.add_header("X-Auth-Token", token)
+        try:
+            with urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except HTTPError as error:
+            with error:
+                return error.code, json.loads(error.read() or b"null")
+
+    def register(self, email: str = "tester@example.test", name: str = "Tester") -> str:
+        status, body = self.request("POST", "/api/auth/register", {"email": email, "name": name})
+        self.assertEqual(status, 201, body)
+        return body["token"]
@@ -0,0 +1,113 @@
+import json
+import unittest
+from urllib.parse import quote
+
+from support import AppServerTestCase, ServerTestCase, server
+
+
+class LayerPointSyncTest(AppServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.token = self.register()
+
+    def create_point(self, point_id: str) -> None:
+        status, body = self.request(
+            "POST",
+            f"/api/layers/{server.FEELINGS_LAYER_KEY}/points",
+            {"id": point_id, "lat": 48.94, "lng": 16.73, "type": "good"},
+            self.token,
+        )
+        self.assertEqual(status, 201, body)
+
+    def changes(self, cursor: str) -> dict:
+        status, body = self.request(
+            "GET", f"/api/layers/{server.FEELINGS_LAYER_KEY}/points?since={quote(cursor)}"
+        )
+        self.assertEqual(status, 200, body)
+        return body
+
+    def test_since_returns_updates_and_deletes_after_the_cursor(self):
+        self.create_point("a")
+        self.create_point("b")
+        status, listing = self.request("GET", f"/api/layers/{server.FEELINGS_LAYER_KEY}/points")
+        self.assertEqual(status, 200)
+        cursor = listing["cursor"]
+
+        status, _ = self.request("PUT", "/api/pins/a", {"comment": "edited"}, self.token)
+        self.assertEqual(status, 200)
+        status, _ = self.request("DELETE", "/api/pins/b", token=self.token)
+        self.assertEqual(status, 200)
+        self.create_point("c")
+
+        changes = self.changes(cursor)
+        self.assertFalse(changes["reset"])
+        self.assertEqual([point["id"] for point in changes["points"]], ["a", "c"])
+        self.assertEqual(changes["points"][0]["comment"], "edited")
+        self.assertEqual(changes["deleted"], ["b"])
+
+        caught_up = self.changes(changes["cursor"])
+        self.assertEqual((caught_up["points"], caught_up["deleted"]), ([], []))
+        self.assertEqual(caught_up["cursor"], changes["cursor"])
+
+    def test_unknown_or_expired_cursor_resets_to_a_full_listing(self):
+        self.create_point("a")
+        status, listing = self.request("GET", f"/api/layers/{server.FEELINGS_LAYER_KEY}/points")
+        cursor = listing["cursor"]
+        self.create_point("b")
+
+        foreign = self.changes("other-epoch.0")
+        self.assertTrue(foreign["reset"])
+        self.assertEqual({point["id"] for point in foreign["points"]}, {"a", "b"})
+
+        conn = self.connect()
+        conn.execute(
+            """
+            UPDATE app_meta SET value = (
+              SELECT value FROM app_meta WHERE key = 'layer_points_change_seq'
+            )
+            WHERE key = 'layer_points_tombstone_floor'
+            """
+        )
+        conn.commit()
+        expired = self.changes(cursor)
+        self.assertTrue(expired["reset"])
+        self.assertEqual(expired["deleted"], [])
+        self.assertEqual({point["id"] for point in expired["points"]}, {"a", "b"})
+
+
+class LayerPointEventsTest(ServerTestCase):
+    def insert_point(self, conn, point_id: str) -> None:
+        conn.execute(
+            "INSERT INTO layer_points (id, layer_key, lat, lng) VALUES (?, ?, 48.94, 16.73)",
+            (point_id, server.FEELINGS_LAYER_KEY),
+        )
+
+    def events(self, conn, since: int) -> list[tuple[str, str]]:
+        current = server.read_app_meta_int(conn, "layer_points_change_seq")
+        body = server.load_layer_point_events(
+            conn, server.FEELINGS_LAYER_KEY, since, current, lambda row: {"id": row["id"]}
+        ).decode("utf-8")
+        events = []
+        for block in body.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            events.append((fields["event"], json.loads(fields["data"])["id"]))
+        return events
+
+    def test_inserts_after_the_cursor_are_create_events(self):
+        conn = self.connect()
+        self.insert_point(conn, "old")
+        since = server.read_app_meta_int(conn, "layer_points_change_seq")
+        self.insert_point(conn, "new")
+        conn.execute("UPDATE layer_points SET comment = 'x' WHERE id IN ('old', 'new')")
+        self.insert_point(conn, "gone")
+        conn.execute("DELETE FROM layer_points WHERE id = 'gone'")
+        conn.commit()
+
+        self.assertEqual(
+            self.events(conn, since),
+            [("update", "old"), ("create", "new"), ("delete", "gone")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from support import ServerTestCase, server
+
+
+class LayerClusterIndexTest(ServerTestCase):
+    def insert_parcel(self, conn, parcel_id: str, lat, lng) -> None:
+        conn.execute(
+            """
+            INSERT INTO city_building_parcels (id, source_url, parcel_label, parcel_url, lat, lng)
+            VALUES (?, '', ?, ?, ?, ?)
+            """,
+            (parcel_id, parcel_id, f"https://example.test/{parcel_id}", lat, lng),
+        )
+
+    def test_city_parcels_without_coordinates_are_skipped(self):
+        conn = self.connect()
+        self.insert_parcel(conn, "located", 48.94, 16.73)
+        self.insert_parcel(conn, "pending", None, None)
+        self.insert_parcel(conn, "half", 48.95, None)
+        server.bump_layer_version(conn, server.CITY_BUILDINGS_LAYER_KEY)
+        conn.commit()
+
+        index = server.get_layer_cluster_index(server.CITY_BUILDINGS_LAYER_KEY)
+        with index.lock:
+            index.sync(conn, self.get_layer(conn, server.CITY_BUILDINGS_LAYER_KEY))
+            clusters = index.query(10, (48.0, 16.0, 49.5, 17.5))
+
+        self.assertEqual(set(index.points), {"located"})
+        self.assertEqual(sum(cluster["count"] for cluster in clusters), 1)
+
+    def test_add_without_coordinates_drops_the_point(self):
+        index = server.LayerClusterIndex()
+        index.add("a", 48.94, 16.73, "good")
+        index.add("a", None, None, "good")
+
+        self.assertEqual(index.points, {})
+        self.assertTrue(all(not cells for cells in index.levels))
+
+
+if __name__ == "__main__":
+    unittest.main()
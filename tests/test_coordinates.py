@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+from support import ServerTestCase, server
+
+
+class RefreshCoordinatesTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        conn = self.connect()
+        for parcel_id, lat, lng in (("good", 48.1, 16.1), ("down", 48.2, 16.2)):
+            conn.execute(
+                """
+                INSERT INTO city_building_parcels (
+                    id, source_url, parcel_label, parcel_url, building_object_url, lat, lng
+                )
+                VALUES (?, '', ?, ?, ?, ?, ?)
+                """,
+                (
+                    parcel_id,
+                    parcel_id,
+                    f"http://cadastre.test/parcel/{parcel_id}",
+                    f"http://cadastre.test/object/{parcel_id}",
+                    lat,
+                    lng,
+                ),
+            )
+        conn.commit()
+
+    def parcels(self):
+        conn = self.connect()
+        return {
+            row["id"]: (row["lat"], row["lng"], row["coordinates_checked_at"])
+            for row in conn.execute(
+                "SELECT id, lat, lng, coordinates_checked_at FROM city_building_parcels"
+            )
+        }
+
+    def test_only_retrieved_pages_are_stamped_and_cache_is_revalidated(self):
+        calls = []
+
+        def fetch_building_coordinates(object_url, revalidate=False):
+            calls.append((object_url, revalidate))
+            return None if object_url.endswith("/down") else (48.9, 16.7)
+
+        conn = self.connect()
+        result = {}
+        with mock.patch.object(server, "fetch_building_coordinates", fetch_building_coordinates):
+            counts = server.run_refresh_coordinates_batch(
+                conn, {"ids": ["good", "down"]}, 0, 2, result
+            )
+        conn.commit()
+
+        self.assertEqual(counts, (1, 1, 0))
+        self.assertTrue(all(revalidate for _, revalidate in calls))
+        parcels = self.parcels()
+        self.assertEqual(parcels["good"][:2], (48.9, 16.7))
+        self.assertIsNotNone(parcels["good"][2])
+        self.assertEqual(parcels["down"], (48.2, 16.2, None))
+
+    def test_import_keeps_coordinates_when_object_page_fails(self):
+        def parcel(parcel_id: str, lat, lng, coordinates_checked: bool) -> dict:
+            return {
+                "parcel_label": parcel_id,
+                "parcel_url": f"http://cadastre.test/parcel/{parcel_id}",
+                "building_object_url": f"http://cadastre.test/object/{parcel_id}",
+                "lat": lat,
+                "lng": lng,
+                "coordinates_checked": coordinates_checked,
+            }
+
+        conn = self.connect()
+        server.upsert_city_building_parcels(
+            conn,
+            [parcel("down", None, None, False), parcel("good", 48.9, 16.7, True)],
+            "http://cadastre.test/list",
+        )
+        conn.commit()
+
+        parcels = self.parcels()
+        self.assertEqual(parcels["down"], (48.2, 16.2, None))
+        self.assertEqual(parcels["good"][:2], (48.9, 16.7))
+        self.assertIsNotNone(parcels["good"][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
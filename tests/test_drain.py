@@ -0,0 +1,47 @@
+import http.client
+import threading
+import unittest
+from unittest import mock
+
+from support import AppServerTestCase, server
+
+
+class ServerDrainTest(AppServerTestCase):
+    def test_drain_waits_for_the_request_in_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        write_json = server.AppHandler.write_json
+
+        def slow_write_json(handler, status, payload):
+            started.set()
+            release.wait(5)
+            write_json(handler, status, payload)
+
+        connection = http.client.HTTPConnection("127.0.0.1", self.httpd.server_port, timeout=10)
+        self.addCleanup(connection.close)
+        drained = []
+
+        def stop():
+            self.httpd.shutdown()
+            drained.append(self.httpd.drain(5))
+
+        with mock.patch.object(server.AppHandler, "write_json", slow_write_json):
+            connection.request("GET", "/healthz")
+            self.assertTrue(started.wait(5))
+            stopper = threading.Thread(target=stop)
+            stopper.start()
+            stopper.join(0.2)
+            self.assertTrue(stopper.is_alive())
+
+            release.set()
+            response = connection.getresponse()
+            body = response.read()
+            stopper.join(5)
+
+        self.assertEqual((response.status, body), (200, b'{"status": "ok"}'))
+        self.assertEqual(response.getheader("Connection"), "close")
+        self.assertEqual(drained, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
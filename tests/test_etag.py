@@ -0,0 +1,84 @@
+import gzip
+import http.client
+import unittest
+from unittest import mock
+
+from support import AppServerTestCase, server
+
+
+class ResponseCachingTest(AppServerTestCase):
+    points_path = f"/api/layers/{server.FEELINGS_LAYER_KEY}/points"
+
+    def get(self, path: str, headers: dict | None = None, method: str = "GET"):
+        connection = http.client.HTTPConnection("127.0.0.1", self.httpd.server_port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_matching_if_none_match_is_not_modified(self):
+        response, body = self.get(self.points_path)
+        etag = response.getheader("ETag")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+        for if_none_match in (etag, f'"other", W/{etag}'):
+            with self.subTest(if_none_match=if_none_match):
+                response, not_modified_body = self.get(
+                    self.points_path, {"If-None-Match": if_none_match}
+                )
+                self.assertEqual(response.status, 304)
+                self.assertEqual(response.getheader("ETag"), etag)
+                self.assertEqual(not_modified_body, b"")
+
+        token = self.register()
+        status, _ = self.request(
+            "POST", self.points_path, {"lat": 48.94, "lng": 16.73, "type": "good"}, token
+        )
+        self.assertEqual(status, 201)
+        response, changed_body = self.get(self.points_path, {"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+        self.assertNotEqual(changed_body, body)
+
+    def test_gzip_body_has_its_own_etag(self):
+        with mock.patch.object(server, "GZIP_MIN_SIZE", 0):
+            response, plain_body = self.get(self.points_path)
+            etag = response.getheader("ETag")
+            response, gzip_body = self.get(self.points_path, {"Accept-Encoding": "gzip"})
+            gz_etag = response.getheader("ETag")
+
+            self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+            self.assertEqual(gz_etag, server.gzip_etag(etag))
+            self.assertEqual(gz_etag, etag[:-1] + '-gz"')
+            self.assertEqual(gzip.decompress(gzip_body), plain_body)
+            self.assertIn("Accept-Encoding", response.getheader("Vary"))
+
+            response, _ = self.get(
+                self.points_path, {"Accept-Encoding": "gzip", "If-None-Match": gz_etag}
+            )
+            self.assertEqual(response.status, 304)
+            self.assertEqual(response.getheader("ETag"), gz_etag)
+
+    def test_cache_control_policy(self):
+        for method, path, expected in (
+            ("GET", "/api/layers", "no-cache"),
+            ("GET", "/api/layers/missing/points", "no-store"),
+            ("GET", "/api/auth/me", "no-store"),
+            ("POST", "/api/auth/logout", "no-store"),
+            ("GET", "/healthz", "no-store"),
+            ("GET", "/missing.png", "no-store"),
+            ("GET", "/", "no-cache"),
+            ("GET", "/index.html", "no-cache"),
+            ("GET", "/app.js", "no-cache"),
+            ("GET", "/styles.css", "no-cache"),
+            ("GET", "/render.yaml", f"public, max-age={server.STATIC_CACHE_MAX_AGE}"),
+        ):
+            with self.subTest(method=method, path=path):
+                response, _ = self.get(path, method=method)
+                self.assertEqual(response.getheader("Cache-Control"), expected)
+                self.assertEqual(len(response.headers.get_all("Cache-Control")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
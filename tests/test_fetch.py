@@ -0,0 +1,187 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+
+from support import ServerTestCase, server
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.requests.append((self.path, dict(self.headers), self.client_address[1]))
+            stub.inflight += 1
+            stub.max_inflight = max(stub.max_inflight, stub.inflight)
+        try:
+            stub.routes[self.path](self)
+        finally:
+            with stub.lock:
+                stub.inflight -= 1
+
+    def respond(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.max_inflight = 0
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    def paths(self) -> list[str]:
+        return [path for path, _, _ in self.requests]
+
+
+class RemoteFetchTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.stub = StubServer()
+        thread = threading.Thread(
+            target=self.stub.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        thread.start()
+        self.addCleanup(self.stub.server_close)
+        self.addCleanup(self.stub.shutdown)
+
+        for patcher in (
+            mock.patch.object(server, "outbound_pool", server.HostConnectionPool(4)),
+            mock.patch.dict(server.fetch_host_slots, clear=True),
+            mock.patch.object(server, "FETCH_RETRY_BACKOFF_SECONDS", 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent_fetches_are_bounded_per_host_and_keep_order(self):
+        def item(handler):
+            index = int(handler.path.rsplit("/", 1)[1])
+            # Later items answer first, so completion order is reversed.
+            time.sleep(0.02 * (8 - index))
+            handler.respond(200, f"item {index}".encode())
+
+        urls = []
+        for index in range(8):
+            self.stub.routes[f"/item/{index}"] = item
+            urls.append(self.stub.url(f"/item/{index}"))
+
+        with mock.patch.object(server, "FETCH_PER_HOST_LIMIT", 2), mock.patch.object(
+            server, "IMPORT_CONCURRENCY", 8
+        ):
+            results = server.run_concurrent_fetches(server.fetch_remote_bytes, urls)
+
+        self.assertEqual([body for body, _ in results], [f"item {i}".encode() for i in range(8)])
+        self.assertEqual(self.stub.max_inflight, 2)
+
+    def test_stale_keep_alive_socket_is_retried_on_a_fresh_connection(self):
+        def close_after_response(handler):
+            # Keep-alive is advertised, but the server drops the socket anyway,
+            # like an upstream idle timeout.
+            handler.respond(200, handler.path.encode())
+            handler.close_connection = True
+
+        self.stub.routes["/a"] = close_after_response
+        self.stub.routes["/b"] = close_after_response
+
+        self.assertEqual(server.fetch_remote_bytes(self.stub.url("/a"))[0], b"/a")
+        self.assertEqual(sum(len(idle) for idle in server.outbound_pool.idle.values()), 1)
+        time.sleep(0.1)
+        self.assertEqual(server.fetch_remote_bytes(self.stub.url("/b"))[0], b"/b")
+
+        self.assertEqual(self.stub.paths(), ["/a", "/b"])
+        client_ports = {port for _, _, port in self.stub.requests}
+        self.assertEqual(len(client_ports), 2)
+
+    def test_service_unavailable_is_retried(self):
+        attempts = []
+
+        def flaky(handler):
+            attempts.append(handler.path)
+            if len(attempts) == 1:
+                handler.respond(503, b"busy")
+            else:
+                handler.respond(200, b"ok")
+
+        self.stub.routes["/flaky"] = flaky
+
+        self.assertEqual(server.fetch_remote_bytes(self.stub.url("/flaky"))[0], b"ok")
+        self.assertEqual(len(attempts), 2)
+
+    def test_redirect_drops_conditional_headers_for_the_new_url(self):
+        self.stub.routes["/old"] = lambda handler: handler.respond(
+            302, headers={"Location": "/new"}
+        )
+
+        def new(handler):
+            if handler.headers.get("If-None-Match"):
+                handler.respond(304)
+            else:
+                handler.respond(200, b"new body", {"ETag": '"v2"'})
+
+        self.stub.routes["/new"] = new
+        old_url = self.stub.url("/old")
+        server.store_http_cache_entry(old_url, b"old body", "text/html", '"v1"', None)
+        conn = self.connect()
+        conn.execute("UPDATE http_cache SET fetched_at = 0 WHERE url = ?", (old_url,))
+        conn.commit()
+
+        self.assertEqual(server.fetch_remote_bytes(old_url)[0], b"new body")
+
+        (_, old_headers, _), (_, new_headers, _) = self.stub.requests
+        self.assertEqual(old_headers.get("If-None-Match"), '"v1"')
+        self.assertNotIn("If-None-Match", new_headers)
+        cached, fresh = server.load_http_cache_entry(old_url)
+        self.assertTrue(fresh)
+        self.assertEqual(cached["body"], b"new body")
+
+    def test_redirect_without_location_is_an_error(self):
+        self.stub.routes["/nowhere"] = lambda handler: handler.respond(302, b"moved")
+        url = self.stub.url("/nowhere")
+
+        with self.assertRaises(HTTPError) as raised:
+            server.fetch_remote_bytes(url)
+
+        self.assertEqual(raised.exception.code, 302)
+        self.assertEqual(server.load_http_cache_entry(url), (None, False))
+
+    def test_revalidate_checks_fresh_entries_with_the_server(self):
+        def page(handler):
+            if handler.headers.get("If-None-Match") == '"v1"':
+                handler.respond(304)
+            else:
+                handler.respond(200, b"changed")
+
+        self.stub.routes["/page"] = page
+        url = self.stub.url("/page")
+        server.store_http_cache_entry(url, b"cached", "text/html", '"v1"', None)
+
+        self.assertEqual(server.fetch_remote_bytes(url)[0], b"cached")
+        self.assertEqual(self.stub.requests, [])
+        self.assertEqual(server.fetch_remote_bytes(url, revalidate=True)[0], b"cached")
+        self.assertEqual(self.stub.paths(), ["/page"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from unittest import mock
+
+from support import ServerTestCase, server
+
+
+class HttpCacheTest(ServerTestCase):
+    def cache_state(self):
+        conn = self.connect()
+        urls = [row["url"] for row in conn.execute("SELECT url FROM http_cache ORDER BY url")]
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        return urls, total, server.read_app_meta_int(conn, "http_cache_bytes")
+
+    def test_running_total_follows_stores_and_evicts_least_recently_used(self):
+        with mock.patch.object(server, "HTTP_CACHE_MAX_BYTES", 250):
+            with mock.patch.object(server.time, "time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+                server.store_http_cache_entry("http://a/", b"a" * 100, "text/html", None, None)
+                server.store_http_cache_entry("http://b/", b"b" * 100, "text/html", None, None)
+                server.store_http_cache_entry("http://a/", b"a" * 50, "text/html", None, None)
+                self.assertEqual(self.cache_state(), (["http://a/", "http://b/"], 150, 150))
+
+                server.store_http_cache_entry("http://c/", b"c" * 120, "text/html", None, None)
+
+        self.assertEqual(self.cache_state(), (["http://a/", "http://c/"], 170, 170))
+
+    def test_fresh_hit_is_served_without_a_second_connection(self):
+        server.store_http_cache_entry("http://a/", b"cached", "text/html", None, None)
+        with mock.patch.object(server, "get_conn", wraps=server.get_conn) as get_conn:
+            self.assertEqual(server.fetch_remote_bytes("http://a/"), (b"cached", "text/html"))
+        self.assertEqual(get_conn.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
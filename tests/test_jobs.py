@@ -0,0 +1,160 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+from support import ServerTestCase, server
+
+
+class Crash(BaseException):
+    """Stands in for the process dying in the middle of a batch."""
+
+
+class JobRunTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.batches = []
+        self.on_batch = None
+        for patcher in (
+            mock.patch.dict(server.JOB_HANDLERS, {"test": self.run_batch}),
+            mock.patch.object(server, "JOB_BATCH_SIZE", 2),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_batch(self, conn, payload, start, end, result):
+        if self.on_batch is not None:
+            self.on_batch(conn, start, end)
+        self.batches.append((start, end))
+        result["seen"] = result.get("seen", 0) + end - start
+        return end - start, 0, 0
+
+    def submit(self, total: int) -> str:
+        conn = self.connect()
+        return server.submit_job(conn, "test", {}, total, None)["id"]
+
+    def job(self, job_id: str):
+        conn = server.get_conn()
+        try:
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def test_interrupted_job_resumes_from_last_committed_batch(self):
+        job_id = self.submit(5)
+
+        def crash_on_second_batch(conn, start, end):
+            if start == 2:
+                raise Crash
+
+        self.on_batch = crash_on_second_batch
+        self.assertEqual(server.claim_next_job(), job_id)
+        with self.assertRaises(Crash):
+            server.run_job(job_id)
+        self.assertEqual(self.job(job_id)["position"], 2)
+        self.assertEqual(self.job(job_id)["status"], "running")
+
+        self.on_batch = None
+        conn = self.connect()
+        server.requeue_interrupted_jobs(conn)
+        conn.commit()
+        self.assertEqual(server.claim_next_job(), job_id)
+        server.run_job(job_id)
+
+        job = self.job(job_id)
+        self.assertEqual(self.batches, [(0, 2), (2, 4), (4, 5)])
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["done"], 5)
+        self.assertEqual(job["started_position"], 2)
+        self.assertEqual(json.loads(job["result_json"]), {"seen": 5})
+
+    def test_heartbeat_keeps_a_long_batch_from_being_taken_over(self):
+        job_id = self.submit(2)
+        claims_during_batch = []
+
+        def slow_batch(conn, start, end):
+            other = server.get_conn()
+            try:
+                other.execute(
+                    "UPDATE jobs SET updated_at = '2000-01-01 00:00:00' WHERE id = ?", (job_id,)
+                )
+                other.commit()
+            finally:
+                other.close()
+            time.sleep(0.3)
+            claims_during_batch.append(server.claim_next_job())
+
+        self.on_batch = slow_batch
+        with mock.patch.object(server, "JOB_HEARTBEAT_SECONDS", 0.05):
+            self.assertEqual(server.claim_next_job(), job_id)
+            server.run_job(job_id)
+
+        self.assertEqual(claims_during_batch, [None])
+        self.assertEqual(self.job(job_id)["status"], "done")
+
+    def test_taken_over_job_discards_its_batch(self):
+        job_id = self.submit(4)
+
+        def lose_ownership(conn, start, end):
+            other = server.get_conn()
+            try:
+                other.execute("UPDATE jobs SET owner = 'other:1' WHERE id = ?", (job_id,))
+                other.commit()
+            finally:
+                other.close()
+            conn.execute("INSERT INTO app_meta (key, value) VALUES ('test_batch', 'applied')")
+
+        self.on_batch = lose_ownership
+        self.assertEqual(server.claim_next_job(), job_id)
+        server.run_job(job_id)
+
+        job = self.job(job_id)
+        self.assertEqual(self.batches, [(0, 2)])
+        self.assertEqual(job["position"], 0)
+        self.assertEqual(job["status"], "running")
+        self.assertEqual(job["owner"], "other:1")
+        conn = self.connect()
+        self.assertIsNone(
+            conn.execute("SELECT value FROM app_meta WHERE key = 'test_batch'").fetchone()
+        )
+
+
+class ImportParcelsBatchTest(ServerTestCase):
+    def test_unchanged_parcels_are_counted_as_skipped(self):
+        parcels = [
+            {"parcel_label": label, "parcel_url": f"http://cadastre.test/parcel/{label}"}
+            for label in ("1/1", "1/2")
+        ]
+
+        def enrich(parcel):
+            details = {
+                "building_object_url": f"{parcel['parcel_url']}/object",
+                "object_type": "rodinny dum",
+                "street": "",
+                "address": "",
+                "lat": 48.94,
+                "lng": 16.73,
+                "coordinates_checked": True,
+            }
+            return {**parcel, **details}, False, False
+
+        conn = self.connect()
+        payload = {"parcels": parcels, "source_url": "http://cadastre.test/list"}
+        result = {}
+        with mock.patch.object(server, "enrich_building_parcel", enrich):
+            first = server.run_import_parcels_batch(conn, payload, 0, 2, result)
+            conn.commit()
+            version = self.get_layer(conn, server.CITY_BUILDINGS_LAYER_KEY)["data_version"]
+            second = server.run_import_parcels_batch(conn, payload, 0, 2, result)
+            conn.commit()
+
+        self.assertEqual(first, (2, 0, 0))
+        self.assertEqual(second, (0, 0, 2))
+        self.assertEqual((result["inserted"], result["unchanged"]), (2, 2))
+        self.assertEqual(
+            self.get_layer(conn, server.CITY_BUILDINGS_LAYER_KEY)["data_version"], version
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from support import AppServerTestCase, server
+
+
+class LayerListTest(AppServerTestCase):
+    def get_layers(self, etag: str | None = None):
+        request = Request(f"http://127.0.0.1:{self.httpd.server_port}/api/layers")
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urlopen(request, timeout=10) as response:
+                return response.status, response.headers["ETag"], response.read()
+        except HTTPError as error:
+            with error:
+                return error.code, error.headers["ETag"], error.read()
+
+    def point_counts(self, body: bytes) -> dict:
+        return {layer["key"]: layer["point_count"] for layer in json.loads(body)["layers"]}
+
+    def test_point_counts_follow_layer_versions_and_304_skips_counting(self):
+        token = self.register()
+        status, etag, body = self.get_layers()
+        self.assertEqual(status, 200)
+        self.assertEqual(self.point_counts(body)[server.FEELINGS_LAYER_KEY], 0)
+
+        with mock.patch.object(
+            server.AppHandler, "count_listing_rows", side_effect=AssertionError("counted")
+        ):
+            status, not_modified_etag, _ = self.get_layers(etag)
+        self.assertEqual((status, not_modified_etag), (304, etag))
+
+        status, _ = self.request(
+            "POST",
+            f"/api/layers/{server.FEELINGS_LAYER_KEY}/points",
+            {"lat": 48.94, "lng": 16.73, "type": "good"},
+            token,
+        )
+        self.assertEqual(status, 201)
+        status, new_etag, body = self.get_layers(etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(self.point_counts(body)[server.FEELINGS_LAYER_KEY], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
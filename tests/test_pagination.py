@@ -0,0 +1,119 @@
+import unittest
+
+from support import AppServerTestCase, server
+
+
+class KeysetPaginationTest(AppServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.admin_token = self.register("admin@example.test", "Admin")
+        conn = self.connect()
+        conn.execute("UPDATE users SET role = 'admin' WHERE email = 'admin@example.test'")
+        conn.commit()
+
+    def collect(self, path: str, list_key: str, limit: int) -> tuple[list[str], int]:
+        ids = []
+        pages = 0
+        cursor = None
+        while True:
+            query = f"limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+            status, body = self.request("GET", f"{path}?{query}", token=self.admin_token)
+            self.assertEqual(status, 200, body)
+            self.assertLessEqual(len(body[list_key]), limit)
+            ids.extend(item["id"] for item in body[list_key])
+            pages += 1
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids, pages
+
+    def test_layer_points_pages_break_created_at_ties_by_id(self):
+        conn = self.connect()
+        for point_id, created_at in (
+            ("e", "2026-01-02 00:00:00"),
+            ("b", "2026-01-02 00:00:00"),
+            ("z", "2026-01-01 00:00:00"),
+            ("d", "2026-01-02 00:00:00"),
+            ("a", "2026-01-02 00:00:00"),
+            ("c", "2026-01-02 00:00:00"),
+            ("y", "2026-01-03 00:00:00"),
+        ):
+            conn.execute(
+                """
+                INSERT INTO layer_points (id, layer_key, lat, lng, created_at)
+                VALUES (?, ?, 48.94, 16.73, ?)
+                """,
+                (point_id, server.FEELINGS_LAYER_KEY, created_at),
+            )
+        server.bump_layer_version(conn, server.FEELINGS_LAYER_KEY)
+        conn.commit()
+
+        ids, pages = self.collect(f"/api/layers/{server.FEELINGS_LAYER_KEY}/points", "points", 2)
+
+        self.assertEqual(ids, ["z", "a", "b", "c", "d", "e", "y"])
+        self.assertEqual(pages, 4)
+
+    def test_admin_users_pages_follow_role_and_email(self):
+        for index in (3, 1, 4, 2):
+            self.register(f"user{index}@example.test", f"User {index}")
+
+        ids, pages = self.collect("/api/admin/users", "users", 2)
+
+        conn = self.connect()
+        emails = [
+            conn.execute("SELECT email FROM users WHERE id = ?", (user_id,)).fetchone()["email"]
+            for user_id in ids
+        ]
+        self.assertEqual(
+            emails,
+            ["admin@example.test"] + [f"user{index}@example.test" for index in (1, 2, 3, 4)],
+        )
+        self.assertEqual(pages, 3)
+
+    def test_admin_parcels_pages_break_label_ties_by_id(self):
+        conn = self.connect()
+        for parcel_id, label, updated_at in (
+            ("p3", "10/1", "2026-01-01 00:00:00"),
+            ("p1", "10/1", "2026-01-01 00:00:00"),
+            ("p2", "9/2", "2026-01-01 00:00:00"),
+            ("p4", "1/1", "2026-01-02 00:00:00"),
+            ("p5", "10/1", "2026-01-01 00:00:00"),
+        ):
+            conn.execute(
+                """
+                INSERT INTO city_building_parcels
+                  (id, source_url, parcel_label, parcel_url, updated_at)
+                VALUES (?, '', ?, ?, ?)
+                """,
+                (parcel_id, label, f"https://example.test/{parcel_id}", updated_at),
+            )
+        conn.commit()
+
+        ids, pages = self.collect("/api/admin/buildings/parcels", "parcels", 2)
+
+        self.assertEqual(ids, ["p4", "p1", "p3", "p5", "p2"])
+        self.assertEqual(pages, 3)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        points_path = f"/api/layers/{server.FEELINGS_LAYER_KEY}/points"
+        # A well-formed cursor of the points listing has one value too few
+        # for the admin lists.
+        points_cursor = server.encode_page_cursor(["2026-01-01 00:00:00", "a"])
+        for path in (points_path, "/api/admin/users", "/api/admin/buildings/parcels"):
+            for query in (
+                "limit=2&cursor=not-a-cursor",
+                "limit=2&cursor=" + server.encode_page_cursor([{"nested": 1}, "a"]),
+                "cursor=" + points_cursor,
+                "limit=0",
+            ):
+                with self.subTest(path=path, query=query):
+                    status, body = self.request("GET", f"{path}?{query}", token=self.admin_token)
+                    self.assertEqual(status, 400, body)
+        for path in ("/api/admin/users", "/api/admin/buildings/parcels"):
+            status, _ = self.request(
+                "GET", f"{path}?limit=2&cursor={points_cursor}", token=self.admin_token
+            )
+            self.assertEqual(status, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from support import ServerTestCase, server
+
+
+class ConnectionPoolTest(ServerTestCase):
+    def test_released_connection_is_reused(self):
+        first = server.get_conn()
+        first.close()
+        second = server.get_conn()
+        try:
+            self.assertIs(second, first)
+        finally:
+            second.close()
+
+    def test_close_is_idempotent(self):
+        conn = server.get_conn()
+        conn.close()
+        conn.close()
+
+        first = server.get_conn()
+        second = server.get_conn()
+        try:
+            self.assertIsNot(first, second)
+        finally:
+            first.close()
+            second.close()
+
+    def test_release_rolls_back_and_resets_row_factory(self):
+        conn = server.get_conn()
+        conn.row_factory = None
+        conn.execute("INSERT INTO app_meta (key, value) VALUES ('test_uncommitted', '1')")
+        conn.close()
+
+        conn = self.connect()
+        self.assertIs(conn.row_factory, sqlite3.Row)
+        self.assertIsNone(
+            conn.execute("SELECT value FROM app_meta WHERE key = 'test_uncommitted'").fetchone()
+        )
+
+    def test_broken_idle_connection_is_replaced(self):
+        conn = server.get_conn()
+        conn.close()
+        sqlite3.Connection.close(conn)
+
+        replacement = self.connect()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(replacement.execute("SELECT 1").fetchone()[0], 1)
+
+    def test_idle_connections_are_capped_at_pool_size(self):
+        with mock.patch.object(server, "DB_POOL_SIZE", 2):
+            conns = [server.get_conn() for _ in range(4)]
+            for conn in conns:
+                conn.close()
+            self.assertEqual(server.get_connection_pool().idle.qsize(), 2)
+
+    def test_concurrent_use_from_many_threads(self):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(50):
+                    conn = server.get_conn()
+                    try:
+                        conn.execute("SELECT COUNT(*) FROM layers").fetchone()
+                    finally:
+                        conn.close()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(server.get_connection_pool().idle.qsize(), server.DB_POOL_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import gzip
+import http.client
+import json
+import unittest
+from unittest import mock
+
+from support import AppServerTestCase, server
+
+
+class ListingStreamTest(AppServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for patcher in (
+            mock.patch.object(server, "LISTING_CACHE_MAX_ROWS", 0),
+            mock.patch.object(server, "STREAM_CHUNK_SIZE", 256),
+            mock.patch.object(server, "LISTING_STREAM_SPOOL", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        conn = self.connect()
+        for index in range(20):
+            conn.execute(
+                "INSERT INTO layer_points (id, layer_key, lat, lng) VALUES (?, ?, 48.94, 16.73)",
+                (f"p{index:02d}", server.FEELINGS_LAYER_KEY),
+            )
+        server.bump_layer_version(conn, server.FEELINGS_LAYER_KEY)
+        conn.commit()
+
+    def get_points(self, headers: dict | None = None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.httpd.server_port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request(
+            "GET", f"/api/layers/{server.FEELINGS_LAYER_KEY}/points", headers=headers or {}
+        )
+        return connection.getresponse()
+
+    def fail_on_call(self, failing_call: int):
+        serialize = server.AppHandler.serialize_layer_point
+        calls = []
+
+        def flaky(handler, row, auth_user=None):
+            calls.append(row["id"])
+            if len(calls) == failing_call:
+                raise RuntimeError("broken row")
+            return serialize(handler, row, auth_user=auth_user)
+
+        return mock.patch.object(server.AppHandler, "serialize_layer_point", flaky)
+
+    def test_large_listing_is_sent_in_chunks(self):
+        response = self.get_points()
+        body = json.loads(response.read())
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        self.assertIsNone(response.getheader("Content-Length"))
+        self.assertEqual(len(body["points"]), 20)
+        self.assertIn("cursor", body)
+
+    def test_gzip_stream_decodes_to_the_same_listing(self):
+        plain = json.loads(self.get_points().read())
+        response = self.get_points({"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        self.assertEqual(json.loads(gzip.decompress(response.read())), plain)
+
+    def test_listing_that_fits_one_chunk_gets_a_content_length(self):
+        with mock.patch.object(server, "STREAM_CHUNK_SIZE", 1 << 20):
+            response = self.get_points()
+            body = response.read()
+
+        self.assertIsNone(response.getheader("Transfer-Encoding"))
+        self.assertEqual(int(response.getheader("Content-Length")), len(body))
+        self.assertEqual(len(json.loads(body)["points"]), 20)
+
+    def test_error_before_the_first_chunk_is_an_error_response(self):
+        with self.fail_on_call(1):
+            response = self.get_points()
+            response.read()
+
+        self.assertEqual(response.status, 500)
+
+    def test_error_after_the_first_chunk_truncates_the_response(self):
+        with self.fail_on_call(10):
+            response = self.get_points()
+            self.assertEqual(response.status, 200)
+            with self.assertRaises(http.client.IncompleteRead):
+                response.read()
+
+    def test_spool_fallback_sends_a_content_length(self):
+        with mock.patch.object(server, "LISTING_STREAM_SPOOL", True):
+            response = self.get_points()
+            body = response.read()
+
+        self.assertIsNone(response.getheader("Transfer-Encoding"))
+        self.assertEqual(int(response.getheader("Content-Length")), len(body))
+        self.assertEqual(len(json.loads(body)["points"]), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()